@@ -0,0 +1,159 @@
+"""Time pipeline stages on synthetic corpora at several scales and write JSON results.
+
+Run from the repository root after ``pip install -e .``::
+
+    python benchmarks/bench_stages.py --scales 1 10 100
+    python benchmarks/bench_stages.py --compare benchmarks/results/stage_benchmarks.json
+    python benchmarks/bench_stages.py --output benchmarks/results/stage_benchmarks.json
+
+Not collected by pytest; results are meant to be diffed in review.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+
+from extract.near_duplicates import add_candidate_clusters
+from extract.songshi_candidates import extract_candidates
+from ingest.wikisource_fetch import _extract_readable_text
+from organize.auto_facts_songshi_juan186 import RULES_PATH, auto_organize_facts
+from pipeline_end_to_end import REQUIRED_COLUMNS, _panel_facts, compute_panel, validate_rows
+from synthetic.songshi_corpus import CorpusSpec, write_corpus
+
+BENCH_DIR = Path(__file__).resolve().parent
+# Committed baseline; runs write to the (ignored) scratch file unless --output points here.
+RESULTS_PATH = BENCH_DIR / "results" / "stage_benchmarks.json"
+SCRATCH_PATH = BENCH_DIR / "results" / "latest.json"
+SOURCE_REF = "synthetic://songshi/juan186"
+
+
+def _time(func: Callable[[], Any], repeat: int) -> tuple[list[float], Any]:
+    """Return per-repeat wall seconds and the last result of ``func``."""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return timings, result
+
+
+def bench_scale(spec: CorpusSpec, scale: int, repeat: int, work_dir: Path) -> list[dict[str, Any]]:
+    """Benchmark each stage on the ``scale``x corpus and return one record per stage."""
+    scaled = spec.scaled(scale)
+    txt_path, html_path = write_corpus(scaled, work_dir / f"x{scale}")
+    candidates_csv = work_dir / f"x{scale}" / "candidates.csv"
+    auto_facts_csv = work_dir / f"x{scale}" / "auto_facts.csv"
+    html = html_path.read_text(encoding="utf-8")
+
+    records: list[dict[str, Any]] = []
+
+    def record(stage: str, rows_in: int, func: Callable[[], Any]) -> Any:
+        timings, result = _time(func, repeat)
+        records.append(
+            {
+                "stage": stage,
+                "scale": scale,
+                "sentences": scaled.sentences,
+                "rows_in": rows_in,
+                "rows_out": len(result) if hasattr(result, "__len__") else None,
+                "seconds_min": min(timings),
+                "seconds_median": statistics.median(timings),
+                "repeat": repeat,
+            }
+        )
+        return result
+
+    record("parse_html", len(html.splitlines()), lambda: _extract_readable_text(html).splitlines())
+    candidates = record(
+        "extract_candidates",
+        scaled.sentences,
+        lambda: extract_candidates(txt_path, candidates_csv, SOURCE_REF),
+    )
+    record("cluster_candidates", len(candidates), lambda: add_candidate_clusters(candidates))
+    facts = record(
+        "auto_organize_facts",
+        len(candidates),
+        lambda: auto_organize_facts(candidates_csv, auto_facts_csv, RULES_PATH),
+    )
+    facts = facts[REQUIRED_COLUMNS]
+    record("validate_rows", len(facts), lambda: validate_rows(facts) or facts)
+    converted = record(
+        "normalize_units", len(facts), lambda: _panel_facts(facts, mode="verified")[0]
+    )
+    record("compute_panel", len(converted), lambda: compute_panel(converted))
+    return records
+
+
+def compare(results: list[dict[str, Any]], baseline_path: Path, tolerance: float) -> list[str]:
+    """Return messages for stages whose median time grew by more than ``tolerance``."""
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))["results"]
+    merged = pd.DataFrame(results).merge(
+        pd.DataFrame(baseline), on=["stage", "scale"], suffixes=("", "_baseline")
+    )
+    ratio = merged["seconds_median"] / merged["seconds_median_baseline"]
+    slower = merged[ratio > 1 + tolerance].assign(ratio=ratio)
+    return [
+        f"{row.stage} x{row.scale}: {row.seconds_median_baseline:.4f}s -> "
+        f"{row.seconds_median:.4f}s ({row.ratio:.2f}x)"
+        for row in slower.itertuples()
+    ]
+
+
+def main(argv: list[str] | None = None) -> int:
+    """CLI wrapper for the stage benchmark suite."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument(
+        "--sentences", type=int, default=CorpusSpec.sentences, help="Sentences at 1x."
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=CorpusSpec.seed)
+    parser.add_argument("--output", type=Path, default=SCRATCH_PATH, help="Results JSON to write.")
+    parser.add_argument("--compare", type=Path, default=None, help="Baseline results JSON.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed median slowdown.")
+    args = parser.parse_args(argv)
+
+    spec = CorpusSpec(sentences=args.sentences, seed=args.seed)
+    results: list[dict[str, Any]] = []
+    with tempfile.TemporaryDirectory(prefix="song-bench-") as work_dir:
+        for scale in args.scales:
+            results.extend(bench_scale(spec, scale, args.repeat, Path(work_dir)))
+
+    regressions = compare(results, args.compare, args.tolerance) if args.compare else []
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "spec": {"sentences": spec.sentences, "seed": spec.seed},
+        "results": results,
+    }
+    args.output.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+
+    for row in results:
+        timing = f"{row['seconds_median']:.4f}s ({row['rows_in']} rows in)"
+        print(f"{row['stage']} x{row['scale']}: {timing}")
+    print(f"benchmark_json: {args.output}")
+    for message in regressions:
+        print(f"regression: {message}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
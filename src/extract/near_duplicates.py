@@ -0,0 +1,168 @@
+"""Cluster near-duplicate Songshi candidates with MinHash signatures and LSH banding."""
+
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from instrumentation.run_manifest import timed_stage
+from storage.atomic import write_csv
+
+LOGGER = logging.getLogger(__name__)
+
+CLUSTER_COLUMNS = ["cluster_id", "cluster_size", "is_cluster_representative"]
+# Candidates only cluster when these agree, so a cluster never mixes different figures.
+BLOCKING_COLUMNS = ["value_num", "unit_std"]
+
+SHINGLE_SIZE = 3
+NUM_PERM = 64
+BANDS = 16
+JACCARD_THRESHOLD = 0.7
+MINHASH_SEED = 186
+BATCH_SHINGLES = 250_000
+_EMPTY = np.iinfo(np.uint64).max
+_GRAM_MULTIPLIER = np.uint64(0x1F3D5B79)
+_HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _shingles(snippets: pd.Series, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Return (document position, 32-bit hash) of every character k-gram, grouped by document.
+
+    Snippets are concatenated into one code-point array; k-grams are combined with wrapping
+    multiply-add over shifted views, so no per-gram Python strings are built. Snippets shorter
+    than ``k`` yield one zero-padded gram; empty snippets yield none.
+    """
+    texts = snippets.fillna("").astype(str).tolist()
+    lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+    code_points = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32)
+    code_points = np.concatenate([code_points, np.zeros(k, dtype=np.uint32)]).astype(np.uint64)
+
+    owners = np.repeat(np.arange(len(texts)), lengths)
+    offsets = np.cumsum(lengths) - lengths
+    position = np.arange(len(owners)) - offsets[owners]
+    owner_length = lengths[owners]
+    starts = np.flatnonzero((position <= owner_length - k) | ((position == 0) & (owner_length < k)))
+
+    codes = np.zeros(len(starts), dtype=np.uint64)
+    for shift in range(k):
+        within = position[starts] + shift < owner_length[starts]
+        codes = codes * _GRAM_MULTIPLIER + np.where(within, code_points[starts + shift], 0)
+    return owners[starts], (codes * _HASH_MULTIPLIER) >> np.uint64(32)
+
+
+def minhash_signatures(
+    snippets: pd.Series,
+    num_perm: int = NUM_PERM,
+    k: int = SHINGLE_SIZE,
+    seed: int = MINHASH_SEED,
+) -> np.ndarray:
+    """Return an (n_snippets, num_perm) MinHash matrix; empty snippets get all-max rows.
+
+    Permutations are multiply-shift hashes ``(a * x + b) >> 32`` of 32-bit shingle hashes
+    (wrapping 64-bit arithmetic, no modulo), applied to all shingles of a batch at once and
+    reduced per snippet with ``np.minimum.reduceat``.
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64)
+
+    documents, hashes = _shingles(snippets, k)
+    signatures = np.full((len(snippets), num_perm), _EMPTY, dtype=np.uint64)
+    start = 0
+    while start < len(hashes):
+        stop = min(start + BATCH_SHINGLES, len(hashes))
+        # Keep whole documents within a batch so every reduceat segment is complete.
+        while stop < len(hashes) and documents[stop] == documents[stop - 1]:
+            stop += 1
+        batch_docs = documents[start:stop]
+        permuted = (a[:, None] * hashes[None, start:stop] + b[:, None]) >> np.uint64(32)
+        offsets = np.flatnonzero(np.r_[True, batch_docs[1:] != batch_docs[:-1]])
+        signatures[batch_docs[offsets]] = np.minimum.reduceat(permuted, offsets, axis=1).T
+        start = stop
+    return signatures
+
+
+def _components(n: int, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """Return the smallest member position of each node's connected component."""
+    labels = np.arange(n)
+    while True:
+        linked = np.minimum(labels[left], labels[right])
+        updated = labels.copy()
+        np.minimum.at(updated, left, linked)
+        np.minimum.at(updated, right, linked)
+        updated = updated[updated]
+        if np.array_equal(updated, labels):
+            return labels
+        labels = updated
+
+
+def cluster_near_duplicates(
+    snippets: pd.Series,
+    blocking_keys: pd.Series | None = None,
+    bands: int = BANDS,
+    num_perm: int = NUM_PERM,
+    threshold: float = JACCARD_THRESHOLD,
+) -> np.ndarray:
+    """Return, per snippet, the position of its cluster's first member.
+
+    Each band of ``num_perm // bands`` signature rows is hashed (with the blocking key) into
+    buckets; bucket members are linked to the bucket head when their estimated Jaccard
+    similarity reaches ``threshold``. Work is linear in the number of snippets per band.
+    """
+    n = len(snippets)
+    if n == 0:
+        return np.arange(0)
+    signatures = minhash_signatures(snippets, num_perm=num_perm)
+    rows = num_perm // bands
+    base = np.zeros(n, dtype=np.uint64)
+    if blocking_keys is not None:
+        base = pd.util.hash_pandas_object(blocking_keys.astype(str), index=False).to_numpy()
+    has_shingles = signatures[:, 0] != _EMPTY
+
+    left_parts, right_parts = [], []
+    for band in range(bands):
+        key = base.copy()
+        for column in range(band * rows, (band + 1) * rows):
+            key = key * np.uint64(1_000_003) + signatures[:, column]
+        order = np.argsort(key, kind="stable")
+        order = order[has_shingles[order]]
+        sorted_keys = key[order]
+        starts = np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]
+        heads = order[np.maximum.accumulate(np.where(starts, np.arange(len(order)), 0))]
+        members = order[~starts]
+        heads = heads[~starts]
+        similar = (signatures[members] == signatures[heads]).mean(axis=1) >= threshold
+        left_parts.append(members[similar])
+        right_parts.append(heads[similar])
+
+    left = np.concatenate(left_parts) if left_parts else np.arange(0)
+    right = np.concatenate(right_parts) if right_parts else np.arange(0)
+    return _components(n, left, right)
+
+
+def add_candidate_clusters(candidates: pd.DataFrame) -> pd.DataFrame:
+    """Return candidates with ``cluster_id`` (the representative's candidate_id), size and flag.
+
+    The representative is the earliest candidate of a cluster in extraction order.
+    """
+    clustered = candidates.drop(columns=CLUSTER_COLUMNS, errors="ignore").reset_index(drop=True)
+    blocking = clustered.reindex(columns=BLOCKING_COLUMNS).astype(str).agg("|".join, axis=1)
+    heads = cluster_near_duplicates(clustered["snippet"], blocking)
+    clustered["cluster_id"] = clustered["candidate_id"].to_numpy()[heads]
+    clustered["cluster_size"] = clustered.groupby("cluster_id")["cluster_id"].transform("size")
+    clustered["is_cluster_representative"] = heads == np.arange(len(clustered))
+    collapsed = int((~clustered["is_cluster_representative"]).sum())
+    if collapsed:
+        LOGGER.info("Clustered %d near-duplicate candidates under representatives", collapsed)
+    return clustered
+
+
+@timed_stage("dedup")
+def cluster_candidates_csv(candidates_csv: Path, out_csv: Path | None = None) -> pd.DataFrame:
+    """Add near-duplicate cluster columns to a candidates CSV (in place by default)."""
+    clustered = add_candidate_clusters(pd.read_csv(candidates_csv))
+    write_csv(clustered, out_csv or candidates_csv)
+    return clustered
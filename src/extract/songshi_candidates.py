@@ -5,10 +5,12 @@ from __future__ import annotations
 import hashlib
 import re
 from pathlib import Path
-from typing import Optional
 
 import pandas as pd
 
+from instrumentation.run_manifest import current_stage, timed_stage
+from storage.atomic import write_csv
+
 SOURCE_WORK = "宋史"
 SOURCE_URL = "https://zh.wikisource.org/zh-hans/宋史/卷186"
 JUAN = "186"
@@ -165,7 +167,7 @@ def _standardize_unit(unit_raw: str) -> str:
 
 def _candidate_id(source_ref: str, start: int, end: int, value_raw: str) -> str:
     """Build a stable candidate id from source pointer and match position."""
-    payload = f"{source_ref}|{start}|{end}|{value_raw}".encode("utf-8")
+    payload = f"{source_ref}|{start}|{end}|{value_raw}".encode()
     return hashlib.sha1(payload).hexdigest()
 
 
@@ -174,7 +176,7 @@ def _snippet_hash(snippet: str) -> str:
     return hashlib.sha1(snippet.encode("utf-8")).hexdigest()
 
 
-def parse_chinese_numeral(value_raw: str) -> Optional[float]:
+def parse_chinese_numeral(value_raw: str) -> float | None:
     """Parse Arabic or Chinese numeral text into numeric value; return None if ambiguous."""
     text = value_raw.strip()
     if text == "":
@@ -221,9 +223,11 @@ def parse_chinese_numeral(value_raw: str) -> Optional[float]:
     return float(value)
 
 
+@timed_stage("extract")
 def extract_candidates(txt_path: Path, out_csv: Path, source_ref: str) -> pd.DataFrame:
     """Extract numeric candidate mentions from text into a CSV for review."""
     text = txt_path.read_text(encoding="utf-8")
+    current_stage().rows_in = len(text.splitlines())
     rows: list[dict[str, object]] = []
 
     for match in NUMBER_PATTERN.finditer(text):
@@ -266,6 +270,5 @@ def extract_candidates(txt_path: Path, out_csv: Path, source_ref: str) -> pd.Dat
         )
 
     candidates = pd.DataFrame(rows, columns=REQUIRED_COLUMNS)
-    out_csv.parent.mkdir(parents=True, exist_ok=True)
-    candidates.to_csv(out_csv, index=False)
+    write_csv(candidates, out_csv)
     return candidates
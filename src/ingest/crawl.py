@@ -0,0 +1,284 @@
+"""Resumable multi-page crawls backed by an append-only journal.
+
+Each journal line is a JSON event for one URL (``pending``, ``fetched``, ``parsed`` or
+``failed``) with its cumulative attempt count and last error. A URL's state is its latest
+event, so an interrupted crawl resumes from exactly the URLs that are not ``parsed`` yet:
+``fetched`` pages are re-parsed from the saved HTML and only the rest are downloaded again.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+
+from ingest.wikisource_fetch import (
+    RetryPolicy,
+    TransientFetchError,
+    download_with_retry,
+    save_readable_text,
+)
+from instrumentation.run_manifest import current_stage, instrumented_command, stage, timed_stage
+from storage.atomic import artifact_lock, write_text
+
+LOGGER = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+CRAWL_DIR = BASE_DIR / "data" / "01_raw" / "wikisource" / "songshi"
+CRAWL_JOURNAL_PATH = BASE_DIR / "data" / "01_raw" / "wikisource" / "crawl_journal.jsonl"
+
+STATES = ("pending", "fetched", "parsed", "failed")
+# Hex digits of the URL hash appended to names derived from a URL's last path segment.
+URL_HASH_CHARS = 8
+
+
+@dataclass(frozen=True)
+class CrawlTarget:
+    """One page to crawl and where its HTML and text go."""
+
+    url: str
+    out_html: Path
+    out_txt: Path
+
+
+@dataclass
+class UrlState:
+    """Latest journaled state of one URL."""
+
+    target: CrawlTarget
+    state: str = "pending"
+    attempts: int = 0
+    error: str | None = None
+
+
+def target_for(url: str, out_dir: Path, name: str | None = None) -> CrawlTarget:
+    """Return the crawl target of ``url``, named after its last path segment by default.
+
+    Derived names end in a short hash of the full URL, so URLs sharing a last segment (e.g.
+    ``.../juan1/index`` and ``.../juan2/index``) get distinct files.
+    """
+    if name is None:
+        segment = unquote(urlsplit(url).path.rstrip("/").rsplit("/", 1)[-1]) or "index"
+        safe = "".join(char if char.isalnum() or char in "-_." else "_" for char in segment)
+        digest = hashlib.sha1(url.encode("utf-8")).hexdigest()[:URL_HASH_CHARS]
+        name = f"{safe}-{digest}"
+    return CrawlTarget(url=url, out_html=out_dir / f"{name}.html", out_txt=out_dir / f"{name}.txt")
+
+
+def _check_unique_files(states: Iterable[UrlState]) -> None:
+    """Raise ValueError when two URLs would write the same HTML or text file."""
+    owners: dict[Path, str] = {}
+    for state in states:
+        for path in (state.target.out_html, state.target.out_txt):
+            owner = owners.setdefault(path, state.target.url)
+            if owner != state.target.url:
+                raise ValueError(f"{owner} and {state.target.url} would both write {path}")
+
+
+def read_targets(url_list: Path, out_dir: Path) -> list[CrawlTarget]:
+    """Read ``<url> [name]`` lines (blank lines and ``#`` comments skipped)."""
+    targets = []
+    for line in url_list.read_text(encoding="utf-8").splitlines():
+        fields = line.split("#", 1)[0].split()
+        if fields:
+            targets.append(target_for(fields[0], out_dir, fields[1] if len(fields) > 1 else None))
+    return targets
+
+
+class CrawlJournal:
+    """Append-only JSON-lines journal of per-URL crawl events."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    def append(self, state: UrlState) -> None:
+        """Durably append ``state`` as the URL's latest event."""
+        event = {
+            "url": state.target.url,
+            "state": state.state,
+            "attempts": state.attempts,
+            "error": state.error,
+            "out_html": str(state.target.out_html),
+            "out_txt": str(state.target.out_txt),
+            "at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with artifact_lock(self.path), self.path.open("a", encoding="utf-8") as handle:
+            handle.write(json.dumps(event, ensure_ascii=False) + "\n")
+            handle.flush()
+            os.fsync(handle.fileno())
+
+    def states(self) -> dict[str, UrlState]:
+        """Fold the journal into each URL's latest state, in first-seen order.
+
+        A torn final line (the process died mid-append) is ignored.
+        """
+        states: dict[str, UrlState] = {}
+        if not self.path.exists():
+            return states
+        with self.path.open(encoding="utf-8") as handle:
+            for number, line in enumerate(handle, start=1):
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    LOGGER.warning("Skipping unreadable journal line %d in %s", number, self.path)
+                    continue
+                target = CrawlTarget(event["url"], Path(event["out_html"]), Path(event["out_txt"]))
+                states[event["url"]] = UrlState(
+                    target, event["state"], event["attempts"], event["error"]
+                )
+        return states
+
+    def unfinished(self) -> list[UrlState]:
+        """Return URLs not yet parsed, including parsed ones whose text file has gone missing."""
+        return [
+            state
+            for state in self.states().values()
+            if state.state != "parsed" or not state.target.out_txt.exists()
+        ]
+
+
+def _process(
+    state: UrlState,
+    journal: CrawlJournal,
+    policy: RetryPolicy,
+    sleep: Callable[[float], None],
+) -> None:
+    """Download (unless already fetched) and parse one URL, journaling each transition.
+
+    A page that cannot be downloaded or parsed is journaled as ``failed`` and the crawl goes on.
+    """
+    if state.state != "fetched" or not state.target.out_html.exists():
+
+        def on_retry(attempt: int, error: TransientFetchError, delay: float) -> None:
+            state.state, state.attempts, state.error = "pending", state.attempts + 1, str(error)
+            journal.append(state)
+
+        try:
+            with stage("crawl.download"):
+                html = download_with_retry(state.target.url, policy, sleep=sleep, on_retry=on_retry)
+        except Exception as exc:  # noqa: BLE001 - one bad page must not end the crawl
+            state.state, state.attempts, state.error = "failed", state.attempts + 1, str(exc)
+            journal.append(state)
+            LOGGER.error(
+                "Giving up on %s after %d attempts: %s", state.target.url, state.attempts, exc
+            )
+            return
+        write_text(state.target.out_html, html)
+        state.state, state.attempts, state.error = "fetched", state.attempts + 1, None
+        journal.append(state)
+    else:
+        html = state.target.out_html.read_text(encoding="utf-8")
+
+    try:
+        save_readable_text(html, state.target.out_txt)
+    except Exception as exc:  # noqa: BLE001 - one bad page must not end the crawl
+        state.state, state.error = "failed", str(exc)
+        journal.append(state)
+        LOGGER.error("Could not parse %s: %s", state.target.url, exc)
+        return
+    state.state = "parsed"
+    journal.append(state)
+
+
+@timed_stage("crawl")
+def crawl(
+    targets: Iterable[CrawlTarget] | None,
+    journal_path: Path = CRAWL_JOURNAL_PATH,
+    policy: RetryPolicy | None = None,
+    sleep_seconds: float = 1.0,
+    sleep: Callable[[float], None] = time.sleep,
+) -> dict[str, int]:
+    """Crawl ``targets`` (or, with ``None``, resume the journal's unfinished URLs).
+
+    New targets are journaled as ``pending`` first; targets the journal already finished are
+    skipped. Raises ValueError, before journaling anything, when two URLs (new or journaled)
+    would write the same file. ``sleep_seconds`` is the politeness delay before each download.
+    Returns the count of URLs per final state for this run.
+    """
+    journal = CrawlJournal(journal_path)
+    policy = policy or RetryPolicy()
+    if targets is not None:
+        known = journal.states()
+        added: dict[str, UrlState] = {}
+        for target in targets:
+            if target.url not in known:
+                added.setdefault(target.url, UrlState(target))
+        _check_unique_files([*known.values(), *added.values()])
+        for state in added.values():
+            journal.append(state)
+    todo = journal.unfinished()
+    current_stage().rows_in = len(todo)
+
+    for index, state in enumerate(todo):
+        if index and state.state != "fetched":
+            sleep(max(sleep_seconds, 0.0))
+        _process(state, journal, policy, sleep)
+
+    counts = {name: 0 for name in STATES}
+    for state in todo:
+        counts[state.state] += 1
+    current_stage().rows_out = counts["parsed"]
+    return counts
+
+
+def _policy(args: argparse.Namespace) -> RetryPolicy:
+    """Build the retry policy from the parsed CLI options."""
+    return RetryPolicy(
+        max_attempts=args.max_attempts, base_delay=args.base_delay, max_delay=args.max_delay
+    )
+
+
+def _add_common(parser: argparse.ArgumentParser) -> None:
+    """Add the journal, politeness and retry options shared by crawl and crawl-resume."""
+    parser.add_argument("--journal", type=Path, default=CRAWL_JOURNAL_PATH)
+    parser.add_argument(
+        "--sleep-seconds", type=float, default=1.0, help="Politeness delay between pages."
+    )
+    parser.add_argument("--max-attempts", type=int, default=RetryPolicy.max_attempts)
+    parser.add_argument("--base-delay", type=float, default=RetryPolicy.base_delay)
+    parser.add_argument("--max-delay", type=float, default=RetryPolicy.max_delay)
+
+
+def _report(counts: dict[str, int], journal: Path) -> None:
+    """Print the per-state URL counts and the journal path."""
+    for name in STATES:
+        print(f"{name}: {counts[name]}")
+    print(f"crawl_journal: {journal}")
+
+
+@instrumented_command("run-songshi-juan186-crawl")
+def main(argv: list[str] | None = None) -> None:
+    """CLI wrapper: journal and crawl the URLs listed in a file."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("url_list", type=Path, help="File of '<url> [name]' lines.")
+    parser.add_argument("--out-dir", type=Path, default=CRAWL_DIR)
+    _add_common(parser)
+    args = parser.parse_args(argv)
+
+    targets = read_targets(args.url_list, args.out_dir)
+    counts = crawl(targets, args.journal, _policy(args), sleep_seconds=args.sleep_seconds)
+    _report(counts, args.journal)
+
+
+@instrumented_command("run-songshi-juan186-crawl-resume")
+def resume_main(argv: list[str] | None = None) -> None:
+    """CLI wrapper: finish the URLs an earlier crawl left pending, fetched or failed."""
+    parser = argparse.ArgumentParser(description=resume_main.__doc__)
+    _add_common(parser)
+    args = parser.parse_args(argv)
+
+    counts = crawl(None, args.journal, _policy(args), sleep_seconds=args.sleep_seconds)
+    _report(counts, args.journal)
+
+
+if __name__ == "__main__":
+    main()
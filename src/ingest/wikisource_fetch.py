@@ -2,8 +2,15 @@
 
 from __future__ import annotations
 
+import logging
+import random
 import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from pathlib import Path
+from urllib.error import HTTPError, URLError
 from urllib.request import Request, urlopen
 
 try:
@@ -16,10 +23,69 @@ try:
 except ImportError:  # pragma: no cover - optional runtime dependency in offline envs
     BeautifulSoup = None  # type: ignore[assignment]
 
-import requests
-from bs4 import BeautifulSoup
+from instrumentation.run_manifest import stage, timed_stage
+from storage.atomic import write_text
+
+LOGGER = logging.getLogger(__name__)
 
 DEFAULT_USER_AGENT = "ns-song-fiscal-panel/0.1 (+https://github.com/tizzp/ns-song-fiscal-panel)"
+# Rate limiting and server-side hiccups; anything else (404, 403, ...) will not heal on retry.
+TRANSIENT_STATUS = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+class TransientFetchError(RuntimeError):
+    """A download failure worth retrying, with the server's Retry-After delay if it sent one."""
+
+    def __init__(
+        self, message: str, status: int | None = None, retry_after: float | None = None
+    ) -> None:
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Exponential backoff with full jitter; Retry-After wins when the server sends it."""
+
+    max_attempts: int = 5
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+    max_retry_after: float = 600.0
+
+    def delay(
+        self, attempt: int, error: TransientFetchError, rng: random.Random | None = None
+    ) -> float:
+        """Return the seconds to wait after failed attempt number ``attempt`` (1-based)."""
+        if error.retry_after is not None:
+            return min(max(error.retry_after, 0.0), self.max_retry_after)
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return (rng or random).uniform(0.0, ceiling)
+
+
+def parse_retry_after(value: str | None, now: datetime | None = None) -> float | None:
+    """Parse a Retry-After header given as delta-seconds or an HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - (now or datetime.now(timezone.utc))).total_seconds(), 0.0)
+
+
+def _status_error(url: str, status: int, retry_after: str | None) -> TransientFetchError | None:
+    """Return a transient error for retryable HTTP statuses, else None."""
+    if status not in TRANSIENT_STATUS:
+        return None
+    return TransientFetchError(
+        f"HTTP {status} for {url}", status=status, retry_after=parse_retry_after(retry_after)
+    )
 
 
 def _extract_readable_text(html: str) -> str:
@@ -30,7 +96,11 @@ def _extract_readable_text(html: str) -> str:
             text = text.replace(f"<{tag}", "\n<")
         text = text.replace("<", "\n<")
         text = text.replace(">", ">\n")
-        lines = [line.strip() for line in text.splitlines() if line.strip() and not line.startswith("<")]
+        lines = [
+            line.strip()
+            for line in text.splitlines()
+            if line.strip() and not line.startswith("<")
+        ]
         return "\n".join(lines)
 
     soup = BeautifulSoup(html, "html.parser")
@@ -50,47 +120,98 @@ def _extract_readable_text(html: str) -> str:
 
 
 def _download_html(url: str) -> str:
-    """Download page HTML with requests when available, otherwise urllib fallback."""
+    """Download page HTML with requests when available, otherwise urllib fallback.
+
+    Timeouts, dropped connections and retryable HTTP statuses raise ``TransientFetchError``.
+    """
     if requests is not None:
-        response = requests.get(
-            url,
-            timeout=30,
-            headers={"User-Agent": DEFAULT_USER_AGENT},
-        )
-        response.raise_for_status()
+        try:
+            response = requests.get(
+                url,
+                timeout=30,
+                headers={"User-Agent": DEFAULT_USER_AGENT},
+            )
+            response.raise_for_status()
+        except requests.HTTPError as exc:
+            response = exc.response
+            status = response.status_code if response is not None else 0
+            headers = response.headers if response is not None else {}
+            transient = _status_error(url, status, headers.get("Retry-After"))
+            if transient is None:
+                raise
+            raise transient from exc
+        except (requests.Timeout, requests.ConnectionError) as exc:
+            raise TransientFetchError(f"{type(exc).__name__} for {url}: {exc}") from exc
         return response.text
 
     req = Request(url, headers={"User-Agent": DEFAULT_USER_AGENT})
-    with urlopen(req, timeout=30) as response:  # nosec B310 - controlled URL input
-        return response.read().decode("utf-8", errors="replace")
-
-
+    try:
+        with urlopen(req, timeout=30) as response:  # nosec B310 - controlled URL input
+            return response.read().decode("utf-8", errors="replace")
+    except HTTPError as exc:
+        retry_after = exc.headers.get("Retry-After") if exc.headers else None
+        transient = _status_error(url, exc.code, retry_after)
+        if transient is None:
+            raise
+        raise transient from exc
+    except (URLError, TimeoutError, ConnectionError) as exc:
+        raise TransientFetchError(f"{type(exc).__name__} for {url}: {exc}") from exc
+
+
+def download_with_retry(
+    url: str,
+    policy: RetryPolicy | None = None,
+    sleep: Callable[[float], None] = time.sleep,
+    on_retry: Callable[[int, TransientFetchError, float], None] | None = None,
+) -> str:
+    """Download ``url``, retrying transient failures per ``policy``.
+
+    ``on_retry(attempt, error, delay)`` is called before each wait; the last transient error is
+    re-raised once attempts are exhausted and permanent errors are raised immediately.
+    """
+    policy = policy or RetryPolicy()
+    for attempt in range(1, policy.max_attempts + 1):
+        try:
+            return _download_html(url)
+        except TransientFetchError as error:
+            if attempt == policy.max_attempts:
+                raise
+            delay = policy.delay(attempt, error)
+            LOGGER.warning(
+                "Attempt %d for %s failed (%s); retrying in %.1fs", attempt, url, error, delay
+            )
+            if on_retry is not None:
+                on_retry(attempt, error, delay)
+            sleep(delay)
+    raise AssertionError("unreachable")  # pragma: no cover
+
+
+@timed_stage("fetch")
 def fetch_wikisource_page(
     url: str,
     out_html: Path,
     out_txt: Path,
     sleep_seconds: float = 1.0,
     force: bool = False,
+    retry: RetryPolicy | None = None,
 ) -> None:
     """Fetch a Wikisource page and save HTML + plain text with cache-aware behavior."""
-    out_txt.parent.mkdir(parents=True, exist_ok=True)
-    out_html.parent.mkdir(parents=True, exist_ok=True)
-
     if out_txt.exists() and out_txt.stat().st_size > 0 and not force:
         return
 
     time.sleep(max(sleep_seconds, 0.0))
 
-    html = _download_html(url)
-    response = requests.get(
-        url,
-        timeout=30,
-        headers={"User-Agent": DEFAULT_USER_AGENT},
-    )
-    response.raise_for_status()
+    with stage("fetch.download"):
+        html = download_with_retry(url, retry)
+        write_text(out_html, html)
 
-    html = response.text
-    out_html.write_text(html, encoding="utf-8")
+    save_readable_text(html, out_txt)
 
-    text = _extract_readable_text(html)
-    out_txt.write_text(text, encoding="utf-8")
+
+def save_readable_text(html: str, out_txt: Path) -> str:
+    """Extract readable text from page HTML and write it to ``out_txt``."""
+    with stage("fetch.parse_html") as record:
+        text = _extract_readable_text(html)
+        record.rows_out = len(text.splitlines())
+        write_text(out_txt, text)
+    return text
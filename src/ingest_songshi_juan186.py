@@ -4,8 +4,11 @@ from __future__ import annotations
 
 from pathlib import Path
 
+from extract.near_duplicates import cluster_candidates_csv
 from extract.songshi_candidates import SOURCE_URL, extract_candidates
 from ingest.wikisource_fetch import fetch_wikisource_page
+from instrumentation.run_manifest import instrumented_command
+from organize.keyword_index import KEYWORD_INDEX_PATH, write_keyword_index
 
 BASE_DIR = Path(__file__).resolve().parents[1]
 HTML_PATH = BASE_DIR / "data" / "01_raw" / "wikisource" / "songshi" / "juan186.html"
@@ -14,7 +17,7 @@ CANDIDATES_PATH = BASE_DIR / "data" / "02_intermediate" / "candidates_songshi_ju
 
 
 def run_songshi_juan186_pipeline() -> None:
-    """Fetch Songshi Juan 186 text and extract numeric candidates for review."""
+    """Fetch Songshi Juan 186 text, extract and cluster candidates, and index their snippets."""
     fetch_wikisource_page(
         url=SOURCE_URL,
         out_html=HTML_PATH,
@@ -27,11 +30,15 @@ def run_songshi_juan186_pipeline() -> None:
         out_csv=CANDIDATES_PATH,
         source_ref=SOURCE_URL,
     )
+    cluster_candidates_csv(CANDIDATES_PATH)
+    write_keyword_index(CANDIDATES_PATH, KEYWORD_INDEX_PATH)
 
     print(f"raw_txt: {TXT_PATH}")
     print(f"candidates_csv: {CANDIDATES_PATH}")
+    print(f"keyword_index: {KEYWORD_INDEX_PATH}")
 
 
+@instrumented_command("run-songshi-juan186")
 def main() -> None:
     """Entrypoint wrapper."""
     run_songshi_juan186_pipeline()
@@ -0,0 +1,335 @@
+"""Per-stage timing/memory instrumentation and JSON run manifests for CLI commands."""
+
+from __future__ import annotations
+
+import argparse
+import cProfile
+import functools
+import inspect
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, TypeVar
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None  # type: ignore[assignment]
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+RUNS_DIR = BASE_DIR / "data" / "runs"
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_ACTIVE_RUN: RunRecorder | None = None
+# Numbers runs within one process so a long-lived process never reuses a run id.
+_RUN_SEQUENCE = itertools.count(1)
+
+
+def _process_peak_rss_bytes() -> int | None:
+    """Return the process-lifetime peak resident set size in bytes, when the platform reports it."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return int(peak if sys.platform == "darwin" else peak * 1024)
+
+
+@dataclass
+class StageRecord:
+    """Measurements for one stage; callers fill ``rows_in``/``rows_out``.
+
+    ``process_peak_rss_bytes`` is the process high-water mark when the stage ended, not the
+    stage's own use; ``tracemalloc_peak_bytes`` is the stage's own peak and stays None unless
+    the run traces memory.
+    """
+
+    name: str
+    parent: str | None = None
+    rows_in: int | None = None
+    rows_out: int | None = None
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    process_peak_rss_bytes: int | None = None
+    tracemalloc_peak_bytes: int | None = None
+    status: str = "ok"
+    profile_path: str | None = None
+    _peak_floor: int = field(default=0, repr=False)
+
+
+class RunRecorder:
+    """Collect stage records for one command invocation and write its manifest."""
+
+    def __init__(
+        self, command: str, argv: list[str], profile: bool = False, trace_memory: bool = False
+    ) -> None:
+        started = datetime.now(timezone.utc)
+        self.command = command
+        self.argv = argv
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.run_id = f"{command}-{started:%Y%m%dT%H%M%SZ}-{os.getpid()}"
+        sequence = next(_RUN_SEQUENCE)
+        if sequence > 1:
+            self.run_id = f"{self.run_id}-{sequence}"
+        self.started_at = started
+        self.stages: list[StageRecord] = []
+        self.outputs: list[str] = []
+        self._stack: list[tuple[StageRecord, cProfile.Profile | None]] = []
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageRecord]:
+        """Measure a stage; nested stages are recorded with their parent's name."""
+        parent = self._stack[-1] if self._stack else None
+        record = StageRecord(name=name, parent=parent[0].name if parent else None)
+        self.stages.append(record)
+        position = len(self.stages)
+
+        traced_start = 0
+        if self.trace_memory:
+            if parent is not None:
+                traced_so_far = tracemalloc.get_traced_memory()[1]
+                parent[0]._peak_floor = max(parent[0]._peak_floor, traced_so_far)
+            tracemalloc.reset_peak()
+            traced_start = tracemalloc.get_traced_memory()[0]
+        if parent is not None and parent[1] is not None:
+            parent[1].disable()
+
+        profiler = cProfile.Profile() if self.profile else None
+        self._stack.append((record, profiler))
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield record
+        except BaseException:
+            record.status = "error"
+            raise
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            record.wall_seconds = time.perf_counter() - wall_start
+            record.cpu_seconds = time.process_time() - cpu_start
+            if self.trace_memory:
+                traced_peak = max(record._peak_floor, tracemalloc.get_traced_memory()[1])
+                record.tracemalloc_peak_bytes = max(traced_peak - traced_start, 0)
+                if parent is not None:
+                    parent[0]._peak_floor = max(parent[0]._peak_floor, traced_peak)
+            record.process_peak_rss_bytes = _process_peak_rss_bytes()
+            self._stack.pop()
+            if profiler is not None:
+                profile_dir = self.runs_dir / "profiles" / self.run_id
+                profile_path = profile_dir / f"{position:03d}-{name}.prof"
+                profile_path.parent.mkdir(parents=True, exist_ok=True)
+                profiler.dump_stats(profile_path)
+                record.profile_path = str(profile_path)
+            if parent is not None and parent[1] is not None:
+                parent[1].enable()
+
+    @property
+    def runs_dir(self) -> Path:
+        """Return the directory receiving manifests and profiles (patchable via RUNS_DIR)."""
+        return RUNS_DIR
+
+    def manifest(self, status: str, error: str | None = None) -> dict[str, Any]:
+        """Return the JSON-serializable run manifest."""
+        finished = datetime.now(timezone.utc)
+        stages = []
+        for record in self.stages:
+            stage = asdict(record)
+            stage.pop("_peak_floor")
+            stages.append(stage)
+        return {
+            "run_id": self.run_id,
+            "command": self.command,
+            "argv": self.argv,
+            "status": status,
+            "error": error,
+            "started_at": self.started_at.isoformat(),
+            "finished_at": finished.isoformat(),
+            "wall_seconds": (finished - self.started_at).total_seconds(),
+            "process_peak_rss_bytes": _process_peak_rss_bytes(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "profile": self.profile,
+            "trace_memory": self.trace_memory,
+            "stages": stages,
+            "outputs": self.outputs,
+        }
+
+    def write_manifest(self, status: str, error: str | None = None) -> Path:
+        """Write ``<runs_dir>/manifests/<run_id>.json`` and return its path."""
+        path = self.runs_dir / "manifests" / f"{self.run_id}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        manifest = self.manifest(status, error)
+        staged = path.with_name(f".{path.name}.tmp")
+        staged.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+        staged.replace(path)
+        return path
+
+
+def latest_manifests(limit: int = 10, command: str | None = None) -> list[dict[str, Any]]:
+    """Return the newest run manifests (optionally for one command), newest first."""
+    manifests_dir = RUNS_DIR / "manifests"
+    if not manifests_dir.exists():
+        return []
+    paths = sorted(
+        manifests_dir.glob("*.json"), key=lambda path: path.stat().st_mtime, reverse=True
+    )
+    manifests = []
+    for path in paths:
+        manifest = json.loads(path.read_text(encoding="utf-8"))
+        if command is None or manifest.get("command") == command:
+            manifests.append(manifest)
+        if len(manifests) >= limit:
+            break
+    return manifests
+
+
+class _NullRecord:
+    """Stand-in record used when no command run is active."""
+
+    rows_in: int | None = None
+    rows_out: int | None = None
+
+
+@contextmanager
+def stage(name: str) -> Iterator[StageRecord | _NullRecord]:
+    """Measure a pipeline stage inside the active command run (no-op outside one)."""
+    if _ACTIVE_RUN is None:
+        yield _NullRecord()
+        return
+    with _ACTIVE_RUN.stage(name) as record:
+        yield record
+
+
+def current_run_id() -> str | None:
+    """Return the id of the active command run, if any."""
+    return _ACTIVE_RUN.run_id if _ACTIVE_RUN is not None else None
+
+
+def record_output(path: Path) -> None:
+    """List an artifact the active command run published in its manifest (no-op outside one)."""
+    if _ACTIVE_RUN is not None:
+        _ACTIVE_RUN.outputs.append(str(path))
+
+
+def current_stage() -> StageRecord | _NullRecord:
+    """Return the innermost running stage so callees can report ``rows_in``/``rows_out``."""
+    if _ACTIVE_RUN is None or not _ACTIVE_RUN._stack:
+        return _NullRecord()
+    return _ACTIVE_RUN._stack[-1][0]
+
+
+def timed_stage(name: str) -> Callable[[F], F]:
+    """Run a function as a stage; DataFrame (or int row-count) results fill ``rows_out``."""
+
+    def decorate(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with stage(name) as record:
+                result = func(*args, **kwargs)
+                if isinstance(result, int) and not isinstance(result, bool):
+                    record.rows_out = result
+                elif hasattr(result, "shape"):
+                    record.rows_out = int(result.shape[0])
+                return result
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorate
+
+
+@contextmanager
+def recorded_run(
+    command: str, argv: list[str], profile: bool = False, trace_memory: bool = False
+) -> Iterator[None]:
+    """Record a block as one command run with its own manifest (a stage inside an active run).
+
+    Long-lived processes (watchers, servers) use this per unit of work instead of wrapping their
+    whole lifetime, so each piece of work gets a bounded, promptly written manifest.
+    """
+    global _ACTIVE_RUN
+
+    if _ACTIVE_RUN is not None:
+        with stage(command):
+            yield
+        return
+
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    recorder = RunRecorder(command, argv, profile=profile, trace_memory=tracemalloc.is_tracing())
+    _ACTIVE_RUN = recorder
+    status, error = "ok", None
+    try:
+        with recorder.stage(command):
+            yield
+    except SystemExit as exc:
+        status = "ok" if exc.code in (0, None) else "error"
+        raise
+    except BaseException as exc:
+        status, error = "error", f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        _ACTIVE_RUN = None
+        if started_tracing:
+            tracemalloc.stop()
+        manifest_path = recorder.write_manifest(status, error)
+        print(f"run_manifest: {manifest_path}", file=sys.stderr)
+
+
+def _accepts_argv(func: Callable[..., Any]) -> bool:
+    return "argv" in inspect.signature(func).parameters
+
+
+def instrumented_command(command: str) -> Callable[[F], F]:
+    """Wrap a console-script entry point with a run manifest and ``--profile`` support.
+
+    The wrapped function runs as one top-level stage; nested instrumented commands (e.g. the
+    ``all`` workflow calling ``ingest``) become stages of the outer run. ``--trace-memory``
+    records per-stage tracemalloc peaks; tracing slows Python allocation several-fold, so it is
+    off by default (or on when tracemalloc is already tracing).
+    """
+
+    def decorate(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(argv: list[str] | None = None) -> Any:
+            call = (lambda args: func(args)) if _accepts_argv(func) else (lambda args: func())
+            if _ACTIVE_RUN is not None:
+                with stage(command):
+                    return call([] if argv is None else argv)
+
+            # Entry points without their own parser get their help and errors from this one.
+            own_parser = _accepts_argv(func)
+            parser = argparse.ArgumentParser(
+                prog=command, description=func.__doc__, add_help=not own_parser
+            )
+            parser.add_argument("--profile", action="store_true", help="Profile the run.")
+            parser.add_argument(
+                "--trace-memory", action="store_true", help="Record tracemalloc peaks."
+            )
+            raw_args = sys.argv[1:] if argv is None else list(argv)
+            if own_parser:
+                known, remaining = parser.parse_known_args(raw_args)
+            else:
+                known, remaining = parser.parse_args(raw_args), []
+            if {"-h", "--help"} & set(remaining):
+                return call(remaining)
+
+            with recorded_run(
+                command, raw_args, profile=known.profile, trace_memory=known.trace_memory
+            ):
+                return call(remaining)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorate
@@ -2,20 +2,35 @@
 
 from __future__ import annotations
 
-from pathlib import Path
+import argparse
 import ast
+import json
+import logging
+from collections.abc import Callable
+from pathlib import Path
 from typing import Any
 
+import numpy as np
 import pandas as pd
 
 try:
     import yaml
 except ImportError:  # pragma: no cover - optional runtime dependency in offline envs
     yaml = None  # type: ignore[assignment]
-from typing import Any
 
-import pandas as pd
-import yaml
+from instrumentation.run_manifest import current_stage, instrumented_command, timed_stage
+from organize.keyword_index import (
+    KEYWORD_INDEX_PATH,
+    SECTIONS,
+    KeywordIndex,
+    affected_keywords,
+    file_sha256,
+)
+from organize.region_resolver import GAZETTEER_PATH, RegionResolver
+from organize.rule_profile import RULE_REPORT_PATH, RuleProfiler, write_rule_report
+from storage.atomic import artifact_lock, write_csv, write_text
+
+LOGGER = logging.getLogger(__name__)
 
 BASE_DIR = Path(__file__).resolve().parents[2]
 CANDIDATES_PATH = BASE_DIR / "data" / "02_intermediate" / "candidates_songshi_juan186.csv"
@@ -23,6 +38,7 @@ AUTO_FACTS_PATH = BASE_DIR / "data" / "02_intermediate" / "auto_facts_songshi_ju
 RULES_PATH = BASE_DIR / "metadata" / "rules_songshi_juan186.yml"
 
 TARGET_TOPICS = {"revenue_total", "liangshui", "shangshui"}
+EXTRACT_ID_PREFIX = "auto-songshi-juan186-"
 
 AUTO_FACT_COLUMNS = [
     "extract_id",
@@ -36,6 +52,8 @@ AUTO_FACT_COLUMNS = [
     "source_ref",
     "rule_trace",
 ]
+# Carried over from clustered candidates so the review sheet can collapse near-duplicates.
+CLUSTER_COLUMN = "cluster_id"
 
 
 def _load_rules(rules_path: Path) -> dict[str, Any]:
@@ -84,7 +102,6 @@ def _load_rules(rules_path: Path) -> dict[str, Any]:
                 parsed[section][label].append(value)
 
     return parsed
-    return yaml.safe_load(rules_path.read_text(encoding="utf-8"))
 
 
 def _match_first(text: str, mapping: dict[str, list[str]]) -> tuple[str, str]:
@@ -96,67 +113,276 @@ def _match_first(text: str, mapping: dict[str, list[str]]) -> tuple[str, str]:
     return "unknown", ""
 
 
-def auto_organize_facts(candidates_csv: Path, out_csv: Path, rules_path: Path) -> pd.DataFrame:
-    """Map candidates into provisional auto-facts using conservative rules."""
-    candidates = pd.read_csv(candidates_csv)
-    rules = _load_rules(rules_path)
+def _organize_row(
+    row: pd.Series,
+    match: Callable[[str, str], tuple[str, str]],
+    region_match: tuple[str, str] | None = None,
+) -> tuple[str | None, dict[str, object] | None]:
+    """Return (drop reason, auto-fact record) for one candidate; exactly one is ``None``.
+
+    ``region_match`` (region, matched names) replaces the ``region_keywords`` lookup, e.g. with
+    a gazetteer resolution.
+    """
+    snippet = str(row.get("snippet", ""))
+
+    period, period_kw = match("era_keywords", snippet)
+    topic, topic_kw = match("topic_keywords", snippet)
+    region, region_kw = region_match or match("region_keywords", snippet)
+
+    value = row.get("value_num")
+    if pd.isna(value):
+        value = None
+
+    unit = str(row.get("unit_std", "unknown") or "unknown")
+
+    if period == "unknown":
+        return "period_unknown", None
+    if topic not in TARGET_TOPICS:
+        return "topic_not_target", None
+    if value is None:
+        return "value_missing", None
+
+    trace_parts = []
+    if period_kw:
+        trace_parts.append(f"period:{period_kw}")
+    if topic_kw:
+        trace_parts.append(f"topic:{topic_kw}")
+    if region_kw:
+        trace_parts.append(f"region:{region_kw}")
+    trace_parts.append(f"unit:{unit}")
+
+    return None, {
+        "extract_id": f"{EXTRACT_ID_PREFIX}{row['candidate_id']}",
+        "period": period,
+        "region": region,
+        "topic": topic,
+        "value": float(value),
+        "unit": unit,
+        "confidence": "C",
+        "review_status": "unreviewed",
+        "source_ref": str(row.get("source_ref", "")),
+        "rule_trace": "|".join(trace_parts),
+        CLUSTER_COLUMN: row.get(CLUSTER_COLUMN),
+    }
 
-    rows: list[dict[str, object]] = []
-    for _, row in candidates.iterrows():
-        snippet = str(row.get("snippet", ""))
 
-        period, period_kw = _match_first(snippet, rules["era_keywords"])
-        topic, topic_kw = _match_first(snippet, rules["topic_keywords"])
-        region, region_kw = _match_first(snippet, rules["region_keywords"])
+def rules_snapshot_path(out_csv: Path) -> Path:
+    """Return the side file recording the rules and candidates an auto-facts table came from."""
+    return out_csv.with_name(f"{out_csv.stem}_rules.json")
 
-        value = row.get("value_num")
-        if pd.isna(value):
-            value = None
 
-        unit = str(row.get("unit_std", "unknown") or "unknown")
+def _write_rules_snapshot(
+    out_csv: Path, rules: dict[str, Any], candidates_sha256: str, gazetteer_path: Path | None = None
+) -> None:
+    """Record the rule sections, candidates and gazetteer fingerprints behind ``out_csv``."""
+    snapshot = {
+        "candidates_sha256": candidates_sha256,
+        "gazetteer_sha256": file_sha256(gazetteer_path) if gazetteer_path is not None else None,
+        "rules": {section: rules.get(section) or {} for section in SECTIONS},
+    }
+    write_text(rules_snapshot_path(out_csv), json.dumps(snapshot, ensure_ascii=False, indent=2))
+
+
+def _gazetteer_regions(
+    candidates: pd.DataFrame, gazetteer_path: Path | None
+) -> list[tuple[str, str] | None]:
+    """Resolve every snippet's region in one gazetteer scan, or ``None`` per row without one."""
+    if gazetteer_path is None:
+        return [None] * len(candidates)
+    snippets = candidates.get("snippet", pd.Series("", index=candidates.index))
+    snippets = snippets.fillna("").astype(str)
+    return RegionResolver.from_paths(gazetteer_path).resolve_many(snippets.tolist())
+
+
+@timed_stage("organize")
+def auto_organize_facts(
+    candidates_csv: Path,
+    out_csv: Path,
+    rules_path: Path,
+    rule_report_csv: Path | None = None,
+    gazetteer_path: Path | None = None,
+) -> pd.DataFrame:
+    """Map candidates into provisional auto-facts using conservative rules.
+
+    With ``rule_report_csv``, the same pass also profiles keyword hits, wins, shadowing,
+    filter drops and matcher time (see ``organize.rule_profile``) and writes the report.
+
+    With ``gazetteer_path``, regions come from ``organize.region_resolver`` instead of
+    ``region_keywords``.
+    """
+    if rule_report_csv is not None and gazetteer_path is not None:
+        raise ValueError("the rule report profiles region_keywords; it cannot run with a gazetteer")
+    candidates = pd.read_csv(candidates_csv)
+    rules = _load_rules(rules_path)
+    current_stage().rows_in = len(candidates)
+    profiler = RuleProfiler(rules, _match_first) if rule_report_csv is not None else None
+
+    def match(section: str, text: str) -> tuple[str, str]:
+        if profiler is not None:
+            return profiler.match_first(section, text)
+        return _match_first(text, rules[section])
+
+    regions = _gazetteer_regions(candidates, gazetteer_path)
+    rows: list[dict[str, object]] = []
+    for (_, row), region_match in zip(candidates.iterrows(), regions, strict=True):
+        drop_reason, record = _organize_row(row, match, region_match)
+        if profiler is not None:
+            profiler.record_filter(drop_reason)
+        if record is not None:
+            rows.append(record)
+
+    columns = AUTO_FACT_COLUMNS + ([CLUSTER_COLUMN] if CLUSTER_COLUMN in candidates.columns else [])
+    auto_facts = pd.DataFrame(rows, columns=columns)
+    with artifact_lock(out_csv):
+        write_csv(auto_facts, out_csv)
+        _write_rules_snapshot(out_csv, rules, file_sha256(candidates_csv), gazetteer_path)
+    if profiler is not None:
+        write_rule_report(profiler.report(), rule_report_csv)
+    return auto_facts
 
-        if period == "unknown":
-            continue
-        if topic not in TARGET_TOPICS:
-            continue
-        if value is None:
-            continue
 
-        trace_parts = []
-        if period_kw:
-            trace_parts.append(f"period:{period_kw}")
-        if topic_kw:
-            trace_parts.append(f"topic:{topic_kw}")
-        if region_kw:
-            trace_parts.append(f"region:{region_kw}")
-        trace_parts.append(f"unit:{unit}")
-
-        rows.append(
-            {
-                "extract_id": f"auto-songshi-juan186-{row['candidate_id']}",
-                "period": period,
-                "region": region,
-                "topic": topic,
-                "value": float(value),
-                "unit": unit,
-                "confidence": "C",
-                "review_status": "unreviewed",
-                "source_ref": str(row.get("source_ref", "")),
-                "rule_trace": "|".join(trace_parts),
-            }
+@timed_stage("organize_incremental")
+def reorganize_auto_facts(
+    candidates_csv: Path,
+    out_csv: Path,
+    rules_path: Path,
+    index_path: Path = KEYWORD_INDEX_PATH,
+    gazetteer_path: Path | None = None,
+) -> tuple[pd.DataFrame, int]:
+    """Patch ``out_csv`` after a rules edit; return (auto facts, candidates re-evaluated).
+
+    Only candidates whose snippet contains a keyword in ``affected_keywords`` (looked up in
+    the keyword index) are organized again; their facts replace the old ones in candidate
+    order, which gives the same table as a full ``auto_organize_facts`` run. Without a rules
+    snapshot for the same candidates and gazetteer, this falls back to the full run.
+    """
+    with artifact_lock(out_csv):
+        return _reorganize(candidates_csv, out_csv, rules_path, index_path, gazetteer_path)
+
+
+def _reorganize(
+    candidates_csv: Path,
+    out_csv: Path,
+    rules_path: Path,
+    index_path: Path,
+    gazetteer_path: Path | None,
+) -> tuple[pd.DataFrame, int]:
+    """Body of ``reorganize_auto_facts``, run while holding the auto-facts lock."""
+    snapshot_path = rules_snapshot_path(out_csv)
+    candidates_sha256 = file_sha256(candidates_csv)
+    snapshot = (
+        json.loads(snapshot_path.read_text(encoding="utf-8")) if snapshot_path.exists() else {}
+    )
+    index = KeywordIndex.for_candidates(candidates_csv, index_path)
+    gazetteer_sha256 = file_sha256(gazetteer_path) if gazetteer_path is not None else None
+    if (
+        not out_csv.exists()
+        or snapshot.get("candidates_sha256") != candidates_sha256
+        or snapshot.get("gazetteer_sha256") != gazetteer_sha256
+    ):
+        LOGGER.info(
+            "No rules snapshot for these candidates and gazetteer; organizing all %d", index.size
         )
+        current_stage().rows_in = index.size
+        facts = auto_organize_facts(
+            candidates_csv, out_csv, rules_path, gazetteer_path=gazetteer_path
+        )
+        return facts, index.size
 
-    auto_facts = pd.DataFrame(rows, columns=AUTO_FACT_COLUMNS)
-    out_csv.parent.mkdir(parents=True, exist_ok=True)
-    auto_facts.to_csv(out_csv, index=False)
-    return auto_facts
+    rules = _load_rules(rules_path)
+    keywords = affected_keywords(snapshot["rules"], rules)
+    matches = [index.candidates_with(kw) for kw in keywords] or [np.arange(0)]
+    positions = np.unique(np.concatenate(matches))
+    current_stage().rows_in = len(positions)
+    if not len(positions):
+        _write_rules_snapshot(out_csv, rules, candidates_sha256, gazetteer_path)
+        return pd.read_csv(out_csv), 0
 
+    candidates = pd.read_csv(candidates_csv)
 
-def main() -> None:
+    def match(section: str, text: str) -> tuple[str, str]:
+        return _match_first(text, rules[section])
+
+    affected = candidates.iloc[positions]
+    records = []
+    regions = _gazetteer_regions(affected, gazetteer_path)
+    for (_, row), region_match in zip(affected.iterrows(), regions, strict=True):
+        _, record = _organize_row(row, match, region_match)
+        if record is not None:
+            records.append(record)
+    existing = pd.read_csv(out_csv)
+    stale_ids = EXTRACT_ID_PREFIX + affected["candidate_id"].astype(str)
+    columns = AUTO_FACT_COLUMNS + ([CLUSTER_COLUMN] if CLUSTER_COLUMN in candidates.columns else [])
+    kept = existing[~existing["extract_id"].isin(stale_ids)]
+    if records:
+        patched = pd.concat([kept, pd.DataFrame(records, columns=columns)], ignore_index=True)
+    else:
+        patched = kept
+    candidate_ids = pd.Index(EXTRACT_ID_PREFIX + candidates["candidate_id"].astype(str))
+    order = candidate_ids.get_indexer(patched["extract_id"])
+    patched = patched.iloc[np.argsort(order, kind="stable")].reset_index(drop=True)
+    write_csv(patched, out_csv)
+    _write_rules_snapshot(out_csv, rules, candidates_sha256, gazetteer_path)
+    return patched, len(positions)
+
+
+@instrumented_command("auto-organize-songshi-juan186")
+def main(argv: list[str] | None = None) -> None:
     """CLI wrapper for auto-facts organization."""
-    auto_facts = auto_organize_facts(CANDIDATES_PATH, AUTO_FACTS_PATH, RULES_PATH)
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--rule-report",
+        type=Path,
+        nargs="?",
+        const=RULE_REPORT_PATH,
+        default=None,
+        help=f"Also write a rule coverage/cost report (default path: {RULE_REPORT_PATH}).",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Re-organize only candidates affected by rule edits since the last run.",
+    )
+    parser.add_argument(
+        "--gazetteer",
+        type=Path,
+        nargs="?",
+        const=GAZETTEER_PATH,
+        default=None,
+        help=(
+            "Resolve regions against a gazetteer instead of region_keywords "
+            f"(default: {GAZETTEER_PATH})."
+        ),
+    )
+    args = parser.parse_args(argv)
+    if args.incremental and args.rule_report is not None:
+        parser.error("--rule-report needs a full pass; drop --incremental")
+    if args.gazetteer is not None and args.rule_report is not None:
+        parser.error("--rule-report profiles region_keywords; drop --gazetteer")
+
+    if args.incremental:
+        auto_facts, reevaluated = reorganize_auto_facts(
+            CANDIDATES_PATH, AUTO_FACTS_PATH, RULES_PATH, gazetteer_path=args.gazetteer
+        )
+        print(f"auto_facts_reevaluated: {reevaluated}")
+    else:
+        auto_facts = auto_organize_facts(
+            CANDIDATES_PATH,
+            AUTO_FACTS_PATH,
+            RULES_PATH,
+            args.rule_report,
+            gazetteer_path=args.gazetteer,
+        )
     print(f"auto_facts_csv: {AUTO_FACTS_PATH}")
     print(f"auto_facts_rows: {len(auto_facts)}")
+    if args.gazetteer is not None:
+        print(f"gazetteer: {args.gazetteer}")
+    if args.rule_report is not None:
+        report = pd.read_csv(args.rule_report)
+        keywords = report[report["kind"] == "keyword"]
+        print(f"rule_report_csv: {args.rule_report}")
+        print(f"rule_report_dead_keywords: {int((keywords['hits'] == 0).sum())}")
+        print(f"rule_report_never_winning_keywords: {int((keywords['wins'] == 0).sum())}")
 
 
 if __name__ == "__main__":
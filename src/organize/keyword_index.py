@@ -0,0 +1,159 @@
+"""Inverted character index from candidate snippets, for re-organizing only rule-affected rows."""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from instrumentation.run_manifest import current_stage, timed_stage
+from storage.atomic import atomic_path
+
+LOGGER = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+KEYWORD_INDEX_PATH = BASE_DIR / "data" / "02_intermediate" / "keyword_index_songshi_juan186.parquet"
+
+SECTIONS = ("era_keywords", "topic_keywords", "region_keywords")
+
+
+def file_sha256(path: Path) -> str:
+    """Return the sha256 of a file's bytes."""
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _snippets(candidates: pd.DataFrame) -> list[str]:
+    """Return snippets exactly as the organizer matches against them."""
+    if "snippet" not in candidates.columns:
+        return [""] * len(candidates)
+    return [str(value) for value in candidates["snippet"]]
+
+
+def build_keyword_index(candidates: pd.DataFrame) -> pa.Table:
+    """Return one row per character with the sorted candidate positions whose snippet contains it.
+
+    Snippets are concatenated into one UTF-32 buffer so (character, position) pairs are built
+    and deduplicated with a single ``np.unique`` over packed int64 keys.
+    """
+    texts = _snippets(candidates)
+    lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+    chars = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32).astype(np.int64)
+    owners = np.repeat(np.arange(len(texts), dtype=np.int64), lengths)
+    pairs = np.unique((chars << 32) | owners)
+    codes, rows = pairs >> 32, (pairs & 0xFFFFFFFF).astype(np.int32)
+    grams, starts = np.unique(codes, return_index=True)
+    offsets = np.r_[starts, len(rows)].astype(np.int32)
+    return pa.table(
+        {
+            "gram": pa.array([chr(code) for code in grams], type=pa.string()),
+            "rows": pa.ListArray.from_arrays(pa.array(offsets), pa.array(rows)),
+        }
+    )
+
+
+@timed_stage("keyword_index")
+def write_keyword_index(candidates_csv: Path, out_path: Path = KEYWORD_INDEX_PATH) -> Path:
+    """Build the inverted index of a candidates CSV and write it as parquet."""
+    candidates = pd.read_csv(candidates_csv)
+    current_stage().rows_in = len(candidates)
+    table = build_keyword_index(candidates).replace_schema_metadata(
+        {"candidates_sha256": file_sha256(candidates_csv), "candidates": str(len(candidates))}
+    )
+    with atomic_path(out_path) as staged:
+        pq.write_table(table, staged)
+    return out_path
+
+
+class KeywordIndex:
+    """Candidate positions per snippet character, loaded from ``write_keyword_index`` output."""
+
+    def __init__(self, table: pa.Table) -> None:
+        metadata = table.schema.metadata or {}
+        self.candidates_sha256 = metadata.get(b"candidates_sha256", b"").decode()
+        self.size = int(metadata.get(b"candidates", b"0"))
+        rows = table.column("rows").combine_chunks()
+        self._rows = rows.values.to_numpy()
+        offsets = rows.offsets.to_numpy()
+        grams = table.column("gram").to_pylist()
+        self._postings = {
+            gram: (start, end)
+            for gram, start, end in zip(grams, offsets[:-1], offsets[1:], strict=True)
+        }
+
+    @classmethod
+    def load(cls, path: Path = KEYWORD_INDEX_PATH) -> KeywordIndex:
+        """Read an index written by ``write_keyword_index``."""
+        return cls(pq.read_table(path))
+
+    @classmethod
+    def for_candidates(cls, candidates_csv: Path, path: Path = KEYWORD_INDEX_PATH) -> KeywordIndex:
+        """Load the index, rebuilding it first when missing or built from other candidates."""
+        if path.exists():
+            index = cls.load(path)
+            if index.candidates_sha256 == file_sha256(candidates_csv):
+                return index
+            LOGGER.info("Keyword index %s is stale; rebuilding", path)
+        write_keyword_index(candidates_csv, path)
+        return cls.load(path)
+
+    def candidates_with(self, keyword: str) -> np.ndarray:
+        """Return sorted positions of candidates whose snippet may contain ``keyword``.
+
+        Posting lists of the keyword's characters are intersected, rarest first; the result is
+        a superset of exact substring matches, which is all re-evaluation needs.
+        """
+        if not keyword:
+            return np.arange(self.size)
+        spans = []
+        for char in set(keyword):
+            if char not in self._postings:
+                return np.arange(0)
+            spans.append(self._postings[char])
+        spans.sort(key=lambda span: span[1] - span[0])
+        rows = self._rows[slice(*spans[0])]
+        for span in spans[1:]:
+            rows = np.intersect1d(rows, self._rows[slice(*span)], assume_unique=True)
+        return rows
+
+
+def _first_entries(mapping: dict[str, list[str]] | None) -> dict[str, str]:
+    """Return keyword -> label in first-match order, keeping only each keyword's first entry."""
+    seen: dict[str, str] = {}
+    for label, keywords in (mapping or {}).items():
+        for keyword in keywords:
+            seen.setdefault(str(keyword), str(label))
+    return seen
+
+
+def affected_keywords(old_rules: dict[str, Any], new_rules: dict[str, Any]) -> set[str]:
+    """Return keywords whose presence in a snippet means its labels may differ between rule sets.
+
+    Per section that is any keyword added, removed or mapped to another label. For every pair
+    of remaining keywords whose order flipped, one of the two is added unless either already
+    is, so a snippet containing none of the returned keywords sees the same first match under
+    both rule sets.
+    """
+    affected: set[str] = set()
+    for section in SECTIONS:
+        old_labels = _first_entries(old_rules.get(section))
+        new_labels = _first_entries(new_rules.get(section))
+        affected |= old_labels.keys() ^ new_labels.keys()
+        shared = old_labels.keys() & new_labels.keys()
+        affected |= {kw for kw in shared if old_labels[kw] != new_labels[kw]}
+        new_rank = {keyword: rank for rank, keyword in enumerate(new_labels)}
+        stable = [kw for kw in old_labels if kw in shared and kw not in affected]
+        for position, earlier in enumerate(stable):
+            for later in stable[position + 1 :]:
+                if new_rank[later] < new_rank[earlier] and not {earlier, later} & affected:
+                    affected.add(later)
+    return affected
@@ -0,0 +1,231 @@
+"""Resolve region names in snippets against a gazetteer with a longest-match trie.
+
+The gazetteer (``metadata/gazetteer_sample.csv`` or a curated file passed in) lists 路/州/府/
+軍/監 names with aliases and a parent code. Codes roll up through the gazetteer's parents and
+the taxonomy's ``region_hierarchy`` to the panel regions NORTH, SOUTH or NATIONAL.
+
+All names go into one trie. A corpus is scanned once, left to right, taking the longest name
+at each position, so the cost is linear in the text and bounded by the longest name rather
+than the number of names (a per-name ``in`` search grows with both). Homonyms and
+one-character names are ambiguous: they resolve only when an unambiguous hit within
+``context`` characters of the same snippet shares a circuit or macro region with exactly one
+of their readings.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+try:
+    import yaml
+except ImportError:  # pragma: no cover - optional runtime dependency in offline envs
+    yaml = None  # type: ignore[assignment]
+
+LOGGER = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+GAZETTEER_PATH = BASE_DIR / "metadata" / "gazetteer_sample.csv"
+TAXONOMY_PATH = BASE_DIR / "metadata" / "taxonomy.yml"
+
+GAZETTEER_COLUMNS = ["code", "name", "level", "parent", "aliases"]
+MACRO_REGIONS = ("NATIONAL", "NORTH", "SOUTH")
+# Shorter names (e.g. 陕 for 陕西) need supporting context to count.
+MIN_UNAMBIGUOUS_LENGTH = 2
+CONTEXT_CHARS = 24
+# Key of a trie node's name index; never a character of a name.
+_END = ""
+# Joins snippets for the single scan; never part of a gazetteer name.
+_SEPARATOR = "\n"
+
+
+@dataclass(frozen=True)
+class RegionHit:
+    """A gazetteer name found at ``[start, end)`` of a snippet and its resolved code."""
+
+    start: int
+    end: int
+    name: str
+    code: str | None
+
+
+class RegionTrie:
+    """Longest-match trie over names as nested character dicts.
+
+    Scanning jumps between characters that start some name with one compiled character class,
+    then walks the trie from each, so text between place names costs no Python-level work.
+    """
+
+    def __init__(self, names: Sequence[str]) -> None:
+        self.names = list(names)
+        self.root: dict[str, Any] = {}
+        for index, name in enumerate(self.names):
+            node = self.root
+            for char in name:
+                node = node.setdefault(char, {})
+            node[_END] = index
+        first_chars = sorted(char for char in self.root if char != _END)
+        pattern = "[" + "".join(map(re.escape, first_chars)) + "]"
+        self._starts = re.compile(pattern) if first_chars else None
+
+    def scan(self, text: str) -> list[tuple[int, int, int]]:
+        """Return (start, end, name index) of leftmost-longest, non-overlapping matches."""
+        hits: list[tuple[int, int, int]] = []
+        if self._starts is None:
+            return hits
+        root, search, length = self.root, self._starts.search, len(text)
+        position = 0
+        while (found := search(text, position)) is not None:
+            start = found.start()
+            node, best, best_end = root, -1, start
+            for offset in range(start, length):
+                node = node.get(text[offset])
+                if node is None:
+                    break
+                index = node.get(_END)
+                if index is not None:
+                    best, best_end = index, offset + 1
+            if best >= 0:
+                hits.append((start, best_end, best))
+                position = best_end
+            else:
+                position = start + 1
+        return hits
+
+
+def load_region_hierarchy(taxonomy_path: Path = TAXONOMY_PATH) -> dict[str, str]:
+    """Return the taxonomy's ``region_hierarchy`` as child -> parent."""
+    if yaml is None:
+        raise RuntimeError("PyYAML is required to read the region hierarchy")
+    taxonomy = yaml.safe_load(taxonomy_path.read_text(encoding="utf-8")) or {}
+    hierarchy = taxonomy.get("region_hierarchy") or {}
+    return {str(child): str(parent) for child, parent in hierarchy.items()}
+
+
+def load_gazetteer(path: Path = GAZETTEER_PATH) -> pd.DataFrame:
+    """Read a gazetteer CSV (``#`` comment lines allowed) with blank cells as ''."""
+    gazetteer = pd.read_csv(path, dtype=str, keep_default_na=False, comment="#")
+    missing = [column for column in GAZETTEER_COLUMNS if column not in gazetteer.columns]
+    if missing:
+        raise ValueError(f"Gazetteer {path} is missing columns: {missing}")
+    return gazetteer[GAZETTEER_COLUMNS].apply(lambda column: column.str.strip())
+
+
+@dataclass
+class RegionResolver:
+    """Gazetteer names, the trie over them and each code's ancestor chain."""
+
+    gazetteer: pd.DataFrame
+    hierarchy: dict[str, str]
+    context: int = CONTEXT_CHARS
+    trie: RegionTrie = field(init=False, repr=False)
+    readings: list[tuple[str, ...]] = field(init=False, repr=False)
+    ambiguous: list[bool] = field(init=False, repr=False)
+    ancestors: dict[str, tuple[str, ...]] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        parents = dict(self.hierarchy)
+        for row in self.gazetteer.itertuples():
+            if row.parent:
+                parents[row.code] = row.parent
+        codes = {*parents, *self.gazetteer["code"]}
+        self.ancestors = {code: self._chain(code, parents) for code in codes}
+        unrooted = sorted(code for code in self.gazetteer["code"] if self.macro(code) is None)
+        if unrooted:
+            raise ValueError(f"Gazetteer codes do not roll up to {MACRO_REGIONS}: {unrooted}")
+
+        names: dict[str, list[str]] = {}
+        for row in self.gazetteer.itertuples():
+            for name in (name.strip() for name in [row.name, *row.aliases.split("|")]):
+                if name and row.code not in names.setdefault(name, []):
+                    names[name].append(row.code)
+        self.trie = RegionTrie(list(names))
+        self.readings = [tuple(codes) for codes in names.values()]
+        self.ambiguous = [
+            len(codes) > 1 or len(name) < MIN_UNAMBIGUOUS_LENGTH for name, codes in names.items()
+        ]
+
+    @classmethod
+    def from_paths(
+        cls, gazetteer_path: Path = GAZETTEER_PATH, taxonomy_path: Path = TAXONOMY_PATH
+    ) -> RegionResolver:
+        """Build a resolver from a gazetteer CSV and the taxonomy's region hierarchy."""
+        return cls(load_gazetteer(gazetteer_path), load_region_hierarchy(taxonomy_path))
+
+    @staticmethod
+    def _chain(code: str, parents: dict[str, str]) -> tuple[str, ...]:
+        """Return ``code`` followed by its ancestors, stopping at the root or a cycle."""
+        chain = [code]
+        while (parent := parents.get(chain[-1])) is not None and parent not in chain:
+            chain.append(parent)
+        return tuple(chain)
+
+    def macro(self, code: str) -> str | None:
+        """Return the first NORTH/SOUTH/NATIONAL on a code's path to the root."""
+        chain = self.ancestors.get(code, (code,))
+        return next((ancestor for ancestor in chain if ancestor in MACRO_REGIONS), None)
+
+    def _affinity(self, code: str, other: str) -> int:
+        """Count shared ancestors below NATIONAL (0 when two codes only meet at the root)."""
+        shared = set(self.ancestors[code]) & set(self.ancestors[other])
+        return len(shared - {"NATIONAL"})
+
+    def _resolve_snippet(self, hits: list[tuple[int, int, int]]) -> list[RegionHit]:
+        """Resolve one snippet's name hits, using its unambiguous hits as context."""
+        anchors = [
+            (start, self.readings[name][0]) for start, _, name in hits if not self.ambiguous[name]
+        ]
+        resolved = []
+        for start, end, name in hits:
+            codes = self.readings[name]
+            code: str | None = codes[0]
+            if self.ambiguous[name]:
+                nearby = [
+                    anchor for position, anchor in anchors if abs(position - start) <= self.context
+                ]
+                scores = [
+                    max((self._affinity(option, anchor) for anchor in nearby), default=0)
+                    for option in codes
+                ]
+                best = max(scores)
+                code = codes[scores.index(best)] if best > 0 and scores.count(best) == 1 else None
+            resolved.append(RegionHit(start, end, self.trie.names[name], code))
+        return resolved
+
+    def resolve_many(self, texts: Sequence[str]) -> list[tuple[str, str]]:
+        """Return (region, matched names joined by '+') per text from one scan of them all.
+
+        Texts whose resolved hits span more than one macro region, or that have none, get
+        ``("unknown", "")``.
+        """
+        corpus = _SEPARATOR.join(texts)
+        offsets = np.cumsum([0, *(len(text) + len(_SEPARATOR) for text in texts)])[:-1]
+        hits = self.trie.scan(corpus)
+        owners = np.searchsorted(offsets, [start for start, _, _ in hits], side="right") - 1
+
+        results = [("unknown", "")] * len(texts)
+        counts = {"hits": len(hits), "unresolved": 0, "conflicting_snippets": 0}
+        bounds = np.flatnonzero(np.diff(owners, prepend=-1, append=len(texts))) if len(hits) else []
+        for first, last in zip(bounds[:-1], bounds[1:], strict=True):
+            owner = int(owners[first])
+            base = int(offsets[owner])
+            snippet_hits = [
+                (start - base, end - base, name) for start, end, name in hits[first:last]
+            ]
+            resolved = [hit for hit in self._resolve_snippet(snippet_hits) if hit.code is not None]
+            counts["unresolved"] += len(snippet_hits) - len(resolved)
+            macros = {self.macro(hit.code) for hit in resolved}
+            if len(macros) == 1:
+                names = "+".join(dict.fromkeys(hit.name for hit in resolved))
+                results[owner] = (macros.pop(), names)
+            elif macros:
+                counts["conflicting_snippets"] += 1
+        LOGGER.info("Region resolver over %d snippets: %s", len(texts), counts)
+        return results
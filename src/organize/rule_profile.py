@@ -0,0 +1,152 @@
+"""Keyword coverage, shadowing, filter-drop and matcher-cost profile of the organizer rules."""
+
+from __future__ import annotations
+
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+
+from storage.atomic import write_csv
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+RULE_REPORT_PATH = BASE_DIR / "data" / "02_intermediate" / "rule_profile_songshi_juan186.csv"
+
+SECTIONS = ("era_keywords", "topic_keywords", "region_keywords")
+# In the order auto_organize_facts applies them; a candidate is counted at its first failing filter.
+FILTERS = ("period_unknown", "topic_not_target", "value_missing")
+REPORT_COLUMNS = [
+    "kind",
+    "section",
+    "label",
+    "keyword",
+    "rank",
+    "rows",
+    "hits",
+    "wins",
+    "shadowed_by_label",
+    "shadowed_by_keyword",
+    "probes",
+    "drops",
+    "seconds",
+]
+
+Matcher = Callable[[str, dict[str, list[str]]], tuple[str, str]]
+
+
+class RuleProfiler:
+    """Collect per-keyword and per-filter statistics while the organizer runs.
+
+    ``match_first`` returns exactly what ``matcher`` returns and times it per section; it then
+    tests every keyword of the section against the same text to count hits, wins (the keyword
+    ``matcher`` returned), shadowed hits (a keyword of an earlier label, or an earlier keyword of
+    the same label, won first) and probes (tests first-match order actually performed).
+    """
+
+    def __init__(self, rules: dict[str, Any], matcher: Matcher) -> None:
+        self._rules = rules
+        self._matcher = matcher
+        self._entries = {
+            section: [
+                (str(label), str(keyword))
+                for label, keywords in (rules.get(section) or {}).items()
+                for keyword in keywords
+            ]
+            for section in SECTIONS
+        }
+        counters = ("hits", "wins", "by_label", "by_keyword", "probes", "ns")
+        self._keyword_stats = {
+            section: [dict.fromkeys(counters, 0) for _ in entries]
+            for section, entries in self._entries.items()
+        }
+        self._section_stats = {
+            section: {"rows": 0, "hits": 0, "seconds": 0.0} for section in SECTIONS
+        }
+        self._filter_drops = dict.fromkeys(FILTERS, 0)
+        self._filter_rows = 0
+
+    def match_first(self, section: str, text: str) -> tuple[str, str]:
+        """Run the matcher for one rule section and record its statistics."""
+        start = time.perf_counter()
+        label, keyword = self._matcher(text, self._rules.get(section) or {})
+        section_stats = self._section_stats[section]
+        section_stats["seconds"] += time.perf_counter() - start
+        section_stats["rows"] += 1
+
+        entries = self._entries[section]
+        winner = entries.index((label, keyword)) if keyword else len(entries)
+        section_stats["hits"] += winner < len(entries)
+        for position, ((entry_label, entry_keyword), stats) in enumerate(
+            zip(entries, self._keyword_stats[section], strict=True)
+        ):
+            tested = time.perf_counter_ns()
+            hit = entry_keyword in text
+            stats["ns"] += time.perf_counter_ns() - tested
+            stats["probes"] += position <= winner
+            if not hit:
+                continue
+            stats["hits"] += 1
+            if position == winner:
+                stats["wins"] += 1
+            elif entries[winner][0] == entry_label:
+                stats["by_keyword"] += 1
+            else:
+                stats["by_label"] += 1
+        return label, keyword
+
+    def record_filter(self, reason: str | None) -> None:
+        """Record that a candidate passed every filter (``None``) or was dropped by ``reason``."""
+        self._filter_rows += 1
+        if reason is not None:
+            self._filter_drops[reason] += 1
+
+    def report(self) -> pd.DataFrame:
+        """Return keyword, section and filter rows as one report table."""
+        rows: list[dict[str, object]] = []
+        for section in SECTIONS:
+            for rank, ((label, keyword), stats) in enumerate(
+                zip(self._entries[section], self._keyword_stats[section], strict=True)
+            ):
+                rows.append(
+                    {
+                        "kind": "keyword",
+                        "section": section,
+                        "label": label,
+                        "keyword": keyword,
+                        "rank": rank,
+                        "rows": self._section_stats[section]["rows"],
+                        "hits": stats["hits"],
+                        "wins": stats["wins"],
+                        "shadowed_by_label": stats["by_label"],
+                        "shadowed_by_keyword": stats["by_keyword"],
+                        "probes": stats["probes"],
+                        "seconds": stats["ns"] / 1e9,
+                    }
+                )
+            section_stats = self._section_stats[section]
+            rows.append(
+                {
+                    "kind": "section",
+                    "section": section,
+                    "rows": section_stats["rows"],
+                    "hits": section_stats["hits"],
+                    "seconds": section_stats["seconds"],
+                }
+            )
+        for reason in FILTERS:
+            rows.append(
+                {
+                    "kind": "filter",
+                    "label": reason,
+                    "rows": self._filter_rows,
+                    "drops": self._filter_drops[reason],
+                }
+            )
+        return pd.DataFrame(rows, columns=REPORT_COLUMNS)
+
+
+def write_rule_report(report: pd.DataFrame, out_csv: Path = RULE_REPORT_PATH) -> Path:
+    """Write a rule profile report table and return its path."""
+    return write_csv(report, out_csv)
@@ -0,0 +1,276 @@
+"""Evaluate several rule-set variants against the same candidates in one shared keyword scan."""
+
+from __future__ import annotations
+
+import argparse
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+import pipeline_end_to_end as pipeline
+from instrumentation.run_manifest import current_stage, instrumented_command, stage, timed_stage
+from organize.auto_facts_songshi_juan186 import (
+    AUTO_FACT_COLUMNS,
+    CANDIDATES_PATH,
+    CLUSTER_COLUMN,
+    EXTRACT_ID_PREFIX,
+    TARGET_TOPICS,
+    _load_rules,
+)
+from storage.atomic import write_csv
+
+LOGGER = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+VARIANTS_DIR = BASE_DIR / "data" / "02_intermediate" / "rule_variants"
+
+# (rules section, auto-fact column, rule_trace prefix)
+SECTIONS = [
+    ("era_keywords", "period", "period"),
+    ("topic_keywords", "topic", "topic"),
+    ("region_keywords", "region", "region"),
+]
+SUMMARY_COLUMNS = [
+    "variant",
+    "rules_path",
+    "facts",
+    "added",
+    "removed",
+    "relabeled",
+    "panel_rows",
+    "panel_cells_changed",
+]
+
+
+@dataclass
+class VariantResult:
+    """Auto facts and auto panel derived from one rules file."""
+
+    name: str
+    rules_path: Path
+    facts: pd.DataFrame
+    panel: pd.DataFrame
+
+
+def keyword_hits(snippets: pd.Series, keywords: list[str]) -> np.ndarray:
+    """Return a (snippets x keywords) boolean matrix; each keyword is scanned once."""
+    texts = pa.array(snippets.to_numpy(dtype=object), type=pa.string())
+    hits = np.zeros((len(snippets), len(keywords)), dtype=bool)
+    for column, keyword in enumerate(keywords):
+        hits[:, column] = pc.match_substring(texts, keyword).to_numpy(zero_copy_only=False)
+    return hits
+
+
+def _first_match(
+    hits: np.ndarray, columns: np.ndarray, labels: np.ndarray, keywords: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Return per-row (label, keyword) of the first hit in rule order, like ``_match_first``."""
+    n = hits.shape[0]
+    if len(columns) == 0:
+        return np.full(n, "unknown", dtype=object), np.full(n, "", dtype=object)
+    ordered = hits[:, columns]
+    first = ordered.argmax(axis=1)
+    matched = ordered[np.arange(n), first]
+    return (
+        np.where(matched, labels[first], "unknown").astype(object),
+        np.where(matched, keywords[first], "").astype(object),
+    )
+
+
+def _rule_entries(rules: dict, section: str) -> tuple[tuple[str, str], ...]:
+    """Return a section's (label, keyword) pairs in first-match order."""
+    entries = (rules.get(section) or {}).items()
+    return tuple((str(label), str(kw)) for label, kws in entries for kw in kws)
+
+
+def organize_variant(
+    candidates: pd.DataFrame,
+    hits: np.ndarray,
+    vocabulary: pd.Index,
+    rules: dict,
+    memo: dict | None = None,
+) -> pd.DataFrame:
+    """Return the auto facts ``auto_organize_facts`` would produce for ``rules``, from shared hits.
+
+    ``memo`` caches first-match results by section entries, so variants that share a section's
+    rules reuse its labels instead of recomputing them.
+    """
+    memo = {} if memo is None else memo
+    labels: dict[str, np.ndarray] = {}
+    matched: dict[str, np.ndarray] = {}
+    for section, _, _ in SECTIONS:
+        entries = _rule_entries(rules, section)
+        if (section, entries) not in memo:
+            entry_labels = np.array([label for label, _ in entries], dtype=object)
+            entry_keywords = np.array([keyword for _, keyword in entries], dtype=object)
+            columns = vocabulary.get_indexer(entry_keywords)
+            memo[section, entries] = _first_match(hits, columns, entry_labels, entry_keywords)
+        labels[section], matched[section] = memo[section, entries]
+
+    value = pd.to_numeric(candidates.get("value_num"), errors="coerce").to_numpy(dtype=float)
+    keep = (
+        (labels["era_keywords"] != "unknown")
+        & np.isin(labels["topic_keywords"], list(TARGET_TOPICS))
+        & ~np.isnan(value)
+    )
+    kept = candidates.loc[keep]
+    if "unit_std" in kept.columns:
+        unit = kept["unit_std"].astype(str).replace("", "unknown")
+    else:
+        unit = pd.Series("unknown", index=kept.index)
+
+    trace = pd.Series("", index=kept.index, dtype=object)
+    for section, _, prefix in SECTIONS:
+        keyword = pd.Series(matched[section][keep], index=kept.index)
+        trace = trace + np.where(keyword != "", prefix + ":" + keyword + "|", "")
+
+    facts = pd.DataFrame(
+        {
+            "extract_id": EXTRACT_ID_PREFIX + kept["candidate_id"].astype(str),
+            "period": labels["era_keywords"][keep],
+            "region": labels["region_keywords"][keep],
+            "topic": labels["topic_keywords"][keep],
+            "value": value[keep],
+            "unit": unit,
+            "confidence": "C",
+            "review_status": "unreviewed",
+            "source_ref": kept["source_ref"].astype(str) if "source_ref" in kept else "",
+            "rule_trace": trace + "unit:" + unit,
+        },
+        index=kept.index,
+    )
+    columns = list(AUTO_FACT_COLUMNS)
+    if CLUSTER_COLUMN in candidates.columns:
+        facts[CLUSTER_COLUMN] = kept[CLUSTER_COLUMN]
+        columns.append(CLUSTER_COLUMN)
+    return facts[columns].reset_index(drop=True)
+
+
+def _variant_names(rules_paths: list[Path]) -> list[str]:
+    """Return unique output names from rule file stems."""
+    names: list[str] = []
+    for path in rules_paths:
+        name = path.stem
+        while name in names:
+            name = f"{name}_{len(names)}"
+        names.append(name)
+    return names
+
+
+@timed_stage("rule_variants")
+def evaluate_variants(
+    rules_paths: list[Path], candidates_csv: Path = CANDIDATES_PATH
+) -> list[VariantResult]:
+    """Organize candidates under every rules file, scanning each distinct keyword only once."""
+    candidates = pd.read_csv(candidates_csv)
+    current_stage().rows_in = len(candidates)
+    rule_sets = [_load_rules(path) for path in rules_paths]
+    vocabulary = pd.Index(
+        sorted(
+            {
+                str(keyword)
+                for rules in rule_sets
+                for section, _, _ in SECTIONS
+                for keywords in (rules.get(section) or {}).values()
+                for keyword in keywords
+            }
+        )
+    )
+    with stage("rule_variants.scan") as record:
+        record.rows_in = len(candidates)
+        if "snippet" in candidates:
+            snippets = candidates["snippet"].astype(str)
+        else:
+            snippets = pd.Series("", index=candidates.index)
+        hits = keyword_hits(snippets, list(vocabulary))
+    LOGGER.info(
+        "Scanned %d snippets for %d distinct keywords across %d variants",
+        len(candidates),
+        len(vocabulary),
+        len(rule_sets),
+    )
+
+    results = []
+    memo: dict = {}
+    for name, path, rules in zip(_variant_names(rules_paths), rules_paths, rule_sets, strict=True):
+        facts = organize_variant(candidates, hits, vocabulary, rules, memo)
+        converted, _ = pipeline._panel_facts(facts, mode="auto")
+        results.append(VariantResult(name, path, facts, pipeline.compute_panel(converted)))
+    return results
+
+
+def summarize_variants(results: list[VariantResult]) -> pd.DataFrame:
+    """Compare every variant with the first one (the baseline)."""
+    if not results:
+        return pd.DataFrame(columns=SUMMARY_COLUMNS)
+    label_columns = ["period", "region", "topic", "value", "unit"]
+    baseline = results[0]
+    base_facts = baseline.facts.set_index("extract_id")[label_columns]
+    value_columns = pipeline.EXPECTED_TOPIC_COLUMNS
+    base_panel = baseline.panel.set_index(["period", "region"])[value_columns]
+
+    rows = []
+    for result in results:
+        facts = result.facts.set_index("extract_id")[label_columns]
+        shared = facts.index.intersection(base_facts.index)
+        changed = facts.loc[shared].ne(base_facts.loc[shared]).any(axis=1)
+        panel = result.panel.set_index(["period", "region"])[value_columns]
+        aligned, base_aligned = panel.align(base_panel, join="outer")
+        cells_changed = ~np.isclose(
+            aligned.fillna(0).to_numpy(float), base_aligned.fillna(0).to_numpy(float)
+        )
+        cells_changed |= aligned.isna().to_numpy() != base_aligned.isna().to_numpy()
+        rows.append(
+            {
+                "variant": result.name,
+                "rules_path": str(result.rules_path),
+                "facts": len(facts),
+                "added": int((~facts.index.isin(base_facts.index)).sum()),
+                "removed": int((~base_facts.index.isin(facts.index)).sum()),
+                "relabeled": int(changed.sum()),
+                "panel_rows": len(panel),
+                "panel_cells_changed": int(cells_changed.sum()),
+            }
+        )
+    return pd.DataFrame(rows, columns=SUMMARY_COLUMNS)
+
+
+def write_variants(results: list[VariantResult], out_dir: Path = VARIANTS_DIR) -> pd.DataFrame:
+    """Write per-variant auto facts and auto panels plus ``summary.csv``; return the summary."""
+    for result in results:
+        variant_dir = out_dir / result.name
+        write_csv(result.facts, variant_dir / "auto_facts.csv")
+        pipeline.write_panel_csv(result.panel, variant_dir / "panel_auto.csv")
+    summary = summarize_variants(results)
+    write_csv(summary, out_dir / "summary.csv")
+    return summary
+
+
+@instrumented_command("run-songshi-juan186-rule-variants")
+def main(argv: list[str] | None = None) -> None:
+    """CLI wrapper for multi-variant rule evaluation."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "rules", type=Path, nargs="+", help="Rules files; the first is the baseline."
+    )
+    parser.add_argument("--candidates", type=Path, default=CANDIDATES_PATH)
+    parser.add_argument("--out-dir", type=Path, default=VARIANTS_DIR)
+    args = parser.parse_args(argv)
+
+    summary = write_variants(evaluate_variants(args.rules, args.candidates), args.out_dir)
+    print(f"rule_variants_dir: {args.out_dir}")
+    for row in summary.itertuples():
+        print(
+            f"rule_variant: {row.variant} facts={row.facts} added={row.added} "
+            f"removed={row.removed} relabeled={row.relabeled} "
+            f"panel_cells_changed={row.panel_cells_changed}"
+        )
+
+
+if __name__ == "__main__":
+    main()
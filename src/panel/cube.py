@@ -0,0 +1,307 @@
+"""Dense period x region x topic x unit x confidence fiscal cube with hierarchical roll-ups.
+
+Roll-up levels: periods go era -> reign -> NORTHERN_SONG and confidence goes A/B/C -> ALL
+(``metadata/taxonomy.yml``). Regions go prefecture -> 路 (circuit) -> NORTH/SOUTH -> NATIONAL:
+circuits and macro regions come from the taxonomy's ``region_hierarchy``, prefectures (州/府/
+軍/監) from the gazetteer rows that name a parent.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import yaml
+
+import pipeline_end_to_end as pipeline
+from instrumentation.run_manifest import instrumented_command, timed_stage
+from organize.region_resolver import GAZETTEER_PATH, load_gazetteer
+from storage.atomic import atomic_path
+
+LOGGER = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+TAXONOMY_PATH = BASE_DIR / "metadata" / "taxonomy.yml"
+CUBE_DIR = BASE_DIR / "data" / "04_features"
+
+AXES = ("period", "region", "topic", "unit", "confidence")
+VOCABULARY_KEYS = {
+    "period": "periods",
+    "region": "regions",
+    "topic": "topics",
+    "unit": "units",
+    "confidence": "confidence",
+}
+HIERARCHY_KEYS = {
+    "period": "period_hierarchy",
+    "region": "region_hierarchy",
+    "confidence": "confidence_hierarchy",
+}
+# Marginal totals (e.g. confidence ALL) are rolled up in the direct view as well.
+MARGINAL_AXES = ("confidence",)
+
+
+@dataclass
+class Axis:
+    """Integer-coded cube axis; ``parents`` maps child labels to their roll-up parent."""
+
+    name: str
+    labels: tuple[str, ...]
+    parents: dict[str, str] = field(default_factory=dict)
+    codes: dict[str, int] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.codes = {label: code for code, label in enumerate(self.labels)}
+
+    def code(self, label: str) -> int:
+        """Return the integer code of a label."""
+        try:
+            return self.codes[label]
+        except KeyError as exc:
+            raise ValueError(f"Unknown {self.name} label: {label}") from exc
+
+    def depth(self, label: str) -> int:
+        """Return the number of ancestors above a label."""
+        seen = {label}
+        parent = self.parents.get(label)
+        while parent is not None and parent not in seen:
+            seen.add(parent)
+            parent = self.parents.get(parent)
+        return len(seen) - 1
+
+    def children_bottom_up(self) -> list[tuple[int, list[int]]]:
+        """Return (parent code, child codes) pairs, deepest parents first."""
+        children: dict[str, list[int]] = {}
+        for child, parent in self.parents.items():
+            children.setdefault(parent, []).append(self.codes[child])
+        ordered = sorted(children, key=self.depth, reverse=True)
+        return [(self.codes[parent], children[parent]) for parent in ordered]
+
+
+def load_axes(
+    taxonomy_path: Path = TAXONOMY_PATH, gazetteer_path: Path | None = GAZETTEER_PATH
+) -> dict[str, Axis]:
+    """Build cube axes from the controlled vocabulary and roll-up hierarchies.
+
+    Gazetteer rows with a parent add their codes (prefectures) below it on the region axis.
+    """
+    taxonomy = yaml.safe_load(taxonomy_path.read_text(encoding="utf-8"))
+    gazetteer = load_gazetteer(gazetteer_path) if gazetteer_path is not None else None
+    axes: dict[str, Axis] = {}
+    for name in AXES:
+        hierarchy = taxonomy.get(HIERARCHY_KEYS.get(name, ""), {}) or {}
+        parents = {str(child): str(parent) for child, parent in hierarchy.items()}
+        if name == "region" and gazetteer is not None:
+            placed = gazetteer[gazetteer["parent"] != ""]
+            parents.update(zip(placed["code"], placed["parent"], strict=True))
+        labels = [str(label) for label in taxonomy.get(VOCABULARY_KEYS[name], [])]
+        for child, parent in parents.items():
+            labels.extend(label for label in (child, parent) if label not in labels)
+        axes[name] = Axis(name=name, labels=tuple(labels), parents=parents)
+    return axes
+
+
+def _roll_up(
+    sums: np.ndarray,
+    counts: np.ndarray,
+    axes: dict[str, Axis],
+    names: tuple[str, ...] = AXES,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Fill hierarchy nodes from their children, bottom-up along the ``names`` axes.
+
+    A node holds the sum of its children wherever at least one child has facts, and its own
+    reported figure only where none does, so a total reported at a node (e.g. a national
+    figure) is never added on top of the components it already covers.
+    """
+    sums, counts = sums.copy(), counts.copy()
+    for position, name in enumerate(AXES):
+        if name not in names or not axes[name].parents:
+            continue
+        # Views with the axis first; writes go through to ``sums`` and ``counts``.
+        node_sums, node_counts = np.moveaxis(sums, position, 0), np.moveaxis(counts, position, 0)
+        for parent, children in axes[name].children_bottom_up():
+            child_counts = node_counts[children].sum(axis=0)
+            covered = child_counts > 0
+            node_sums[parent] = np.where(
+                covered, node_sums[children].sum(axis=0), node_sums[parent]
+            )
+            node_counts[parent] = np.where(covered, child_counts, node_counts[parent])
+    return sums, counts
+
+
+@dataclass
+class FiscalCube:
+    """Facts summed into dense arrays; ``rolled`` builds hierarchy nodes from their children.
+
+    ``direct`` holds what was reported at each period/region label: NATIONAL there is the
+    national total the sources report. ``rolled`` NATIONAL is NORTH + SOUTH (each built from
+    its circuits and prefectures), and a node's reported total stands in only where none of
+    its children report, so reported totals and their components are never summed together.
+    Both views carry the marginal totals of ``MARGINAL_AXES``.
+    """
+
+    axes: dict[str, Axis]
+    direct: np.ndarray
+    counts: np.ndarray
+    rolled: np.ndarray
+    rolled_counts: np.ndarray
+
+    @classmethod
+    def build(cls, facts: pd.DataFrame, axes: dict[str, Axis]) -> FiscalCube:
+        """Aggregate facts with one ``bincount`` over ravelled axis codes."""
+        shape = tuple(len(axes[name].labels) for name in AXES)
+        codes = [
+            pd.Categorical(facts[name].astype(str), categories=list(axes[name].labels)).codes
+            for name in AXES
+        ]
+        keep = np.ones(len(facts), dtype=bool)
+        for axis_codes in codes:
+            keep &= axis_codes >= 0
+        if (~keep).any():
+            LOGGER.warning(
+                "Leaving %d facts outside the taxonomy out of the cube", int((~keep).sum())
+            )
+
+        flat = np.ravel_multi_index([axis_codes[keep] for axis_codes in codes], shape)
+        size = int(np.prod(shape))
+        values = facts["value"].to_numpy(dtype=float)[keep]
+        sums = np.bincount(flat, weights=values, minlength=size).reshape(shape)
+        counts = np.bincount(flat, minlength=size).reshape(shape).astype(np.int64)
+        direct, direct_counts = _roll_up(sums, counts, axes, MARGINAL_AXES)
+        rolled, rolled_counts = _roll_up(sums, counts, axes)
+        return cls(
+            axes=axes,
+            direct=direct,
+            counts=direct_counts,
+            rolled=rolled,
+            rolled_counts=rolled_counts,
+        )
+
+    def _index(self, selectors: dict[str, str]) -> tuple[int | slice, ...]:
+        """Translate ``axis=label`` selectors into an array index."""
+        unknown = set(selectors) - set(AXES)
+        if unknown:
+            raise ValueError(f"Unknown cube axes: {sorted(unknown)}")
+        return tuple(
+            self.axes[name].code(selectors[name]) if name in selectors else slice(None)
+            for name in AXES
+        )
+
+    def select(self, rollup: bool = True, **selectors: str) -> np.ndarray | float:
+        """Return the value (or sub-array over unselected axes) for ``axis=label`` selectors."""
+        array = self.rolled if rollup else self.direct
+        return array[self._index(selectors)]
+
+    def count(self, rollup: bool = True, **selectors: str) -> np.ndarray | int:
+        """Return the number of facts behind a cell (or sub-array) of the cube."""
+        array = self.rolled_counts if rollup else self.counts
+        return array[self._index(selectors)]
+
+    def share(
+        self, topic: str, total_topic: str = "revenue_total", rollup: bool = True
+    ) -> np.ndarray:
+        """Return topic / total over all other axes.
+
+        Like the panel shares, the result is NaN where the total is not positive or where no
+        fact reports the topic.
+        """
+        array, counts = (self.rolled, self.rolled_counts) if rollup else (self.direct, self.counts)
+        topic_axis = AXES.index("topic")
+        topic_code = self.axes["topic"].code(topic)
+        numerator = np.take(array, topic_code, axis=topic_axis)
+        denominator = np.take(array, self.axes["topic"].code(total_topic), axis=topic_axis)
+        reported = np.take(counts, topic_code, axis=topic_axis) > 0
+        return np.divide(
+            numerator,
+            denominator,
+            out=np.full(numerator.shape, np.nan),
+            where=(denominator > 0) & reported,
+        )
+
+    def save(self, path: Path) -> None:
+        """Persist arrays and axis definitions as a compressed ``.npz``."""
+        axis_arrays: dict[str, np.ndarray] = {}
+        for name, axis in self.axes.items():
+            axis_arrays[f"labels_{name}"] = np.array(axis.labels, dtype=str)
+            parents = np.array(sorted(axis.parents.items()), dtype=str)
+            axis_arrays[f"parents_{name}"] = parents.reshape(-1, 2)
+        # Write through a handle: given a path without ``.npz`` numpy would rename the file.
+        with atomic_path(path) as staged, staged.open("wb") as handle:
+            np.savez_compressed(
+                handle,
+                direct=self.direct,
+                counts=self.counts,
+                rolled=self.rolled,
+                rolled_counts=self.rolled_counts,
+                **axis_arrays,
+            )
+
+    @classmethod
+    def load(cls, path: Path) -> FiscalCube:
+        """Load a cube written by ``save``."""
+        with np.load(path) as stored:
+            axes = {
+                name: Axis(
+                    name=name,
+                    labels=tuple(stored[f"labels_{name}"].tolist()),
+                    parents=dict(stored[f"parents_{name}"].tolist()),
+                )
+                for name in AXES
+            }
+            return cls(
+                axes=axes,
+                direct=stored["direct"],
+                counts=stored["counts"],
+                rolled=stored["rolled"],
+                rolled_counts=stored["rolled_counts"],
+            )
+
+
+@timed_stage("cube")
+def run_cube(
+    mode: str, taxonomy_path: Path = TAXONOMY_PATH, gazetteer_path: Path = GAZETTEER_PATH
+) -> FiscalCube:
+    """Build and persist the fiscal cube for auto or verified facts.
+
+    Every fact on the taxonomy axes goes in, including sub-regions and periods outside the
+    panel; the panel's period/topic/region restrictions are selectors applied at query time.
+    """
+    if mode not in {"auto", "verified"}:
+        raise ValueError("mode must be one of {'auto','verified'}")
+
+    input_path = pipeline.AUTO_FACTS_PATH if mode == "auto" else pipeline._resolve_verified_input()
+    if input_path.exists() and input_path.stat().st_size > 0:
+        facts = pd.read_csv(input_path)
+        pipeline.validate_columns(facts)
+    else:
+        facts = pd.DataFrame(columns=pipeline.REQUIRED_COLUMNS)
+
+    cube = FiscalCube.build(facts, load_axes(taxonomy_path, gazetteer_path))
+    cube.save(CUBE_DIR / f"fiscal_cube_{mode}.npz")
+    return cube
+
+
+@instrumented_command("run-songshi-juan186-cube")
+def main(argv: list[str] | None = None) -> None:
+    """CLI wrapper for fiscal cube generation."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--mode", choices=["auto", "verified"], default="verified")
+    parser.add_argument(
+        "--gazetteer",
+        type=Path,
+        default=GAZETTEER_PATH,
+        help="Gazetteer CSV whose prefectures form the lowest region level.",
+    )
+    args = parser.parse_args(argv)
+
+    cube = run_cube(args.mode, gazetteer_path=args.gazetteer)
+    print(f"cube_npz: {CUBE_DIR / f'fiscal_cube_{args.mode}.npz'}")
+    print(f"cube_shape: {cube.direct.shape}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+"""Maintain period-region panel aggregates incrementally from fact deltas."""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+import pipeline_end_to_end as pipeline
+from instrumentation.run_manifest import timed_stage
+from panel.provenance import patch_provenance_index, provenance_path, write_provenance_index
+from storage.atomic import artifact_lock, write_csv, write_parquet
+
+LOGGER = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+PANEL_STATE_DIR = BASE_DIR / "data" / "02_intermediate" / "panel_state"
+
+CELL_KEYS = ["period", "region", "topic"]
+ROW_KEYS = ["period", "region"]
+FACT_KEY_COLUMNS = ["period", "region", "topic", "value"]
+
+
+def _empty_cells() -> pd.DataFrame:
+    """Return an empty cell table with the aggregate schema."""
+    index = pd.MultiIndex.from_tuples([], names=CELL_KEYS)
+    return pd.DataFrame(
+        {
+            "value_sum": pd.Series(dtype=float),
+            "fact_count": pd.Series(dtype="int64"),
+            "supporting_ids": pd.Series(dtype=object),
+        },
+        index=index,
+    )
+
+
+def _aggregate_cells(facts: pd.DataFrame) -> pd.DataFrame:
+    """Aggregate indexed facts into per-cell sums, counts and supporting-id sets."""
+    if facts.empty:
+        return _empty_cells()
+    return facts.rename_axis("extract_id").reset_index().groupby(CELL_KEYS).agg(
+        value_sum=("value", "sum"),
+        fact_count=("value", "size"),
+        supporting_ids=("extract_id", lambda ids: set(ids)),
+    )
+
+
+def _index_rows(facts: pd.DataFrame) -> pd.DataFrame:
+    """Return fact rows keyed by extract_id (last occurrence wins), in file order."""
+    return facts.drop_duplicates("extract_id", keep="last").set_index("extract_id")
+
+
+def _converted(rows: pd.DataFrame, mode: str) -> pd.DataFrame:
+    """Return the panel-eligible ``rows`` converted to target units, keyed by extract_id."""
+    rows = rows.rename_axis("extract_id").reset_index()
+    converted = pipeline._panel_facts(rows, mode=mode)[0]
+    indexed = converted.set_index("extract_id")[FACT_KEY_COLUMNS].copy()
+    indexed["value"] = indexed["value"].astype(float)
+    return indexed
+
+
+def _row_hashes(rows: pd.DataFrame) -> np.ndarray:
+    """Hash each row's values as text, so float/str and NaN/empty renderings compare equal."""
+    return pd.util.hash_pandas_object(rows.fillna("").astype(str), index=False).to_numpy()
+
+
+@dataclass
+class PanelAggregate:
+    """Per-cell panel aggregates plus every fact row (eligible or not) they were built from.
+
+    ``facts`` keeps the facts file's rows keyed by extract_id, in file order, so deltas can be
+    diffed without normalizing the whole file and the side outputs that list every fact
+    can be patched instead of recomputed.
+    """
+
+    mode: str
+    facts: pd.DataFrame
+    cells: pd.DataFrame
+
+    @classmethod
+    def build(cls, facts: pd.DataFrame, mode: str) -> PanelAggregate:
+        """Build aggregates from a full facts table (one grouped pass)."""
+        rows = _index_rows(facts)
+        return cls(mode=mode, facts=rows, cells=_aggregate_cells(_converted(rows, mode)))
+
+    @classmethod
+    def load(cls, state_dir: Path, mode: str) -> PanelAggregate:
+        """Load persisted aggregates written by ``save``."""
+        facts = pd.read_parquet(state_dir / "facts.parquet").set_index("extract_id")
+        cells = pd.read_parquet(state_dir / "cells.parquet").set_index(CELL_KEYS)
+        cells["supporting_ids"] = cells["supporting_ids"].map(set)
+        return cls(mode=mode, facts=facts, cells=cells)
+
+    @staticmethod
+    def exists(state_dir: Path) -> bool:
+        """Return whether ``state_dir`` holds an aggregate in the current (all-rows) layout."""
+        if not (state_dir / "cells.parquet").exists():
+            return False
+        columns = set(pq.read_schema(state_dir / "facts.parquet").names)
+        return set(pipeline.REQUIRED_COLUMNS) <= columns
+
+    def save(self, state_dir: Path) -> None:
+        """Persist facts and cell aggregates as parquet."""
+        write_parquet(self.facts.reset_index(), state_dir / "facts.parquet")
+        cells = self.cells.copy()
+        cells["supporting_ids"] = cells["supporting_ids"].map(sorted)
+        write_parquet(cells.reset_index(), state_dir / "cells.parquet")
+
+    def _accumulate(self, facts: pd.DataFrame, sign: int) -> None:
+        """Add (sign=1) or subtract (sign=-1) the contribution of indexed facts."""
+        if facts.empty:
+            return
+        delta = _aggregate_cells(facts)
+        known = delta.index.intersection(self.cells.index)
+        fresh = delta.index.difference(self.cells.index)
+
+        self.cells.loc[known, "value_sum"] += sign * delta.loc[known, "value_sum"]
+        self.cells.loc[known, "fact_count"] += sign * delta.loc[known, "fact_count"]
+        for key in known:
+            ids = self.cells.at[key, "supporting_ids"]
+            if sign > 0:
+                ids.update(delta.at[key, "supporting_ids"])
+            else:
+                ids.difference_update(delta.at[key, "supporting_ids"])
+        if sign > 0 and len(fresh):
+            self.cells = pd.concat([self.cells, delta.loc[fresh]])
+
+    def apply(
+        self, upserts: pd.DataFrame | None = None, deletes: Iterable[str] = ()
+    ) -> pd.MultiIndex:
+        """Apply fact upserts/deletes and return the touched (period, region) rows.
+
+        Only the upserted and retired rows are normalized. Upserted facts that are no longer
+        panel-eligible for this mode leave the cells but stay in ``facts``. Upserts move to the
+        end of ``facts``, as a promotion upsert moves them in the facts file.
+        """
+        if upserts is None:
+            upserts = pd.DataFrame(columns=pipeline.REQUIRED_COLUMNS)
+        upserts = _index_rows(upserts)
+        retired_ids = pd.Index(list(deletes), dtype=object).union(upserts.index)
+        retired = _converted(self.facts.loc[self.facts.index.intersection(retired_ids)], self.mode)
+        eligible = _converted(upserts, self.mode)
+
+        self._accumulate(retired, sign=-1)
+        self._accumulate(eligible, sign=1)
+        self.cells = self.cells[self.cells["fact_count"] > 0]
+        remaining = self.facts.drop(self.facts.index.intersection(retired_ids))
+        kept = [frame for frame in (remaining, upserts) if not frame.empty]
+        self.facts = pd.concat(kept) if kept else self.facts.iloc[0:0]
+
+        touched = pd.concat([retired[ROW_KEYS], eligible[ROW_KEYS]]).drop_duplicates()
+        LOGGER.info(
+            "Applied %d upserts and %d retirements touching %d panel rows",
+            len(eligible),
+            len(retired),
+            len(touched),
+        )
+        return pd.MultiIndex.from_frame(touched)
+
+    def topic_columns(self) -> list[str]:
+        """Return panel topic columns in the same order ``compute_panel`` emits them."""
+        present = set(self.cells.index.get_level_values("topic"))
+        missing = [topic for topic in pipeline.EXPECTED_TOPIC_COLUMNS if topic not in present]
+        return sorted(present) + missing
+
+    def panel(self, rows: pd.MultiIndex | None = None) -> pd.DataFrame:
+        """Render the wide panel, optionally only for the given (period, region) rows."""
+        cells = self.cells
+        if rows is not None:
+            cells = cells[cells.index.droplevel("topic").isin(rows)]
+        if cells.empty:
+            return pd.DataFrame(columns=pipeline.PANEL_COLUMNS)
+
+        present = set(self.cells.index.get_level_values("topic"))
+        values = cells["value_sum"].unstack("topic").reindex(columns=sorted(present))
+        for topic_name in pipeline.EXPECTED_TOPIC_COLUMNS:
+            if topic_name not in present:
+                values[topic_name] = 0.0
+        members = cells["supporting_ids"].map(list).explode()
+        row_codes = values.index.get_indexer(members.index.droplevel("topic"))
+
+        panel = values.reset_index()
+        panel.columns.name = None
+        panel["supporting_extract_ids"] = pipeline._supporting_ids(row_codes, members, len(panel))
+        for topic_name in ("liangshui", "shangshui"):
+            panel[f"share_{topic_name}_in_total"] = pipeline._safe_divide(
+                panel[topic_name], panel["revenue_total"]
+            )
+        return panel.sort_values(ROW_KEYS).reset_index(drop=True)
+
+
+def diff_facts(applied: pd.DataFrame, current: pd.DataFrame) -> tuple[pd.DataFrame, pd.Index]:
+    """Return (upserts, deletes) turning indexed ``applied`` fact rows into ``current`` rows.
+
+    Rows are compared by a hash of their text, so no fact is normalized to find the delta.
+    """
+    keyed = _index_rows(current)
+    previous = applied.reindex(index=keyed.index, columns=keyed.columns)
+    changed = ~keyed.index.isin(applied.index) | (_row_hashes(keyed) != _row_hashes(previous))
+    upserts = keyed[changed].reset_index()
+    deletes = applied.index.difference(keyed.index)
+    return upserts, deletes
+
+
+def _read_facts(input_path: Path) -> pd.DataFrame:
+    """Read a facts CSV, or an empty facts frame when the file is absent."""
+    if not input_path.exists() or input_path.stat().st_size == 0:
+        return pd.DataFrame(columns=pipeline.REQUIRED_COLUMNS)
+    facts = pd.read_csv(input_path)
+    pipeline.validate_columns(facts)
+    return facts
+
+
+def _patch_panel(
+    output_path: Path, aggregate: PanelAggregate, touched: pd.MultiIndex | None
+) -> pd.DataFrame:
+    """Replace only touched rows of the panel on disk, falling back to a full render."""
+    if touched is None or not output_path.exists() or output_path.stat().st_size == 0:
+        return aggregate.panel()
+
+    existing = pipeline.read_panel_csv(output_path)
+    expected_columns = ["period", "region", *aggregate.topic_columns()]
+    if list(existing.columns[: len(expected_columns)]) != expected_columns:
+        return aggregate.panel()
+
+    untouched = existing[~pd.MultiIndex.from_frame(existing[ROW_KEYS]).isin(touched)]
+    refreshed = aggregate.panel(touched)
+    parts = [frame for frame in (untouched, refreshed) if not frame.empty]
+    if not parts:
+        return pd.DataFrame(columns=pipeline.PANEL_COLUMNS)
+    return pd.concat(parts, ignore_index=True).sort_values(ROW_KEYS).reset_index(drop=True)
+
+
+def _patch_unconverted(
+    output_path: Path, upserts: pd.DataFrame, retired_ids: pd.Index, mode: str
+) -> pd.DataFrame:
+    """Patch the unconverted-units side table: drop retired ids, add unconvertible upserts."""
+    existing = pd.read_csv(output_path, dtype={"extract_id": str})
+    kept = existing[~existing["extract_id"].isin(retired_ids)]
+    fresh = pipeline._panel_facts(upserts, mode=mode)[1]
+    parts = [frame for frame in (kept, fresh) if not frame.empty]
+    return pd.concat(parts, ignore_index=True) if parts else existing
+
+
+def _write_side_outputs(
+    output_path: Path,
+    aggregate: PanelAggregate,
+    upserts: pd.DataFrame | None,
+    retired_ids: pd.Index,
+) -> None:
+    """Write the outputs that list every fact, patching them from the delta when possible.
+
+    ``upserts`` is None after a bootstrap (or when a side output is missing), in which case
+    the output is built from all of the aggregate's facts.
+    """
+    mode = aggregate.mode
+    rows = aggregate.facts.reset_index()
+    unconverted_path = pipeline.unconverted_units_path(output_path)
+    if upserts is not None and unconverted_path.exists() and unconverted_path.stat().st_size:
+        unconverted = _patch_unconverted(unconverted_path, upserts, retired_ids, mode)
+    else:
+        unconverted = pipeline._panel_facts(rows, mode=mode)[1]
+    write_csv(unconverted, unconverted_path)
+
+    if upserts is not None and provenance_path(mode).exists():
+        eligible = pipeline._panel_facts(upserts, mode=mode)[0]
+        patch_provenance_index(mode, eligible, retired_ids, aggregate.facts.index)
+    else:
+        write_provenance_index(mode, pipeline._panel_facts(rows, mode=mode)[0])
+
+    pipeline.write_arrow(rows, pipeline.arrow_path(output_path, "facts"), kind="facts")
+
+
+@timed_stage("panel.incremental")
+def update_panel_mode(
+    mode: str,
+    upserts: pd.DataFrame | None = None,
+    deletes: Iterable[str] = (),
+    state_dir: Path | None = None,
+) -> pd.DataFrame:
+    """Update a mode's panel from fact deltas instead of re-aggregating all facts.
+
+    Explicit ``upserts``/``deletes`` (e.g. from a promotion, which has already written them to
+    the facts file) are applied directly and the facts file is not read. Without them the
+    facts file is read and its rows are diffed against the persisted aggregate by hash. When
+    no aggregate exists yet it is bootstrapped from the facts file in one grouped pass.
+
+    Only the delta is normalized and aggregated: touched panel rows are re-rendered, and the
+    unconverted-units table and the provenance index drop retired ids and add rows for the
+    upserts. Files that cannot be appended in place are still rewritten whole from memory
+    (no re-parsing or re-normalizing): the aggregate state, the provenance index and the
+    facts Arrow export, which is written from the aggregate's fact rows.
+    """
+    if mode not in {"auto", "verified"}:
+        raise ValueError("mode must be one of {'auto','verified'}")
+
+    state_dir = (state_dir or PANEL_STATE_DIR) / mode
+    input_path = pipeline.AUTO_FACTS_PATH if mode == "auto" else pipeline._resolve_verified_input()
+    output_path = pipeline.AUTO_PANEL_PATH if mode == "auto" else pipeline.VERIFIED_PANEL_PATH
+    deletes = list(deletes)
+
+    # The aggregate state and the panel are one read-modify-write unit; concurrent updaters
+    # of the same mode must not interleave between loading the state and publishing the panel.
+    with artifact_lock(output_path):
+        touched: pd.MultiIndex | None = None
+        retired_ids = pd.Index([], dtype=object)
+        if not PanelAggregate.exists(state_dir):
+            facts = _read_facts(input_path)
+            pipeline.validate_rows(facts)
+            aggregate = PanelAggregate.build(facts, mode=mode)
+            upserts = None
+        else:
+            aggregate = PanelAggregate.load(state_dir, mode=mode)
+            if upserts is None and not deletes:
+                upserts, deletes = diff_facts(aggregate.facts, _read_facts(input_path))
+            if upserts is None:
+                upserts = pd.DataFrame(columns=pipeline.REQUIRED_COLUMNS)
+            pipeline.validate_columns(upserts)
+            pipeline.validate_rows(upserts)
+            upserts = upserts.drop_duplicates("extract_id", keep="last")
+            retired_ids = pd.Index(list(deletes), dtype=object).union(upserts["extract_id"])
+            touched = aggregate.apply(upserts, deletes)
+
+        aggregate.save(state_dir)
+        panel = _patch_panel(output_path, aggregate, touched)
+        pipeline.write_panel_csv(panel, output_path)
+        pipeline.write_arrow(panel, pipeline.arrow_path(output_path))
+        _write_side_outputs(output_path, aggregate, upserts, retired_ids)
+        if mode == "verified" and not panel.empty:
+            pipeline.write_panel_csv(panel, pipeline.LEGACY_PANEL_PATH)
+    return panel
@@ -0,0 +1,326 @@
+"""Provenance index from panel cells to fact rows, candidate rows and source text spans."""
+
+from __future__ import annotations
+
+import argparse
+import logging
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from extract.songshi_candidates import SOURCE_URL
+from instrumentation.run_manifest import instrumented_command, timed_stage
+from storage.atomic import atomic_path, write_parquet
+
+LOGGER = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+PROVENANCE_DIR = BASE_DIR / "data" / "02_intermediate" / "provenance"
+CANDIDATES_PATH = BASE_DIR / "data" / "02_intermediate" / "candidates_songshi_juan186.csv"
+# Local text of each source document, keyed by the part of ``source_ref`` before ``#``.
+DOCUMENTS: dict[str, Path] = {
+    SOURCE_URL: BASE_DIR / "data" / "01_raw" / "wikisource" / "songshi" / "juan186.txt",
+}
+
+CELL_KEYS = ["period", "region", "topic"]
+INDEX_COLUMNS = [
+    "period",
+    "region",
+    "topic",
+    "extract_id",
+    "fact_row",
+    "candidate_id",
+    "candidate_row",
+    "source",
+    "document",
+    "char_start",
+    "char_end",
+    "byte_start",
+    "byte_end",
+]
+# One pass per ref: the source, then optional lookaheads for each fragment parameter in any order.
+_REF_PATTERN = (
+    r"^(?P<source>[^#]*)(?:#"
+    r"(?=(?:.*&)?start=(?P<char_start>\d+))?"
+    r"(?=(?:.*&)?end=(?P<char_end>\d+))?"
+    r"(?=(?:.*&)?cid=(?P<candidate_id>[^&]+))?)?"
+)
+# Longest UTF-8 encoding of one code point; bounds the bytes read for context windows.
+_MAX_CHAR_BYTES = 4
+
+
+def parse_source_refs(source_refs: pd.Series) -> pd.DataFrame:
+    """Split ``source_ref`` into ``source``, ``char_start``, ``char_end`` and ``candidate_id``."""
+    parts = source_refs.fillna("").astype(str).str.extract(_REF_PATTERN)
+    parts["char_start"] = pd.to_numeric(parts["char_start"])
+    parts["char_end"] = pd.to_numeric(parts["char_end"])
+    return parts
+
+
+def _byte_offsets(path: Path) -> np.ndarray:
+    """Return the UTF-8 byte offset of every character position (plus the end) of a text file."""
+    text = path.read_bytes().decode("utf-8")
+    code_points = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+    widths = 1 + (code_points >= 0x80) + (code_points >= 0x800) + (code_points >= 0x10000)
+    return np.concatenate([[0], np.cumsum(widths, dtype=np.int64)])
+
+
+def build_provenance_index(
+    facts: pd.DataFrame,
+    candidates: pd.DataFrame | None = None,
+    documents: dict[str, Path] | None = None,
+) -> pd.DataFrame:
+    """Return one index row per fact, sorted by cell and extract id.
+
+    ``fact_row`` is the fact's index label (its row in the facts file when read with a default
+    index). Facts are joined to candidates on the ``cid`` in ``source_ref``; offsets come from
+    the candidate row, falling back to ``start``/``end`` in ``source_ref``. Character offsets are
+    translated once to byte offsets so spans can be read with a seek. Unresolvable rows keep
+    ``-1`` offsets and an empty ``document``.
+    """
+    documents = DOCUMENTS if documents is None else documents
+    refs = parse_source_refs(facts["source_ref"])
+    index = pd.DataFrame(
+        {
+            **{key: facts[key].astype(str) for key in CELL_KEYS},
+            "extract_id": facts["extract_id"].astype(str),
+            "fact_row": facts.index.to_numpy(dtype=np.int64),
+            "candidate_id": refs["candidate_id"],
+            "source": refs["source"],
+        }
+    ).reset_index(drop=True)
+    char_start = refs["char_start"].to_numpy(dtype=float)
+    char_end = refs["char_end"].to_numpy(dtype=float)
+    candidate_row = np.full(len(index), -1, dtype=np.int64)
+
+    if candidates is not None and not candidates.empty:
+        lookup = pd.Index(candidates["candidate_id"].astype(str))
+        if not lookup.is_unique:
+            lookup = lookup.drop_duplicates()
+        positions = lookup.get_indexer(index["candidate_id"].fillna(""))
+        found = positions >= 0
+        rows = candidates.index.to_numpy(dtype=np.int64)
+        candidate_row[found] = rows[positions[found]]
+        char_start[found] = candidates["char_start"].to_numpy(dtype=float)[positions[found]]
+        char_end[found] = candidates["char_end"].to_numpy(dtype=float)[positions[found]]
+
+    byte_start = np.full(len(index), -1, dtype=np.int64)
+    byte_end = np.full(len(index), -1, dtype=np.int64)
+    document = np.full(len(index), "", dtype=object)
+    has_span = ~np.isnan(char_start) & ~np.isnan(char_end)
+    for source, path in documents.items():
+        rows = np.flatnonzero(has_span & (index["source"] == source).to_numpy())
+        if len(rows) == 0 or not path.exists():
+            continue
+        offsets = _byte_offsets(path)
+        starts = char_start[rows].astype(np.int64)
+        ends = char_end[rows].astype(np.int64)
+        inside = (starts >= 0) & (starts <= ends) & (ends < len(offsets))
+        rows, starts, ends = rows[inside], starts[inside], ends[inside]
+        byte_start[rows] = offsets[starts]
+        byte_end[rows] = offsets[ends]
+        document[rows] = str(path)
+
+    index["candidate_row"] = candidate_row
+    index["document"] = document
+    index["char_start"] = np.where(has_span, np.nan_to_num(char_start), -1).astype(np.int64)
+    index["char_end"] = np.where(has_span, np.nan_to_num(char_end), -1).astype(np.int64)
+    index["byte_start"] = byte_start
+    index["byte_end"] = byte_end
+    unresolved = int((byte_start < 0).sum())
+    if unresolved:
+        LOGGER.warning("Provenance index has %d facts without a readable text span", unresolved)
+    return index[INDEX_COLUMNS].sort_values([*CELL_KEYS, "extract_id"], ignore_index=True)
+
+
+def provenance_path(mode: str) -> Path:
+    """Return the provenance index path of a mode."""
+    return PROVENANCE_DIR / f"provenance_{mode}.parquet"
+
+
+def _read_candidates(candidates_path: Path) -> pd.DataFrame | None:
+    """Read only the candidate columns the index needs, or None when there are no candidates."""
+    if not candidates_path.exists() or candidates_path.stat().st_size == 0:
+        return None
+    return pd.read_csv(
+        candidates_path,
+        usecols=["candidate_id", "char_start", "char_end"],
+        dtype={"candidate_id": str},
+    )
+
+
+@timed_stage("provenance")
+def write_provenance_index(
+    mode: str,
+    facts: pd.DataFrame,
+    candidates_path: Path | None = None,
+    documents: dict[str, Path] | None = None,
+) -> pd.DataFrame:
+    """Build the provenance index of a mode's panel facts and write it as Parquet."""
+    index = build_provenance_index(
+        facts, _read_candidates(candidates_path or CANDIDATES_PATH), documents
+    )
+    output_path = provenance_path(mode)
+    write_parquet(index, output_path)
+    return index
+
+
+@timed_stage("provenance")
+def patch_provenance_index(
+    mode: str,
+    upserts: pd.DataFrame,
+    retired_ids: pd.Index,
+    fact_order: pd.Index,
+    candidates_path: Path | None = None,
+    documents: dict[str, Path] | None = None,
+) -> None:
+    """Patch a mode's persisted index: drop ``retired_ids`` and index the panel ``upserts``.
+
+    Only upserted facts are joined to candidates and translated to byte offsets; the rest of
+    the index is filtered, merged and re-sorted as an Arrow table. ``fact_order`` lists every
+    extract id in facts-file order and sets ``fact_row``, since deletes shift later rows.
+    """
+    output_path = provenance_path(mode)
+    existing = pq.read_table(output_path).replace_schema_metadata(None)
+    retired = pa.array(retired_ids.astype(str), type=pa.string())
+    kept = existing.filter(pc.invert(pc.is_in(existing["extract_id"], value_set=retired)))
+    fresh = build_provenance_index(
+        upserts, _read_candidates(candidates_path or CANDIDATES_PATH), documents
+    )
+    fresh_table = pa.Table.from_pandas(fresh, preserve_index=False).replace_schema_metadata(None)
+    table = pa.concat_tables([kept, fresh_table], promote_options="permissive")
+    fact_rows = fact_order.get_indexer(table["extract_id"].to_numpy(zero_copy_only=False))
+    table = table.set_column(
+        table.schema.get_field_index("fact_row"), "fact_row", pa.array(fact_rows, pa.int64())
+    )
+    table = table.sort_by([(key, "ascending") for key in [*CELL_KEYS, "extract_id"]])
+    with atomic_path(output_path) as staged:
+        pq.write_table(table, staged)
+
+
+def _read_window(handle, byte_start: int, byte_end: int, context: int) -> tuple[str, str, str]:
+    """Return (before, span, after) text around a byte span, ``context`` characters each side."""
+    window_start = max(byte_start - context * _MAX_CHAR_BYTES, 0)
+    handle.seek(window_start)
+    window = handle.read(byte_end + context * _MAX_CHAR_BYTES - window_start)
+    before = window[: byte_start - window_start].lstrip(bytes(range(0x80, 0xC0)))
+    span = window[byte_start - window_start : byte_end - window_start]
+    after = window[byte_end - window_start :]
+    before_text = before.decode("utf-8", errors="ignore")[-context:] if context else ""
+    after_text = after.decode("utf-8", errors="ignore")[:context] if context else ""
+    return before_text, span.decode("utf-8"), after_text
+
+
+class ProvenanceIndex:
+    """In-memory provenance index with hash lookups by cell and by extract id."""
+
+    def __init__(self, table: pd.DataFrame) -> None:
+        self.table = table.reset_index(drop=True)
+        self._extracts = pd.Index(self.table["extract_id"])
+        if self.table.empty:
+            self._cells: dict[tuple[str, str, str], slice] = {}
+            return
+        # The table is sorted by cell, so each cell is one contiguous slice.
+        codes = self.table.groupby(CELL_KEYS, sort=False).ngroup().to_numpy()
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        ends = np.r_[starts[1:], len(codes)]
+        keys = self.table.loc[starts, CELL_KEYS].itertuples(index=False, name=None)
+        self._cells = {
+            key: slice(start, end) for key, start, end in zip(keys, starts, ends, strict=True)
+        }
+
+    @classmethod
+    def load(cls, mode: str = "verified", path: Path | None = None) -> ProvenanceIndex:
+        """Load a mode's persisted index."""
+        return cls(pd.read_parquet(path or provenance_path(mode)))
+
+    def facts(self, period: str, region: str, topic: str) -> pd.DataFrame:
+        """Return the index rows of one panel cell (empty when the cell has no facts)."""
+        cell = self._cells.get((period, region, topic))
+        return self.table.iloc[cell] if cell is not None else self.table.iloc[0:0]
+
+    def extract(self, extract_id: str) -> pd.DataFrame:
+        """Return the index rows of one extract id."""
+        positions = self._extracts.get_indexer_for([extract_id])
+        return self.table.iloc[positions[positions >= 0]]
+
+    def spans(self, rows: pd.DataFrame, context: int = 0) -> pd.DataFrame:
+        """Return ``rows`` with ``text`` and its ``context_before``/``context_after`` from disk."""
+        texts = {name: [""] * len(rows) for name in ("context_before", "text", "context_after")}
+        readable = rows.reset_index(drop=True)
+        readable = readable[readable["byte_start"] >= 0]
+        for document, group in readable.groupby("document", sort=False):
+            with Path(document).open("rb") as handle:
+                for position, row in zip(group.index, group.itertuples(), strict=True):
+                    before, text, after = _read_window(
+                        handle, row.byte_start, row.byte_end, context
+                    )
+                    texts["context_before"][position] = before
+                    texts["text"][position] = text
+                    texts["context_after"][position] = after
+        return rows.assign(**texts)
+
+
+def explain(
+    period: str,
+    region: str,
+    topic: str,
+    mode: str = "verified",
+    context: int = 0,
+    index: ProvenanceIndex | None = None,
+) -> pd.DataFrame:
+    """Resolve a panel cell to its facts, candidates and source text spans."""
+    index = index or ProvenanceIndex.load(mode)
+    return index.spans(index.facts(period, region, topic), context=context)
+
+
+def _rebuild(mode: str) -> None:
+    """Rebuild a mode's index from its facts file, filtered like the panel input."""
+    import pipeline_end_to_end as pipeline
+
+    facts_path = pipeline.AUTO_FACTS_PATH if mode == "auto" else pipeline._resolve_verified_input()
+    if facts_path.exists() and facts_path.stat().st_size > 0:
+        facts = pd.read_csv(facts_path)
+    else:
+        facts = pd.DataFrame(columns=pipeline.REQUIRED_COLUMNS)
+    converted, _ = pipeline._panel_facts(facts, mode=mode)
+    write_provenance_index(mode, converted)
+
+
+@instrumented_command("run-songshi-juan186-explain")
+def main(argv: list[str] | None = None) -> None:
+    """CLI wrapper for resolving a panel cell to its source text spans."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--mode", choices=["auto", "verified"], default="verified")
+    parser.add_argument("--period", required=True)
+    parser.add_argument("--region", required=True)
+    parser.add_argument("--topic", required=True)
+    parser.add_argument("--context", type=int, default=10, help="Characters of context per side.")
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Rebuild the index from the mode's facts before resolving the cell.",
+    )
+    args = parser.parse_args(argv)
+
+    if args.rebuild or not provenance_path(args.mode).exists():
+        _rebuild(args.mode)
+    spans = explain(args.period, args.region, args.topic, mode=args.mode, context=args.context)
+    print(f"explain_cell: {args.period}/{args.region}/{args.topic}")
+    print(f"explain_facts: {len(spans)}")
+    for row in spans.itertuples():
+        location = row.source
+        if row.char_start >= 0:
+            location = f"{row.source}#{row.char_start}-{row.char_end}"
+        text = "(no text span)"
+        if row.text:
+            text = f"{row.context_before}[{row.text}]{row.context_after}"
+        print(f"explain_span: {row.extract_id} {location} {text}")
+
+
+if __name__ == "__main__":
+    main()
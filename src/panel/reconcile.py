@@ -0,0 +1,187 @@
+"""Reconcile facts from different sources that report the same quantity."""
+
+from __future__ import annotations
+
+import argparse
+import logging
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+import pipeline_end_to_end as pipeline
+from instrumentation.run_manifest import current_stage, instrumented_command, timed_stage
+from panel.units import load_unit_conversions, normalize_units
+from storage.atomic import write_csv
+
+LOGGER = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+RECONCILIATION_DIR = BASE_DIR / "data" / "03_primary"
+
+PARTITION_KEYS = ["period", "topic", "unit"]
+CELL_KEYS = ["period", "region", "topic", "unit"]
+RECONCILIATION_COLUMNS = [
+    "group_id",
+    "period",
+    "topic",
+    "unit",
+    "region",
+    "value",
+    "extract_id",
+    "source",
+    "source_ref",
+    "group_size",
+    "group_sources",
+    "group_min",
+    "group_max",
+    "status",
+    "conflict",
+]
+DEFAULT_REL_TOL = 0.01
+
+
+def source_of(source_refs: pd.Series) -> pd.Series:
+    """Return the source document of each ``source_ref`` (the part before ``#``)."""
+    refs = pa.array(source_refs.astype(str), type=pa.string())
+    sources = pc.replace_substring_regex(refs, pattern="#.*", replacement="", max_replacements=1)
+    return pd.Series(sources.to_numpy(zero_copy_only=False), index=source_refs.index)
+
+
+def _distinct_per_key(keys: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Return, for each row, how many distinct ``values`` share its integer ``key``."""
+    width = np.int64(values.max()) + 1
+    pairs = np.unique(keys.astype(np.int64) * width + values)
+    return np.bincount(pairs // width, minlength=int(keys.max()) + 1)[keys]
+
+
+def _normalized(facts: pd.DataFrame) -> pd.DataFrame:
+    """Convert values to topic target units where possible; keep the rest in their own unit."""
+    converted, unconverted = normalize_units(facts, load_unit_conversions())
+    parts = [frame for frame in (converted, unconverted) if not frame.empty]
+    if not parts:
+        return facts.iloc[0:0]
+    return pd.concat(parts)[pipeline.REQUIRED_COLUMNS]
+
+
+def reconcile_facts(
+    facts: pd.DataFrame,
+    rel_tol: float = DEFAULT_REL_TOL,
+    abs_tol: float = 0.0,
+) -> pd.DataFrame:
+    """Group facts whose values agree within tolerance inside each (period, topic, unit).
+
+    Facts are sorted once by partition code and value; a sorted-window pass starts a new group
+    wherever the gap to the previous value exceeds ``max(abs_tol, rel_tol * value)``, so the
+    work is one sort plus linear scans rather than a pairwise merge. Groups chain: members are
+    each within tolerance of a neighbour, and ``group_min``/``group_max`` show the spread.
+
+    ``status`` is ``match`` when a group holds facts from at least two sources. ``conflict``
+    flags every fact of a (period, region, topic, unit) cell where two or more sources report
+    values that fall into different groups.
+    """
+    values = pd.to_numeric(facts["value"], errors="coerce")
+    valid = facts.assign(value=values).dropna(subset=["value"])
+    if valid.empty:
+        return pd.DataFrame(columns=RECONCILIATION_COLUMNS)
+
+    partition = valid.groupby(PARTITION_KEYS, sort=False).ngroup().to_numpy()
+    order = np.lexsort((valid["value"].to_numpy(dtype=float), partition))
+    ordered = valid.iloc[order].reset_index(drop=True)
+    ordered["source"] = source_of(ordered["source_ref"])
+    partition = partition[order]
+
+    value = ordered["value"].to_numpy(dtype=float)
+    tolerance = np.maximum(abs_tol, rel_tol * np.abs(value))
+    continues = np.r_[False, (partition[1:] == partition[:-1]) & (np.diff(value) <= tolerance[1:])]
+    group = np.cumsum(~continues) - 1
+    starts = np.flatnonzero(~continues)
+    ends = np.r_[starts[1:] - 1, len(value) - 1]
+    source_codes = pd.factorize(ordered["source"])[0]
+    cells = ordered.groupby(CELL_KEYS, sort=False).ngroup().to_numpy()
+
+    ordered["group_id"] = group
+    ordered["group_size"] = np.bincount(group)[group]
+    ordered["group_sources"] = _distinct_per_key(group, source_codes)
+    ordered["group_min"] = value[starts][group]
+    ordered["group_max"] = value[ends][group]
+    ordered["status"] = np.where(ordered["group_sources"] > 1, "match", "unmatched")
+    ordered["conflict"] = (_distinct_per_key(cells, group) > 1) & (
+        _distinct_per_key(cells, source_codes) > 1
+    )
+    LOGGER.info(
+        "Reconciled %d facts into %d groups (%d matched facts, %d in conflicting cells)",
+        len(ordered),
+        int(group[-1]) + 1,
+        int((ordered["status"] == "match").sum()),
+        int(ordered["conflict"].sum()),
+    )
+    return ordered[RECONCILIATION_COLUMNS]
+
+
+def reconciliation_path(mode: str) -> Path:
+    """Return the reconciliation table path of a mode."""
+    return RECONCILIATION_DIR / f"reconciliation_{mode}.csv"
+
+
+def _read_inputs(mode: str, inputs: list[Path] | None) -> pd.DataFrame:
+    """Read the mode's facts (or explicit fact files) and validate required columns."""
+    if not inputs:
+        default = pipeline.AUTO_FACTS_PATH if mode == "auto" else pipeline._resolve_verified_input()
+        inputs = [default]
+    frames = []
+    for path in inputs:
+        if path.exists() and path.stat().st_size > 0:
+            frame = pd.read_csv(path)
+            pipeline.validate_columns(frame)
+            frames.append(frame[pipeline.REQUIRED_COLUMNS])
+    if not frames:
+        return pd.DataFrame(columns=pipeline.REQUIRED_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+@timed_stage("reconcile")
+def run_reconciliation(
+    mode: str,
+    inputs: list[Path] | None = None,
+    rel_tol: float = DEFAULT_REL_TOL,
+    abs_tol: float = 0.0,
+) -> pd.DataFrame:
+    """Reconcile a mode's facts and write ``reconciliation_<mode>.csv``."""
+    if mode not in {"auto", "verified"}:
+        raise ValueError("mode must be one of {'auto','verified'}")
+
+    facts = _read_inputs(mode, inputs)
+    current_stage().rows_in = len(facts)
+    table = reconcile_facts(_normalized(facts), rel_tol=rel_tol, abs_tol=abs_tol)
+    output_path = reconciliation_path(mode)
+    write_csv(table, output_path)
+    return table
+
+
+@instrumented_command("run-songshi-juan186-reconcile")
+def main(argv: list[str] | None = None) -> None:
+    """CLI wrapper for cross-source fact reconciliation."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--mode", choices=["auto", "verified"], default="verified")
+    parser.add_argument(
+        "--facts",
+        type=Path,
+        nargs="+",
+        default=None,
+        help="Fact CSVs to reconcile instead of the mode's default facts file.",
+    )
+    parser.add_argument("--rel-tol", type=float, default=DEFAULT_REL_TOL)
+    parser.add_argument("--abs-tol", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    table = run_reconciliation(args.mode, args.facts, rel_tol=args.rel_tol, abs_tol=args.abs_tol)
+    print(f"reconciliation_csv: {reconciliation_path(args.mode)}")
+    print(f"reconciliation_matched_facts: {int((table['status'] == 'match').sum())}")
+    print(f"reconciliation_conflict_facts: {int(table['conflict'].sum())}")
+
+
+if __name__ == "__main__":
+    main()
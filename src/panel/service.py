@@ -0,0 +1,256 @@
+"""Local read-only HTTP service for filtered panel and fact slices.
+
+Routes (GET only):
+
+- ``/health``: loaded modes and their content hashes.
+- ``/panel/<mode>?period=..&region=..&topic=..&format=json|arrow``: panel rows; ``topic``
+  projects the topic value and share columns.
+- ``/facts/<mode>?period=..&region=..&topic=..&format=json|arrow``: fact rows.
+
+Filters take comma-separated values. Responses carry an ETag derived from the content hash of
+the mode's panel and facts files, and ``If-None-Match`` yields ``304 Not Modified``. Files are
+re-stat'ed on each request and reloaded when the pipeline rewrites them.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import io
+import json
+import logging
+import threading
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+import pyarrow as pa
+
+import pipeline_end_to_end as pipeline
+
+LOGGER = logging.getLogger(__name__)
+
+MODES = ("auto", "verified")
+FILTER_KEYS = ("period", "region", "topic")
+JSON_TYPE = "application/json"
+ARROW_TYPE = "application/vnd.apache.arrow.stream"
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8186
+MAX_CACHED_RESPONSES = 256
+
+
+def _default_paths(mode: str) -> tuple[Path, Path]:
+    """Return the (panel, facts) paths a mode's pipeline run writes and reads."""
+    if mode == "auto":
+        return pipeline.AUTO_PANEL_PATH, pipeline.AUTO_FACTS_PATH
+    return pipeline.VERIFIED_PANEL_PATH, pipeline._resolve_verified_input()
+
+
+def _stat_key(path: Path) -> tuple[int, int] | None:
+    """Return (mtime_ns, size) of a file, or None when it is missing."""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+@dataclass
+class ModeData:
+    """One mode's panel and facts as loaded into memory."""
+
+    panel: pd.DataFrame
+    facts: pd.DataFrame
+    content_hash: str
+    stat_keys: tuple[tuple[int, int] | None, ...]
+    responses: dict[tuple, tuple[str, bytes]] = field(default_factory=dict)
+
+
+class PanelStore:
+    """Keeps each mode's panel and facts in memory, reloading them when their files change."""
+
+    def __init__(self, paths: dict[str, tuple[Path, Path]] | None = None) -> None:
+        self._paths = paths
+        self._modes: dict[str, ModeData] = {}
+        self._lock = threading.Lock()
+
+    def paths(self, mode: str) -> tuple[Path, Path]:
+        """Return the (panel, facts) paths served for a mode."""
+        return self._paths[mode] if self._paths else _default_paths(mode)
+
+    def get(self, mode: str) -> ModeData:
+        """Return a mode's data, reloading it first if either file changed on disk."""
+        panel_path, facts_path = self.paths(mode)
+        stat_keys = (_stat_key(panel_path), _stat_key(facts_path))
+        with self._lock:
+            data = self._modes.get(mode)
+            if data is None or data.stat_keys != stat_keys:
+                data = self._load(mode, panel_path, facts_path, stat_keys)
+                self._modes[mode] = data
+            return data
+
+    @staticmethod
+    def _load(
+        mode: str, panel_path: Path, facts_path: Path, stat_keys: tuple[tuple[int, int] | None, ...]
+    ) -> ModeData:
+        # Parse the exact bytes that were hashed, so the ETag always matches the served data.
+        panel_raw = panel_path.read_bytes() if stat_keys[0] else b""
+        facts_raw = facts_path.read_bytes() if stat_keys[1] else b""
+        digest = hashlib.sha256(len(panel_raw).to_bytes(8, "little") + panel_raw + facts_raw)
+        panel = (
+            pipeline.read_panel_csv(io.BytesIO(panel_raw))
+            if panel_raw.strip()
+            else pd.DataFrame(columns=pipeline.PANEL_COLUMNS)
+        )
+        facts = (
+            pd.read_csv(io.BytesIO(facts_raw))
+            if facts_raw.strip()
+            else pd.DataFrame(columns=pipeline.REQUIRED_COLUMNS)
+        )
+        LOGGER.info("Loaded %s panel (%d rows) and facts (%d rows)", mode, len(panel), len(facts))
+        return ModeData(panel, facts, digest.hexdigest(), stat_keys)
+
+
+def _filter(frame: pd.DataFrame, filters: dict[str, list[str]], columns: list[str]) -> pd.DataFrame:
+    """Return rows whose ``columns`` values are in the requested filter values."""
+    mask = pd.Series(True, index=frame.index)
+    for key in columns:
+        if key in filters and key in frame.columns:
+            mask &= frame[key].astype(str).isin(filters[key])
+    return frame[mask]
+
+
+def panel_slice(panel: pd.DataFrame, filters: dict[str, list[str]]) -> pd.DataFrame:
+    """Filter panel rows by period/region and project the requested topic columns."""
+    rows = _filter(panel, filters, ["period", "region"])
+    if "topic" not in filters:
+        return rows
+    topics = [topic for topic in filters["topic"] if topic in rows.columns]
+    shares = [f"share_{topic}_in_total" for topic in topics]
+    shares = [share for share in shares if share in rows.columns]
+    return rows[["period", "region", *topics, "supporting_extract_ids", *shares]]
+
+
+def facts_slice(facts: pd.DataFrame, filters: dict[str, list[str]]) -> pd.DataFrame:
+    """Filter fact rows by period/region/topic."""
+    return _filter(facts, filters, list(FILTER_KEYS))
+
+
+def encode(frame: pd.DataFrame, fmt: str) -> tuple[str, bytes]:
+    """Return (content type, body) of a frame as JSON records or an Arrow IPC stream."""
+    table = pa.Table.from_pandas(frame.reset_index(drop=True), preserve_index=False)
+    if fmt == "arrow":
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return ARROW_TYPE, sink.getvalue().to_pybytes()
+    return JSON_TYPE, json.dumps(table.to_pylist(), ensure_ascii=False).encode("utf-8")
+
+
+class PanelRequestHandler(BaseHTTPRequestHandler):
+    """Serve panel and fact slices from the server's ``PanelStore``."""
+
+    server_version = "SongPanel/1"
+
+    def do_GET(self) -> None:  # noqa: N802 (http.server naming)
+        url = urlsplit(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        query = {key: ",".join(values).split(",") for key, values in parse_qs(url.query).items()}
+        fmt = query.pop("format", ["json"])[0]
+
+        if parts == ["health"]:
+            body = {mode: self.server.store.get(mode).content_hash for mode in MODES}
+            self._send(HTTPStatus.OK, JSON_TYPE, json.dumps(body).encode("utf-8"))
+            return
+        if len(parts) != 2 or parts[0] not in {"panel", "facts"} or parts[1] not in MODES:
+            self._error(HTTPStatus.NOT_FOUND, f"unknown route: {url.path}")
+            return
+        if fmt not in {"json", "arrow"}:
+            self._error(HTTPStatus.BAD_REQUEST, "format must be json or arrow")
+            return
+
+        kind, mode = parts
+        filters = {key: sorted(set(query[key])) for key in FILTER_KEYS if key in query}
+        data = self.server.store.get(mode)
+        filter_key = tuple(sorted((key, tuple(values)) for key, values in filters.items()))
+        cache_key = (kind, fmt, filter_key)
+        digest = hashlib.sha256(f"{data.content_hash}|{cache_key}".encode()).hexdigest()
+        etag = f'"{digest[:32]}"'
+        if etag in {tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")}:
+            self._send(HTTPStatus.NOT_MODIFIED, None, b"", etag)
+            return
+
+        cached = data.responses.get(cache_key)
+        if cached is None:
+            frame = data.panel if kind == "panel" else data.facts
+            sliced = panel_slice(frame, filters) if kind == "panel" else facts_slice(frame, filters)
+            cached = encode(sliced, fmt)
+            if len(data.responses) >= MAX_CACHED_RESPONSES:
+                data.responses.clear()
+            data.responses[cache_key] = cached
+        self._send(HTTPStatus.OK, cached[0], cached[1], etag)
+
+    def _send(
+        self, status: HTTPStatus, content_type: str | None, body: bytes, etag: str | None = None
+    ) -> None:
+        self.send_response(status)
+        if content_type:
+            self.send_header("Content-Type", content_type)
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def _error(self, status: HTTPStatus, message: str) -> None:
+        self._send(status, JSON_TYPE, json.dumps({"error": message}).encode("utf-8"))
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        LOGGER.debug("%s - %s", self.address_string(), format % args)
+
+
+class PanelServer(ThreadingHTTPServer):
+    """Threaded HTTP server sharing one ``PanelStore`` across request handlers."""
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], store: PanelStore | None = None) -> None:
+        super().__init__(address, PanelRequestHandler)
+        self.store = store or PanelStore()
+
+
+def make_server(
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    store: PanelStore | None = None,
+) -> PanelServer:
+    """Return a server bound to ``host:port`` (``port=0`` picks a free port)."""
+    return PanelServer((host, port), store)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """CLI wrapper for the local panel query service (long-lived, so no run manifest)."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args(argv)
+
+    server = make_server(args.host, args.port)
+    print(f"panel_service_url: http://{server.server_address[0]}:{server.server_address[1]}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""Monte Carlo uncertainty bands for panel values and shares."""
+
+from __future__ import annotations
+
+import argparse
+import logging
+from dataclasses import dataclass
+from functools import cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import yaml
+
+import pipeline_end_to_end as pipeline
+from instrumentation.run_manifest import current_stage, instrumented_command, timed_stage
+from storage.atomic import write_csv
+
+LOGGER = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+UNCERTAINTY_CONFIG_PATH = BASE_DIR / "metadata" / "uncertainty.yml"
+UNCERTAINTY_DIR = BASE_DIR / "data" / "03_primary"
+
+# Optional fact columns: pipe-joined alternative readings of the fact's value (in the fact's
+# original unit), and a label shared by facts that are mutually exclusive readings of one figure.
+ALTERNATIVES_COLUMN = "value_alternatives"
+ALTERNATIVE_GROUP_COLUMN = "alternative_group"
+TOPICS = pipeline.EXPECTED_TOPIC_COLUMNS
+SHARES = {
+    "share_liangshui_in_total": ("liangshui", "revenue_total"),
+    "share_shangshui_in_total": ("shangshui", "revenue_total"),
+}
+# Upper bound on draws x facts elements sampled at once.
+MAX_BATCH_ELEMENTS = 20_000_000
+
+
+@dataclass(frozen=True)
+class UncertaintyModel:
+    """Sampling settings loaded from ``uncertainty.yml``."""
+
+    relative_sd: dict[str, float]
+    default_relative_sd: float
+    draws: int
+    seed: int
+    percentiles: tuple[float, ...]
+
+
+@cache
+def load_uncertainty_model(config_path: Path = UNCERTAINTY_CONFIG_PATH) -> UncertaintyModel:
+    """Load per-confidence relative spreads and default draw settings."""
+    content = yaml.safe_load(config_path.read_text(encoding="utf-8"))
+    return UncertaintyModel(
+        relative_sd={str(k): float(v) for k, v in (content.get("relative_sd") or {}).items()},
+        default_relative_sd=float(content.get("default_relative_sd", 0.0)),
+        draws=int(content.get("draws", 10_000)),
+        seed=int(content.get("seed", 0)),
+        percentiles=tuple(float(q) for q in content.get("percentiles", [5, 50, 95])),
+    )
+
+
+def _readings(facts: pd.DataFrame) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return (flat reading values, per-fact offsets, per-fact counts).
+
+    The first reading of a fact is its value; alternatives follow, rescaled by the same factor
+    unit normalization applied to the value.
+    """
+    values = facts["value"].to_numpy(dtype=float)
+    if ALTERNATIVES_COLUMN not in facts.columns:
+        return values, np.arange(len(facts)), np.ones(len(facts), dtype=np.int64)
+
+    original = facts.get("value_original", facts["value"])
+    original = pd.to_numeric(original, errors="coerce").to_numpy()
+    scale = np.divide(values, original, out=np.ones_like(values), where=original != 0)
+    alternatives = facts[ALTERNATIVES_COLUMN].fillna("").astype(str).str.split("|")
+    alternatives.index = np.arange(len(facts))
+    exploded = pd.to_numeric(alternatives.explode(), errors="coerce").dropna()
+    owners = exploded.index.to_numpy(dtype=np.int64)
+
+    readings = pd.DataFrame(
+        {
+            "fact": np.r_[np.arange(len(facts)), owners],
+            "value": np.r_[values, exploded.to_numpy(dtype=float) * scale[owners]],
+        }
+    ).sort_values("fact", kind="stable")
+    counts = np.bincount(readings["fact"].to_numpy(), minlength=len(facts))
+    return readings["value"].to_numpy(), np.cumsum(counts) - counts, counts
+
+
+def _groups(facts: pd.DataFrame) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return (group code, rank within group, group sizes); ungrouped facts are singletons."""
+    n = len(facts)
+    labels = facts[ALTERNATIVE_GROUP_COLUMN] if ALTERNATIVE_GROUP_COLUMN in facts.columns else None
+    if labels is None or labels.isna().all():
+        return np.arange(n), np.zeros(n, dtype=np.int64), np.ones(n, dtype=np.int64)
+    codes, uniques = pd.factorize(labels.astype("string"))
+    singles = codes < 0
+    codes[singles] = len(uniques) + np.arange(int(singles.sum()))
+    ranks = pd.Series(codes).groupby(codes).cumcount().to_numpy()
+    return codes, ranks, np.bincount(codes)
+
+
+def _columns(mask: np.ndarray) -> slice | np.ndarray:
+    """Return column positions where ``mask`` holds, or a full slice when it holds everywhere."""
+    return slice(None) if mask.all() else np.flatnonzero(mask)
+
+
+def _width(columns: slice | np.ndarray, n: int) -> int:
+    """Return how many columns a ``_columns`` selection covers."""
+    return n if isinstance(columns, slice) else len(columns)
+
+
+def sample_panel(
+    facts: pd.DataFrame,
+    draws: int,
+    model: UncertaintyModel,
+    seed: int | None = None,
+) -> tuple[pd.DataFrame, np.ndarray]:
+    """Sample panel realizations; return (cells, draws x cells matrix of summed values).
+
+    Per draw, each fact takes one of its readings uniformly, each alternative group keeps one
+    member uniformly, and values get mean-one lognormal noise with the fact's confidence-tier
+    sigma. Facts are sorted by cell so ``np.add.reduceat`` sums a whole draws x facts batch
+    into cells at once; batches are bounded by ``MAX_BATCH_ELEMENTS``.
+    """
+    cell_keys = ["period", "region", "topic"]
+    facts = facts.sort_values(cell_keys, kind="stable").reset_index(drop=True)
+    n = len(facts)
+    cell_codes = facts.groupby(cell_keys, sort=False).ngroup().to_numpy()
+    boundaries = np.r_[True, cell_codes[1:] != cell_codes[:-1]] if n else np.zeros(0, dtype=bool)
+    cell_starts = np.flatnonzero(boundaries)
+    cells = facts.loc[cell_starts, cell_keys].reset_index(drop=True)
+
+    readings, offsets, counts = _readings(facts)
+    groups, ranks, group_sizes = _groups(facts)
+    sigma = facts["confidence"].astype(str).map(model.relative_sd).fillna(model.default_relative_sd)
+    sigma = sigma.to_numpy(dtype=np.float32)
+    # Only facts that can vary in a draw get random numbers.
+    multi_reading = _columns(counts > 1)
+    noisy = _columns(sigma > 0)
+    multi_member = np.flatnonzero(group_sizes > 1)
+    grouped = _columns(group_sizes[groups] > 1)
+    group_slot = np.searchsorted(multi_member, groups[grouped])
+    base = readings[offsets].astype(np.float32)
+
+    rng = np.random.default_rng(model.seed if seed is None else seed)
+    sums = np.zeros((draws, len(cells)))
+    batch = max(1, MAX_BATCH_ELEMENTS // max(n, 1))
+    for start in range(0, draws if n else 0, batch):
+        size = min(batch, draws - start)
+        values = np.repeat(base[None, :], size, axis=0)
+        if _width(multi_reading, n):
+            column_counts = counts[multi_reading]
+            uniform = rng.random((size, len(column_counts)), dtype=np.float32)
+            picks = np.minimum((uniform * column_counts).astype(np.int64), column_counts - 1)
+            values[:, multi_reading] = readings[offsets[multi_reading] + picks]
+        if _width(noisy, n):
+            spread = sigma[noisy]
+            normal = rng.standard_normal((size, len(spread)), dtype=np.float32)
+            values[:, noisy] *= np.exp(spread * normal - spread**2 / 2)
+        if len(multi_member):
+            sizes = group_sizes[multi_member]
+            members = (rng.random((size, len(sizes)), dtype=np.float32) * sizes).astype(np.int64)
+            members = np.minimum(members, sizes - 1)
+            values[:, grouped] *= members[:, group_slot] == ranks[grouped]
+        sums[start : start + size] = np.add.reduceat(values, cell_starts, axis=1, dtype=np.float64)
+    return cells, sums
+
+
+def uncertainty_bands(
+    facts: pd.DataFrame,
+    draws: int | None = None,
+    model: UncertaintyModel | None = None,
+    seed: int | None = None,
+) -> pd.DataFrame:
+    """Return percentile bands for every panel value and share.
+
+    There is one row per (period, region, measure).
+
+    ``point`` is the published panel figure; ``mean`` and the ``p<q>`` columns summarize the
+    sampled realizations. Share draws with a non-positive total are undefined and skipped.
+    """
+    model = model or load_uncertainty_model()
+    draws = draws or model.draws
+    panel = pipeline.compute_panel(facts)
+    band_columns = ["mean", *(f"p{q:g}" for q in model.percentiles)]
+    columns = ["period", "region", "measure", "point", *band_columns, "supporting_extract_ids"]
+    if panel.empty:
+        return pd.DataFrame(columns=columns)
+
+    cells, sums = sample_panel(facts, draws, model, seed=seed)
+    rows = pd.MultiIndex.from_frame(panel[["period", "region"]])
+    row_of_cell = rows.get_indexer(pd.MultiIndex.from_frame(cells[["period", "region"]]))
+    topic_of_cell = pd.Index(TOPICS).get_indexer(cells["topic"])
+    realized = np.zeros((draws, len(rows), len(TOPICS)))
+    realized[:, row_of_cell, topic_of_cell] = sums
+
+    measures = {topic: realized[:, :, position] for position, topic in enumerate(TOPICS)}
+    for share, (part, total) in SHARES.items():
+        denominator = measures[total]
+        measures[share] = np.divide(
+            measures[part],
+            denominator,
+            out=np.full_like(denominator, np.nan),
+            where=denominator > 0,
+        )
+
+    supporting = pipeline.panel_for_export(panel)["supporting_extract_ids"].to_numpy()
+    frames = []
+    for measure, samples in measures.items():
+        defined = ~np.isnan(samples).all(axis=0)
+        bands = np.full((len(band_columns), len(rows)), np.nan)
+        if defined.any():
+            bands[0, defined] = np.nanmean(samples[:, defined], axis=0)
+            bands[1:, defined] = np.nanpercentile(samples[:, defined], model.percentiles, axis=0)
+        frames.append(
+            pd.DataFrame(
+                {
+                    "period": panel["period"].to_numpy(),
+                    "region": panel["region"].to_numpy(),
+                    "measure": measure,
+                    "point": panel[measure].to_numpy(dtype=float),
+                    **dict(zip(band_columns, bands, strict=True)),
+                    "supporting_extract_ids": supporting,
+                }
+            )
+        )
+    return pd.concat(frames, ignore_index=True)[columns]
+
+
+def uncertainty_path(mode: str) -> Path:
+    """Return the uncertainty band table path of a mode."""
+    return UNCERTAINTY_DIR / f"panel_uncertainty_{mode}.csv"
+
+
+@timed_stage("uncertainty")
+def run_uncertainty(mode: str, draws: int | None = None, seed: int | None = None) -> pd.DataFrame:
+    """Sample a mode's panel facts and write ``panel_uncertainty_<mode>.csv``."""
+    if mode not in {"auto", "verified"}:
+        raise ValueError("mode must be one of {'auto','verified'}")
+
+    input_path = pipeline.AUTO_FACTS_PATH if mode == "auto" else pipeline._resolve_verified_input()
+    if input_path.exists() and input_path.stat().st_size > 0:
+        facts = pd.read_csv(input_path)
+        pipeline.validate_columns(facts)
+    else:
+        facts = pd.DataFrame(columns=pipeline.REQUIRED_COLUMNS)
+    current_stage().rows_in = len(facts)
+    converted, _ = pipeline._panel_facts(facts, mode=mode)
+    bands = uncertainty_bands(converted, draws=draws, seed=seed)
+    output_path = uncertainty_path(mode)
+    write_csv(bands, output_path)
+    return bands
+
+
+@instrumented_command("run-songshi-juan186-uncertainty")
+def main(argv: list[str] | None = None) -> None:
+    """CLI wrapper for Monte Carlo panel uncertainty bands."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--mode", choices=["auto", "verified"], default="auto")
+    parser.add_argument("--draws", type=int, default=None, help="Defaults to uncertainty.yml.")
+    parser.add_argument("--seed", type=int, default=None, help="Defaults to uncertainty.yml.")
+    args = parser.parse_args(argv)
+
+    bands = run_uncertainty(args.mode, draws=args.draws, seed=args.seed)
+    print(f"uncertainty_csv: {uncertainty_path(args.mode)}")
+    print(f"uncertainty_rows: {len(bands)}")
+
+
+if __name__ == "__main__":
+    main()
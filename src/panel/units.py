@@ -0,0 +1,109 @@
+"""Convert fact values into one target unit per topic before panel aggregation."""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from functools import cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import yaml
+
+LOGGER = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+UNIT_MAP_PATH = BASE_DIR / "metadata" / "unit_map.yml"
+
+
+@dataclass(frozen=True)
+class UnitConversions:
+    """Lookup tables loaded from ``unit_map.yml``."""
+
+    token_map: dict[str, str]
+    dimensions: dict[str, str]
+    factors: dict[str, float]
+    target_units: dict[str, str]
+    source_overrides: tuple[tuple[str, dict[str, float]], ...] = ()
+
+
+@cache
+def load_unit_conversions(unit_map_path: Path = UNIT_MAP_PATH) -> UnitConversions:
+    """Load raw-token mapping, per-dimension factors, topic targets and source overrides."""
+    content = yaml.safe_load(unit_map_path.read_text(encoding="utf-8"))
+
+    token_map: dict[str, str] = {}
+    for tokens, unit in (content.get("unit_map") or {}).items():
+        for token in str(tokens).split("|"):
+            token_map[token] = str(unit)
+
+    dimensions: dict[str, str] = {}
+    factors: dict[str, float] = {}
+    for dimension, spec in (content.get("dimensions") or {}).items():
+        for unit, factor in (spec.get("factors") or {}).items():
+            dimensions[str(unit)] = str(dimension)
+            factors[str(unit)] = float(factor)
+
+    overrides = tuple(
+        (
+            str(entry["source_ref_prefix"]),
+            {str(unit): float(factor) for unit, factor in entry["factors"].items()},
+        )
+        for entry in content.get("source_overrides") or []
+    )
+    return UnitConversions(
+        token_map=token_map,
+        dimensions=dimensions,
+        factors=factors,
+        target_units={str(k): str(v) for k, v in (content.get("topic_target_units") or {}).items()},
+        source_overrides=overrides,
+    )
+
+
+def normalize_units(
+    facts: pd.DataFrame, conversions: UnitConversions
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Return (converted, unconverted) facts using column-wise lookups.
+
+    Converted rows carry the topic's target ``unit`` and a rescaled ``value``, keeping the
+    inputs in ``unit_original``/``value_original``. Rows with no target unit, an unknown unit
+    or a unit of another dimension are returned unchanged with a ``reason`` instead.
+    """
+    unit = facts["unit"].astype(str).str.strip()
+    unit = unit.map(conversions.token_map).fillna(unit)
+    target = facts["topic"].map(conversions.target_units)
+
+    factor = unit.map(conversions.factors)
+    for prefix, overrides in conversions.source_overrides:
+        matched = facts["source_ref"].astype(str).str.startswith(prefix)
+        for override_unit, override_factor in overrides.items():
+            factor = factor.mask(matched & (unit == override_unit), override_factor)
+
+    unit_dimension = unit.map(conversions.dimensions)
+    target_dimension = target.map(conversions.dimensions)
+    reason = pd.Series(
+        np.select(
+            [target.isna(), unit_dimension.isna(), unit_dimension != target_dimension],
+            ["no_target_unit", "unconvertible_unit", "dimension_mismatch"],
+            default="",
+        ),
+        index=facts.index,
+    )
+    convertible = reason == ""
+
+    converted = facts.loc[convertible].copy()
+    converted["value_original"] = converted["value"]
+    converted["unit_original"] = converted["unit"]
+    scale = factor[convertible] / target[convertible].map(conversions.factors)
+    converted["value"] = converted["value"].astype(float) * scale
+    converted["unit"] = target[convertible]
+
+    unconverted = facts.loc[~convertible].copy()
+    unconverted["target_unit"] = target[~convertible].fillna("")
+    unconverted["reason"] = reason[~convertible]
+    if not unconverted.empty:
+        LOGGER.warning(
+            "Leaving %d facts with unconvertible units out of the panel", len(unconverted)
+        )
+    return converted, unconverted
@@ -6,9 +6,18 @@ import logging
 from pathlib import Path
 from typing import Final
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
 from pydantic import BaseModel, ValidationError
 
+from instrumentation.run_manifest import instrumented_command, stage, timed_stage
+from panel.provenance import write_provenance_index
+from panel.units import load_unit_conversions, normalize_units
+from storage.atomic import atomic_path, write_csv, write_parquet
+
 LOGGER = logging.getLogger(__name__)
 
 REQUIRED_COLUMNS: Final[list[str]] = [
@@ -25,6 +34,38 @@ REQUIRED_COLUMNS: Final[list[str]] = [
 PERIODS: Final[set[str]] = {"XINNING", "YUANFENG", "SHAOSHENG", "HUIZONG"}
 TOPICS: Final[set[str]] = {"revenue_total", "liangshui", "shangshui"}
 EXPECTED_TOPIC_COLUMNS: Final[list[str]] = ["revenue_total", "liangshui", "shangshui"]
+AUTO_PANEL_REGIONS: Final[set[str]] = {"NATIONAL"}
+PANEL_COLUMNS: Final[list[str]] = [
+    "period",
+    "region",
+    "revenue_total",
+    "liangshui",
+    "shangshui",
+    "supporting_extract_ids",
+    "share_liangshui_in_total",
+    "share_shangshui_in_total",
+]
+# Supporting ids are int32 codes into one sorted dictionary of extract ids per column.
+SUPPORTING_IDS_TYPE: Final[pa.DataType] = pa.list_(pa.dictionary(pa.int32(), pa.string()))
+# Arrow export schemas, applied even to empty exports so readers always see the same types.
+ARROW_SCHEMAS: Final[dict[str, pa.Schema]] = {
+    "panel": pa.schema(
+        [
+            ("period", pa.string()),
+            ("region", pa.string()),
+            *((topic, pa.float64()) for topic in EXPECTED_TOPIC_COLUMNS),
+            ("supporting_extract_ids", SUPPORTING_IDS_TYPE),
+            ("share_liangshui_in_total", pa.float64()),
+            ("share_shangshui_in_total", pa.float64()),
+        ]
+    ),
+    "facts": pa.schema(
+        [
+            (column, pa.float64() if column == "value" else pa.string())
+            for column in REQUIRED_COLUMNS
+        ]
+    ),
+}
 
 BASE_DIR: Final[Path] = Path(__file__).resolve().parents[1]
 VERIFIED_FACTS_PATH: Final[Path] = BASE_DIR / "data" / "01_raw" / "extracts_songshi_juan186.csv"
@@ -34,9 +75,6 @@ INTERMEDIATE_PATH: Final[Path] = BASE_DIR / "data" / "02_intermediate" / "fact_n
 AUTO_PANEL_PATH: Final[Path] = BASE_DIR / "data" / "03_primary" / "panel_revenue_period_region_auto.csv"
 VERIFIED_PANEL_PATH: Final[Path] = BASE_DIR / "data" / "03_primary" / "panel_revenue_period_region_verified.csv"
 LEGACY_PANEL_PATH: Final[Path] = BASE_DIR / "data" / "03_primary" / "panel_revenue_period_region.csv"
-INTERMEDIATE_PATH: Final[Path] = BASE_DIR / "data" / "02_intermediate" / "fact_numeric_extracts.parquet"
-AUTO_PANEL_PATH: Final[Path] = BASE_DIR / "data" / "03_primary" / "panel_revenue_period_region_auto.csv"
-VERIFIED_PANEL_PATH: Final[Path] = BASE_DIR / "data" / "03_primary" / "panel_revenue_period_region_verified.csv"
 
 
 class ExtractRecord(BaseModel):
@@ -77,52 +115,162 @@ def _filtered_for_panel(df: pd.DataFrame, mode: str) -> pd.DataFrame:
     """Filter facts to panel-supported periods/topics and mode-specific region rules."""
     filtered = df[df["period"].isin(PERIODS) & df["topic"].isin(TOPICS)].copy()
     if mode == "auto":
-        filtered = filtered[filtered["region"].isin({"NATIONAL", "NORTH", "SOUTH"})]
-        filtered = filtered[filtered["region"] == "NATIONAL"]
+        filtered = filtered[filtered["region"].isin(AUTO_PANEL_REGIONS)]
     return filtered
 
 
+def _panel_facts(df: pd.DataFrame, mode: str) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Filter facts for the panel and convert values into each topic's target unit.
+
+    Returns (converted, unconverted); unconverted rows carry a ``reason`` and are never summed.
+    """
+    return normalize_units(_filtered_for_panel(df, mode=mode), load_unit_conversions())
+
+
+def unconverted_units_path(panel_path: Path) -> Path:
+    """Return the side-table path for facts left out of a panel for unit reasons."""
+    return panel_path.with_name(f"{panel_path.stem}_unconverted_units.csv")
+
+
+def _supporting_ids(row_codes: np.ndarray, extract_ids: pd.Series, n_rows: int) -> pd.Series:
+    """Return sorted unique supporting extract ids per panel row as an Arrow list column.
+
+    Extract ids are interned to integer codes in sorted order, and each (row, id) pair is
+    packed into one int64 so a single ``np.unique`` both dedupes and orders them. The codes
+    are kept as the list values, dictionary-encoded against the sorted ids.
+    """
+    id_codes, id_values = pd.factorize(extract_ids.astype(str), sort=True)
+    n_ids = max(len(id_values), 1)
+    pairs = np.unique(row_codes.astype(np.int64) * n_ids + id_codes)
+    rows, codes = np.divmod(pairs, n_ids)
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=n_rows))])
+    values = pa.DictionaryArray.from_arrays(
+        pa.array(codes, type=pa.int32()),
+        pa.array(np.asarray(id_values, dtype=object), type=pa.string()),
+    )
+    lists = pa.ListArray.from_arrays(pa.array(offsets, type=pa.int32()), values)
+    return pd.Series(pd.arrays.ArrowExtensionArray(lists))
+
+
+def panel_for_export(panel: pd.DataFrame) -> pd.DataFrame:
+    """Return a copy of the panel with list-typed supporting ids pipe-joined for CSV."""
+    exported = panel.copy()
+    column = exported["supporting_extract_ids"]
+    if isinstance(column.dtype, pd.ArrowDtype):
+        joined = pc.binary_join(pa.array(column).cast(pa.list_(pa.string())), "|")
+        exported["supporting_extract_ids"] = joined.to_numpy(zero_copy_only=False)
+    return exported
+
+
+def write_panel_csv(panel: pd.DataFrame, output_path: Path) -> None:
+    """Write a panel CSV, joining supporting ids with ``|`` only at export time."""
+    write_csv(panel_for_export(panel), output_path)
+
+
+def read_panel_csv(panel_path: Path) -> pd.DataFrame:
+    """Read a panel CSV back with supporting ids as an Arrow list column."""
+    panel = pd.read_csv(panel_path)
+    if panel.empty:
+        return panel
+    joined = pa.array(panel["supporting_extract_ids"], type=pa.string(), from_pandas=True)
+    lists = pc.split_pattern(joined, "|").cast(SUPPORTING_IDS_TYPE)
+    panel["supporting_extract_ids"] = pd.arrays.ArrowExtensionArray(lists)
+    return panel
+
+
+def arrow_path(panel_path: Path, kind: str = "panel") -> Path:
+    """Return the Arrow IPC (Feather v2) export next to a panel CSV: the panel or its facts."""
+    if kind not in {"panel", "facts"}:
+        raise ValueError("kind must be one of {'panel','facts'}")
+    suffix = "" if kind == "panel" else "_facts"
+    return panel_path.with_name(f"{panel_path.stem}{suffix}.arrow")
+
+
+def write_arrow(frame: pd.DataFrame, output_path: Path, kind: str = "panel") -> None:
+    """Write a frame as an uncompressed Arrow IPC file so readers can memory-map it.
+
+    Columns in the ``kind``'s entry of ``ARROW_SCHEMAS`` are cast to its types; any other
+    column keeps its inferred type, with all-null columns written as strings.
+    """
+    schema = ARROW_SCHEMAS[kind]
+    table = pa.Table.from_pandas(frame.reset_index(drop=True), preserve_index=False)
+    fields = [
+        schema.field(field.name)
+        if field.name in schema.names
+        else field.with_type(pa.string() if pa.types.is_null(field.type) else field.type)
+        for field in table.schema
+    ]
+    table = table.cast(pa.schema(fields))
+    # Drop pandas metadata: column types come from the Arrow schema alone on load.
+    # Published by rename, so readers holding a memory map keep the previous file intact.
+    with atomic_path(output_path) as staged:
+        feather.write_feather(
+            table.replace_schema_metadata(None), staged, compression="uncompressed"
+        )
+
+
+def load_panel(
+    mode: str = "verified",
+    columns: list[str] | None = None,
+    filters: dict[str, object] | None = None,
+    kind: str = "panel",
+    as_arrow: bool = False,
+) -> pd.DataFrame | pa.Table:
+    """Memory-map a mode's Arrow export and return selected columns of the matching rows.
+
+    ``filters`` maps a column to a value or list of values. Columns are Arrow-backed
+    (``pd.ArrowDtype``), so unfiltered reads share the mapped pages instead of copying them;
+    filtering copies only the selected rows. ``kind="facts"`` loads the facts export instead.
+    """
+    if mode not in {"auto", "verified"}:
+        raise ValueError("mode must be one of {'auto','verified'}")
+    panel_path = AUTO_PANEL_PATH if mode == "auto" else VERIFIED_PANEL_PATH
+    table = feather.read_table(arrow_path(panel_path, kind), memory_map=True)
+    for column, value in (filters or {}).items():
+        values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+        value_set = pa.array(values).cast(table.schema.field(column).type)
+        table = table.filter(pc.is_in(table[column], value_set=value_set))
+    if columns is not None:
+        table = table.select(columns)
+    return table if as_arrow else table.to_pandas(types_mapper=pd.ArrowDtype)
+
+
 def compute_panel(extracts: pd.DataFrame) -> pd.DataFrame:
-    """Aggregate extracts, pivot to wide, compute shares, and attach supporting ids."""
+    """Aggregate extracts, pivot to wide, compute shares, and attach supporting ids.
+
+    ``supporting_extract_ids`` is a list-typed (Arrow) column; use ``write_panel_csv`` or
+    ``panel_for_export`` to get the pipe-joined CSV form.
+    """
     if extracts.empty:
-        return pd.DataFrame(
-            columns=[
-                "period",
-                "region",
-                "revenue_total",
-                "liangshui",
-                "shangshui",
-                "supporting_extract_ids",
-                "share_liangshui_in_total",
-                "share_shangshui_in_total",
-            ]
-        )
+        return pd.DataFrame(columns=PANEL_COLUMNS)
 
-    grouped = (
-        extracts.groupby(["period", "region", "topic"], as_index=False)
-        .agg(topic_value=("value", "sum"), supporting_extract_ids=("extract_id", lambda x: "|".join(sorted(set(x)))))
+    grouped = extracts.groupby(["period", "region", "topic"], as_index=False).agg(
+        topic_value=("value", "sum")
     )
+    return assemble_panel(grouped, extracts[["period", "region", "extract_id"]])
+
+
+def assemble_panel(grouped: pd.DataFrame, members: pd.DataFrame) -> pd.DataFrame:
+    """Pivot per-cell ``topic_value`` sums to the wide panel and attach supporting ids.
+
+    ``members`` lists the (period, region, extract_id) of every aggregated fact; callers that
+    aggregate elsewhere (e.g. in SQL) pass their grouped cells and members here.
+    """
+    if grouped.empty:
+        return pd.DataFrame(columns=PANEL_COLUMNS)
 
     value_panel = grouped.pivot(index=["period", "region"], columns="topic", values="topic_value").reset_index()
     value_panel.columns.name = None
 
-    ids_panel = grouped.groupby(["period", "region"], as_index=False).agg(
-        supporting_extract_ids=(
-            "supporting_extract_ids",
-            lambda x: "|".join(sorted(set("|".join(x).split("|")))),
-        )
-    ids_panel = (
-        grouped.groupby(["period", "region"], as_index=False)["supporting_extract_ids"]
-        .agg(lambda x: "|".join(sorted(set("|".join(x).split("|")))))
-        .rename(columns={"supporting_extract_ids": "supporting_extract_ids"})
-    )
-
     for topic_name in EXPECTED_TOPIC_COLUMNS:
         if topic_name not in value_panel.columns:
             LOGGER.warning("Missing topic column after pivot; filling with 0: %s", topic_name)
             value_panel[topic_name] = 0.0
 
-    panel = value_panel.merge(ids_panel, on=["period", "region"], how="left")
+    rows = pd.MultiIndex.from_frame(value_panel[["period", "region"]])
+    row_codes = rows.get_indexer(pd.MultiIndex.from_frame(members[["period", "region"]]))
+    panel = value_panel
+    panel["supporting_extract_ids"] = _supporting_ids(row_codes, members["extract_id"], len(rows))
     panel["share_liangshui_in_total"] = _safe_divide(panel["liangshui"], panel["revenue_total"])
     panel["share_shangshui_in_total"] = _safe_divide(panel["shangshui"], panel["revenue_total"])
     panel = panel.sort_values(["period", "region"]).reset_index(drop=True)
@@ -136,49 +284,52 @@ def _resolve_verified_input() -> Path:
     return SEED_FACTS_PATH
 
 
+@timed_stage("panel")
 def run_panel_mode(mode: str) -> pd.DataFrame:
     """Run a single panel mode: auto or verified."""
     if mode not in {"auto", "verified"}:
         raise ValueError("mode must be one of {'auto','verified'}")
 
     input_path = AUTO_FACTS_PATH if mode == "auto" else _resolve_verified_input()
-    input_path = AUTO_FACTS_PATH if mode == "auto" else VERIFIED_FACTS_PATH
     output_path = AUTO_PANEL_PATH if mode == "auto" else VERIFIED_PANEL_PATH
 
     if not input_path.exists() or input_path.stat().st_size == 0:
-        empty = pd.DataFrame(
-            columns=[
-                "period",
-                "region",
-                "revenue_total",
-                "liangshui",
-                "shangshui",
-                "supporting_extract_ids",
-                "share_liangshui_in_total",
-                "share_shangshui_in_total",
-            ]
-        )
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        empty.to_csv(output_path, index=False)
+        empty = pd.DataFrame(columns=PANEL_COLUMNS)
+        write_panel_csv(empty, output_path)
+        write_arrow(empty, arrow_path(output_path))
+        facts = pd.DataFrame(columns=REQUIRED_COLUMNS)
+        write_arrow(facts, arrow_path(output_path, "facts"), kind="facts")
         return empty
 
     extracts = pd.read_csv(input_path)
-    validate_columns(extracts)
-    validate_rows(extracts)
-    filtered = _filtered_for_panel(extracts, mode=mode)
-
-    if mode == "verified":
-        INTERMEDIATE_PATH.parent.mkdir(parents=True, exist_ok=True)
-        extracts.to_parquet(INTERMEDIATE_PATH, index=False)
+    with stage("panel.validate") as record:
+        record.rows_in = len(extracts)
+        validate_columns(extracts)
+        validate_rows(extracts)
+    with stage("panel.normalize_units") as record:
+        record.rows_in = len(extracts)
+        converted, unconverted = _panel_facts(extracts, mode=mode)
+        record.rows_out = len(converted)
 
-    panel = compute_panel(filtered)
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    panel.to_csv(output_path, index=False)
     if mode == "verified":
-        panel.to_csv(LEGACY_PANEL_PATH, index=False)
+        write_parquet(extracts, INTERMEDIATE_PATH)
+
+    with stage("panel.pivot") as record:
+        record.rows_in = len(converted)
+        panel = compute_panel(converted)
+        record.rows_out = len(panel)
+    write_provenance_index(mode, converted)
+    with stage("panel.write"):
+        write_panel_csv(panel, output_path)
+        write_csv(unconverted, unconverted_units_path(output_path))
+        write_arrow(panel, arrow_path(output_path))
+        write_arrow(extracts, arrow_path(output_path, "facts"), kind="facts")
+        if mode == "verified":
+            write_panel_csv(panel, LEGACY_PANEL_PATH)
     return panel
 
 
+@instrumented_command("run-song-pipeline")
 def run_pipeline() -> pd.DataFrame:
     """Run verified mode for backwards-compatible command behavior."""
     return run_panel_mode("verified")
@@ -2,14 +2,20 @@
 
 from __future__ import annotations
 
+import argparse
 from pathlib import Path
 
 import pandas as pd
 
+from instrumentation.run_manifest import instrumented_command, timed_stage
+from storage.atomic import atomic_path, write_csv
+
 BASE_DIR = Path(__file__).resolve().parents[2]
 INPUT_CANDIDATES = BASE_DIR / "data" / "02_intermediate" / "candidates_songshi_juan186.csv"
 INPUT_AUTO_FACTS = BASE_DIR / "data" / "02_intermediate" / "auto_facts_songshi_juan186.csv"
-OUTPUT_REVIEW_SHEET = BASE_DIR / "data" / "02_intermediate" / "candidates_songshi_juan186_review_sheet.csv"
+OUTPUT_REVIEW_SHEET = (
+    BASE_DIR / "data" / "02_intermediate" / "candidates_songshi_juan186_review_sheet.csv"
+)
 
 REVIEW_COLUMNS = [
     "approve",
@@ -21,6 +27,8 @@ REVIEW_COLUMNS = [
     "interpretation_note",
     "confidence_override",
 ]
+# Attached to the row kept for each near-duplicate cluster; promotion fans approvals out to them.
+CLUSTER_MEMBER_COLUMNS = ["cluster_size", "cluster_member_ids", "cluster_member_source_refs"]
 
 
 def _select_review_input(prefer_auto_facts: bool = True) -> Path:
@@ -30,23 +38,141 @@ def _select_review_input(prefer_auto_facts: bool = True) -> Path:
     return INPUT_CANDIDATES
 
 
-def make_review_sheet(input_csv: Path, output_csv: Path) -> pd.DataFrame:
-    """Create a review sheet with blank human-annotation columns."""
-    source_df = pd.read_csv(input_csv)
+def _id_column(columns: pd.Index) -> str | None:
+    """Return the row id column promotion derives fact ids from."""
+    for column in ["candidate_id", "extract_id"]:
+        if column in columns:
+            return column
+    return None
+
+
+def _cluster_members(rows: pd.DataFrame) -> pd.DataFrame:
+    """Return size and pipe-joined member ids/source refs per ``cluster_id``."""
+    id_column = _id_column(rows.columns)
+    grouped = rows.dropna(subset=["cluster_id"]).astype(str).groupby("cluster_id", sort=False)
+    return pd.DataFrame(
+        {
+            "cluster_size": grouped.size(),
+            "cluster_member_ids": grouped[id_column].agg("|".join),
+            "cluster_member_source_refs": grouped["source_ref"].agg("|".join),
+        }
+    )
+
+
+def _collapse_clusters(rows: pd.DataFrame, members: pd.DataFrame, seen: set[str]) -> pd.DataFrame:
+    """Keep the first row of each cluster not in ``seen`` and attach the cluster's members."""
+    cluster_ids = rows["cluster_id"].astype("string")
+    first = ~cluster_ids.duplicated() & ~cluster_ids.isin(seen)
+    kept = rows.loc[cluster_ids.isna() | first]
+    kept = kept.drop(columns=CLUSTER_MEMBER_COLUMNS, errors="ignore")
+    seen.update(cluster_ids[first].dropna())
+    return kept.join(members, on=kept["cluster_id"].astype("string"))
+
+
+def _can_collapse(columns: pd.Index) -> bool:
+    return {"cluster_id", "source_ref"}.issubset(columns) and _id_column(columns) is not None
+
+
+def _with_review_columns(source_df: pd.DataFrame) -> pd.DataFrame:
+    """Return a copy of source rows with blank human-annotation columns appended."""
     review_sheet = source_df.copy()
     review_sheet["approve"] = 0
     for column in REVIEW_COLUMNS[1:]:
         review_sheet[column] = ""
+    return review_sheet
+
+
+@timed_stage("review.sheet")
+def make_review_sheet(
+    input_csv: Path,
+    output_csv: Path,
+    collapse_clusters: bool = True,
+    usecols: list[str] | None = None,
+) -> pd.DataFrame:
+    """Create a review sheet with blank human-annotation columns.
 
-    output_csv.parent.mkdir(parents=True, exist_ok=True)
-    review_sheet.to_csv(output_csv, index=False)
+    With ``collapse_clusters`` each near-duplicate cluster (``cluster_id``) is shown once, with
+    its members listed in ``cluster_member_ids``/``cluster_member_source_refs``. ``usecols``
+    restricts the source columns copied into the sheet.
+    """
+    source = pd.read_csv(input_csv, usecols=usecols)
+    if collapse_clusters and _can_collapse(source.columns):
+        source = _collapse_clusters(source, _cluster_members(source), set())
+    review_sheet = _with_review_columns(source)
+
+    write_csv(review_sheet, output_csv)
     return review_sheet
 
 
-def main() -> None:
+@timed_stage("review.sheet")
+def stream_review_sheet(
+    input_csv: Path,
+    output_csv: Path,
+    chunksize: int,
+    usecols: list[str] | None = None,
+    collapse_clusters: bool = True,
+) -> int:
+    """Write a review sheet chunk by chunk and return the number of rows written.
+
+    Peak memory is bounded by ``chunksize`` rows of the (optionally ``usecols``-restricted)
+    input; the output matches ``make_review_sheet`` on the same columns.
+    """
+    columns = pd.Index(usecols) if usecols is not None else pd.read_csv(input_csv, nrows=0).columns
+    members, seen = None, set()
+    if collapse_clusters and _can_collapse(columns):
+        member_columns = ["cluster_id", _id_column(columns), "source_ref"]
+        members = _cluster_members(pd.read_csv(input_csv, usecols=member_columns, dtype=str))
+
+    rows = 0
+    reader = pd.read_csv(input_csv, usecols=usecols, chunksize=chunksize)
+    with atomic_path(output_csv) as staged:
+        for index, chunk in enumerate(reader):
+            if members is not None:
+                chunk = _collapse_clusters(chunk, members, seen)
+            review_chunk = _with_review_columns(chunk)
+            first = index == 0
+            review_chunk.to_csv(staged, mode="w" if first else "a", header=first, index=False)
+            rows += len(review_chunk)
+    return rows
+
+
+@instrumented_command("run-songshi-juan186-review")
+def main(argv: list[str] | None = None) -> None:
     """CLI wrapper for review sheet generation."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=None,
+        help="Stream the source table in chunks of this many rows.",
+    )
+    parser.add_argument(
+        "--no-collapse",
+        action="store_true",
+        help="List every near-duplicate candidate instead of one row per cluster.",
+    )
+    parser.add_argument(
+        "--columns",
+        type=lambda value: [column.strip() for column in value.split(",") if column.strip()],
+        default=None,
+        help="Comma-separated source columns to copy into the sheet (default: all).",
+    )
+    args = parser.parse_args(argv)
+
     input_csv = _select_review_input(prefer_auto_facts=True)
-    make_review_sheet(input_csv, OUTPUT_REVIEW_SHEET)
+    collapse = not args.no_collapse
+    if args.chunksize is None:
+        make_review_sheet(
+            input_csv, OUTPUT_REVIEW_SHEET, collapse_clusters=collapse, usecols=args.columns
+        )
+    else:
+        stream_review_sheet(
+            input_csv,
+            OUTPUT_REVIEW_SHEET,
+            chunksize=args.chunksize,
+            usecols=args.columns,
+            collapse_clusters=collapse,
+        )
     print(f"review_source_csv: {input_csv}")
     print(f"review_sheet_csv: {OUTPUT_REVIEW_SHEET}")
 
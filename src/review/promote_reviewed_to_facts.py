@@ -2,11 +2,18 @@
 
 from __future__ import annotations
 
+import argparse
 import logging
+from collections.abc import Iterable
+from contextlib import ExitStack
 from pathlib import Path
 
 import pandas as pd
 
+from instrumentation.run_manifest import instrumented_command, timed_stage
+from storage.atomic import artifact_lock, atomic_path, write_csv
+from storage.fact_store import FACT_STORE_PATH, store_promotion
+
 LOGGER = logging.getLogger(__name__)
 
 BASE_DIR = Path(__file__).resolve().parents[2]
@@ -14,6 +21,10 @@ INPUT_REVIEW_SHEET = (
     BASE_DIR / "data" / "02_intermediate" / "candidates_songshi_juan186_review_sheet.csv"
 )
 OUTPUT_FACTS = BASE_DIR / "data" / "01_raw" / "extracts_songshi_juan186.csv"
+REJECTED_REPORT = BASE_DIR / "data" / "02_intermediate" / "promotion_rejected_songshi_juan186.csv"
+REVIEW_STATE = BASE_DIR / "data" / "02_intermediate" / "promotion_state_songshi_juan186.csv"
+
+APPROVED_VALUES = {"1", "true", "yes", "y"}
 
 REQUIRED_FINAL_COLUMNS = [
     "final_period",
@@ -34,65 +45,374 @@ FACT_COLUMNS = [
     "source_ref",
 ]
 
+REJECTED_COLUMNS = ["extract_id", "source_ref", "reason"]
+
+# Review-sheet columns whose content decides the promoted fact row.
+REVIEW_HASH_COLUMNS = ["approve", *REQUIRED_FINAL_COLUMNS, "confidence_override", "source_ref"]
+STATE_COLUMNS = ["extract_id", "review_hash"]
+CLUSTER_MEMBER_COLUMNS = ["cluster_member_ids", "cluster_member_source_refs"]
+DECISION_COLUMNS = [
+    "extract_id",
+    "candidate_id",
+    *REVIEW_HASH_COLUMNS,
+    "review_hash",
+    "status",
+    "reason",
+]
+REVIEW_INPUT_COLUMNS = {"candidate_id", "extract_id", *REVIEW_HASH_COLUMNS, *CLUSTER_MEMBER_COLUMNS}
+
+
+def _stripped(frame: pd.DataFrame) -> pd.DataFrame:
+    """Return frame as stripped strings with NaN rendered as empty strings."""
+    return frame.fillna("").astype(str).apply(lambda column: column.str.strip())
 
-def _is_approved(value: object) -> bool:
+
+def _approval_mask(review_df: pd.DataFrame) -> pd.Series:
     """Return True for explicit review approvals."""
-    as_text = str(value).strip().lower()
-    return as_text in {"1", "true", "yes", "y"}
-
-
-def promote_reviewed_to_facts(input_csv: Path, output_csv: Path) -> pd.DataFrame:
-    """Create facts table from approved review rows with complete final fields."""
-    review_df = pd.read_csv(input_csv)
-    rows: list[dict[str, object]] = []
-
-    for _, row in review_df.iterrows():
-        if not _is_approved(row.get("approve", 0)):
-            continue
-
-        missing = [
-            col
-            for col in REQUIRED_FINAL_COLUMNS
-            if pd.isna(row.get(col)) or str(row.get(col)).strip() == ""
-        ]
-        if missing:
-            LOGGER.warning("Skipping approved row due to missing final fields: %s", missing)
-            continue
-
-        try:
-            value = float(row["final_value_std"])
-        except (TypeError, ValueError):
-            LOGGER.warning("Skipping approved row due to invalid final_value_std: %s", row["final_value_std"])
-            continue
-
-        confidence_override = row.get("confidence_override", "")
-        confidence = str(confidence_override).strip() if not pd.isna(confidence_override) else ""
-        confidence = confidence if confidence else "C"
-
-        rows.append(
-            {
-                "extract_id": f"songshi-juan186-{row.get('candidate_id', row.get('extract_id', 'unknown'))}",
-                "period": str(row["final_period"]).strip(),
-                "region": str(row["final_region"]).strip(),
-                "topic": str(row["final_topic"]).strip(),
-                "value": value,
-                "unit": str(row["final_unit_std"]).strip(),
-                "confidence": confidence,
-                "source_ref": str(row["source_ref"]).strip(),
-            }
+    if "approve" not in review_df.columns:
+        return pd.Series(False, index=review_df.index)
+    normalized = review_df["approve"].astype(str).str.strip().str.lower()
+    return normalized.isin(APPROVED_VALUES)
+
+
+def _fact_ids(review_df: pd.DataFrame) -> pd.Series:
+    """Build fact extract ids from candidate ids (or auto-fact ids) of review rows."""
+    for column in ["candidate_id", "extract_id"]:
+        if column in review_df.columns:
+            return "songshi-juan186-" + review_df[column].astype(str)
+    return pd.Series("songshi-juan186-unknown", index=review_df.index)
+
+
+def _fan_out_clusters(review_df: pd.DataFrame) -> pd.DataFrame:
+    """Expand collapsed cluster rows into one review row per member id and source_ref."""
+    if "cluster_member_ids" not in review_df.columns:
+        return review_df
+    id_column = "candidate_id" if "candidate_id" in review_df.columns else "extract_id"
+    member_ids = review_df["cluster_member_ids"].fillna("").astype(str).str.strip()
+    collapsed = member_ids != ""
+
+    fanned = review_df.loc[collapsed].copy()
+    fanned[id_column] = member_ids[collapsed].str.split("|")
+    member_refs = fanned["cluster_member_source_refs"].fillna("").astype(str)
+    fanned["source_ref"] = member_refs.str.split("|")
+    fanned = fanned.explode([id_column, "source_ref"])
+    parts = [frame for frame in (review_df.loc[~collapsed], fanned) if not frame.empty]
+    if not parts:
+        return review_df.drop(columns=CLUSTER_MEMBER_COLUMNS, errors="ignore")
+    expanded = pd.concat(parts).sort_index(kind="stable")
+    return expanded.drop(columns=CLUSTER_MEMBER_COLUMNS, errors="ignore").reset_index(drop=True)
+
+
+def _review_hashes(review_df: pd.DataFrame) -> pd.Series:
+    """Return a stable content hash per review row over the promotion-relevant columns."""
+    content = _stripped(review_df.reindex(columns=REVIEW_HASH_COLUMNS))
+    return pd.util.hash_pandas_object(content, index=False).map("{:016x}".format)
+
+
+def _review_state(review_df: pd.DataFrame) -> pd.DataFrame:
+    """Return one stable content hash per extract id over the promotion-relevant columns."""
+    state = pd.DataFrame(
+        {"extract_id": _fact_ids(review_df), "review_hash": _review_hashes(review_df)}
+    )
+    return state.drop_duplicates("extract_id", keep="last").reset_index(drop=True)
+
+
+def _build_facts(review_df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Return (facts, rejected) for approved rows using column-wise checks."""
+    approved = review_df.loc[_approval_mask(review_df)]
+    extract_ids = _fact_ids(approved)
+
+    final_raw = approved.reindex(columns=REQUIRED_FINAL_COLUMNS)
+    blank = _stripped(final_raw).eq("")
+    incomplete = blank.any(axis=1)
+    values = pd.to_numeric(final_raw["final_value_std"], errors="coerce")
+    invalid_value = ~incomplete & values.isna()
+
+    missing_labels = pd.Series(
+        [f"{column}|" for column in REQUIRED_FINAL_COLUMNS], index=blank.columns
+    )
+    reasons = pd.Series("", index=approved.index, dtype=object)
+    missing = blank.loc[incomplete].dot(missing_labels).str.rstrip("|")
+    reasons[incomplete] = "missing_final_fields:" + missing
+    reasons[invalid_value] = "invalid_final_value_std"
+    rejected_mask = incomplete | invalid_value
+
+    rejected = pd.DataFrame(
+        {
+            "extract_id": extract_ids[rejected_mask],
+            "source_ref": approved.loc[rejected_mask, "source_ref"].astype(str).str.strip(),
+            "reason": reasons[rejected_mask],
+        },
+        columns=REJECTED_COLUMNS,
+    )
+    if not rejected.empty:
+        LOGGER.warning(
+            "Skipping %d approved rows (missing final fields: %d, invalid final_value_std: %d)",
+            len(rejected),
+            int(incomplete.sum()),
+            int(invalid_value.sum()),
         )
 
-    facts = pd.DataFrame(rows, columns=FACT_COLUMNS)
-    output_csv.parent.mkdir(parents=True, exist_ok=True)
-    facts.to_csv(output_csv, index=False)
+    accepted = approved.loc[~rejected_mask]
+    final = _stripped(accepted.reindex(columns=[*REQUIRED_FINAL_COLUMNS, "confidence_override"]))
+    confidence = final["confidence_override"].mask(final["confidence_override"] == "", "C")
+
+    facts = pd.DataFrame(
+        {
+            "extract_id": extract_ids[~rejected_mask],
+            "period": final["final_period"],
+            "region": final["final_region"],
+            "topic": final["final_topic"],
+            "value": values[~rejected_mask].astype(float),
+            "unit": final["final_unit_std"],
+            "confidence": confidence,
+            "source_ref": accepted["source_ref"].astype(str).str.strip(),
+        },
+        columns=FACT_COLUMNS,
+    ).reset_index(drop=True)
+    return facts, rejected.reset_index(drop=True)
+
+
+def review_decisions(review_df: pd.DataFrame) -> pd.DataFrame:
+    """Return each review row's decision: promoted, rejected (with reason) or unapproved."""
+    review_df = _fan_out_clusters(review_df)
+    _, rejected = _build_facts(review_df)
+    return _decisions(review_df, rejected)
+
+
+def _decisions(review_df: pd.DataFrame, rejected: pd.DataFrame) -> pd.DataFrame:
+    decisions = _stripped(review_df.reindex(columns=["candidate_id", *REVIEW_HASH_COLUMNS]))
+    decisions["extract_id"] = _fact_ids(review_df)
+    decisions["review_hash"] = _review_hashes(review_df)
+    reasons = rejected.drop_duplicates("extract_id", keep="last").set_index("extract_id")["reason"]
+    decisions["reason"] = decisions["extract_id"].map(reasons).fillna("")
+    decisions["status"] = "unapproved"
+    decisions.loc[_approval_mask(review_df), "status"] = "promoted"
+    decisions.loc[decisions["reason"] != "", "status"] = "rejected"
+    return decisions[DECISION_COLUMNS].reset_index(drop=True)
+
+
+def _read_or_empty(path: Path | None, columns: list[str]) -> pd.DataFrame:
+    """Read a CSV artifact, or return an empty frame when it is absent."""
+    if path is None or not path.exists() or path.stat().st_size == 0:
+        return pd.DataFrame(columns=columns)
+    return pd.read_csv(path, dtype={"extract_id": str, "review_hash": str})
+
+
+def _iter_review_chunks(input_csv: Path, chunksize: int | None) -> Iterable[pd.DataFrame]:
+    """Read the promotion-relevant review columns as text, whole or in bounded chunks."""
+    reader = pd.read_csv(
+        input_csv,
+        usecols=lambda column: column in REVIEW_INPUT_COLUMNS,
+        dtype=str,
+        chunksize=chunksize,
+    )
+    return [reader] if chunksize is None else reader
+
+
+def _write_part(frame: pd.DataFrame, path: Path, first: bool) -> None:
+    """Write the first part of a CSV output with header, append later parts."""
+    frame.to_csv(path, mode="w" if first else "a", header=first, index=False)
+
+
+def _upsert_facts(
+    output_csv: Path, new_facts: pd.DataFrame, replaced_ids: pd.Series
+) -> pd.DataFrame:
+    """Upsert facts by extract_id, appending to the facts file when no row is replaced."""
+    existing = _read_or_empty(output_csv, FACT_COLUMNS)
+    stale = existing["extract_id"].isin(replaced_ids)
+    kept = [frame for frame in (existing.loc[~stale], new_facts) if not frame.empty]
+    facts = pd.concat(kept, ignore_index=True)[FACT_COLUMNS] if kept else new_facts
+
+    if stale.any() or existing.empty:
+        write_csv(facts, output_csv)
+    elif not new_facts.empty:
+        with atomic_path(output_csv, append=True) as staged:
+            new_facts.to_csv(staged, mode="a", header=False, index=False)
     return facts
 
 
-def main() -> None:
+def _staged(outputs: ExitStack, path: Path | None) -> Path | None:
+    """Enter an ``atomic_path`` for ``path`` on ``outputs``; ``None`` stays ``None``."""
+    return outputs.enter_context(atomic_path(path)) if path is not None else None
+
+
+@timed_stage("review.promote")
+def promote_reviewed_to_facts(
+    input_csv: Path,
+    output_csv: Path,
+    rejected_csv: Path | None = None,
+    state_csv: Path | None = None,
+    incremental: bool = False,
+    chunksize: int | None = None,
+    store: Path | None = None,
+) -> pd.DataFrame:
+    """Create facts table from approved review rows with complete final fields.
+
+    With ``incremental=True`` only review rows whose content hash differs from ``state_csv``
+    are re-promoted and upserted by ``extract_id``; untouched facts are kept as-is and new
+    approvals are appended without rewriting the facts file.
+
+    With ``chunksize`` the review sheet is streamed ``chunksize`` rows at a time (reading only
+    the columns promotion needs) and outputs are written chunk by chunk, so peak memory is
+    bounded by the chunk size rather than the sheet size.
+
+    Outputs are staged and published atomically; the facts lock is held throughout so
+    concurrent promotions into the same facts file do not lose each other's upserts.
+
+    With ``store`` the promotion is mirrored into that SQLite fact store once the files are
+    published: verified facts and review decisions are replaced wholesale, or, when
+    incremental, only the changed and removed extract ids are deleted and upserted.
+    """
+    if incremental and state_csv is None:
+        raise ValueError("incremental promotion requires state_csv")
+
+    with artifact_lock(output_csv):
+        with ExitStack() as outputs:
+            # Staged outputs publish in reverse order of entry, so state is swapped in last and an
+            # interrupted run never records unpromoted rows.
+            staged_state = _staged(outputs, state_csv)
+            staged_rejected = _staged(outputs, rejected_csv)
+            staged_facts = _staged(outputs, None if incremental else output_csv)
+            facts, mirror = _promote(
+                input_csv,
+                output_csv,
+                staged_facts,
+                staged_rejected,
+                staged_state,
+                state_csv,
+                rejected_csv,
+                chunksize,
+                with_decisions=store is not None,
+            )
+        if store is not None:
+            store_promotion(store, *mirror)
+        return facts
+
+
+def _promote(
+    input_csv: Path,
+    output_csv: Path,
+    staged_facts: Path | None,
+    staged_rejected: Path | None,
+    staged_state: Path | None,
+    state_csv: Path | None,
+    rejected_csv: Path | None,
+    chunksize: int | None,
+    with_decisions: bool = False,
+) -> tuple[pd.DataFrame, tuple[pd.DataFrame, pd.DataFrame | None, pd.Series | None]]:
+    """Promote review rows into staged outputs; incremental when ``staged_facts`` is None.
+
+    An incremental run rebuilds only changed rows, so the rejected report keeps the previous
+    report's rows for unchanged ids and replaces those of changed or removed ids.
+
+    Returns the facts table plus the (facts, decisions, deleted ids) a fact store mirrors;
+    deleted ids are None for a full promotion. Review decisions hold one row per review row,
+    so they are only built ``with_decisions`` (when a store will mirror them) and are None
+    otherwise, keeping chunked promotions bounded by the chunk size.
+    """
+    incremental = staged_facts is None
+    previous = _read_or_empty(state_csv if incremental else None, STATE_COLUMNS)
+    previous = previous.drop_duplicates("extract_id", keep="last")
+
+    facts_parts: list[pd.DataFrame] = []
+    rejected_parts: list[pd.DataFrame] = []
+    decision_parts: list[pd.DataFrame] = []
+    changed_parts: list[pd.Series] = []
+    seen_parts: list[pd.Series] = []
+    for index, chunk in enumerate(_iter_review_chunks(input_csv, chunksize)):
+        first = index == 0
+        chunk = _fan_out_clusters(chunk)
+        state = _review_state(chunk)
+        if incremental:
+            compared = state.merge(
+                previous, on="extract_id", how="left", suffixes=("", "_previous")
+            )
+            changed_ids = compared.loc[
+                compared["review_hash"] != compared["review_hash_previous"], "extract_id"
+            ]
+            chunk = chunk.loc[_fact_ids(chunk).isin(changed_ids)]
+            changed_parts.append(changed_ids)
+            seen_parts.append(state["extract_id"])
+
+        facts, rejected = _build_facts(chunk)
+        facts_parts.append(facts)
+        if with_decisions:
+            decision_parts.append(_decisions(chunk, rejected))
+        if staged_facts is not None:
+            _write_part(facts, staged_facts, first)
+        if incremental:
+            rejected_parts.append(rejected)
+        elif staged_rejected is not None:
+            _write_part(rejected, staged_rejected, first)
+        if staged_state is not None:
+            _write_part(state, staged_state, first)
+
+    facts = pd.concat(facts_parts, ignore_index=True)
+    decisions = pd.concat(decision_parts, ignore_index=True) if with_decisions else None
+    if not incremental:
+        return facts, (facts, decisions, None)
+
+    removed_ids = previous.loc[~previous["extract_id"].isin(pd.concat(seen_parts)), "extract_id"]
+    changed_ids = pd.concat(changed_parts)
+    new_facts = facts.drop_duplicates("extract_id", keep="last")
+    replaced_ids = pd.concat([changed_ids, removed_ids])
+    facts = _upsert_facts(output_csv, new_facts, replaced_ids)
+    if staged_rejected is not None:
+        previous_rejected = _read_or_empty(rejected_csv, REJECTED_COLUMNS)
+        carried = previous_rejected.loc[~previous_rejected["extract_id"].isin(replaced_ids)]
+        parts = [frame for frame in (carried, *rejected_parts) if not frame.empty]
+        rejected = (
+            pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=REJECTED_COLUMNS)
+        )
+        write_csv(rejected[REJECTED_COLUMNS], staged_rejected)
+    LOGGER.info(
+        "Incremental promotion: %d changed, %d removed",
+        len(changed_ids),
+        len(removed_ids),
+    )
+    return facts, (new_facts, decisions, replaced_ids)
+
+
+@instrumented_command("run-songshi-juan186-promote")
+def main(argv: list[str] | None = None) -> None:
     """CLI wrapper for review promotion step."""
-    facts = promote_reviewed_to_facts(INPUT_REVIEW_SHEET, OUTPUT_FACTS)
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Upsert only review rows changed since the last promotion.",
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=None,
+        help="Stream the review sheet in chunks of this many rows.",
+    )
+    parser.add_argument(
+        "--store",
+        type=Path,
+        nargs="?",
+        const=FACT_STORE_PATH,
+        default=None,
+        help="Mirror the promotion into the SQLite fact store (default path when no value).",
+    )
+    args = parser.parse_args(argv)
+
+    facts = promote_reviewed_to_facts(
+        INPUT_REVIEW_SHEET,
+        OUTPUT_FACTS,
+        rejected_csv=REJECTED_REPORT,
+        state_csv=REVIEW_STATE,
+        incremental=args.incremental,
+        chunksize=args.chunksize,
+        store=args.store,
+    )
     print(f"facts_csv: {OUTPUT_FACTS}")
     print(f"promoted_rows: {len(facts)}")
+    print(f"rejected_csv: {REJECTED_REPORT}")
+    if args.store is not None:
+        print(f"fact_store: {args.store}")
 
 
 if __name__ == "__main__":
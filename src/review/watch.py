@@ -0,0 +1,163 @@
+"""Keep the verified panel current while reviewers save review sheets."""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import threading
+import time
+from collections.abc import Callable
+from contextlib import nullcontext
+from dataclasses import dataclass
+from pathlib import Path
+
+import pandas as pd
+
+import pipeline_end_to_end as pipeline
+from instrumentation.run_manifest import recorded_run
+from panel.incremental import PANEL_STATE_DIR, update_panel_mode
+from review.promote_reviewed_to_facts import (
+    INPUT_REVIEW_SHEET,
+    REJECTED_REPORT,
+    REVIEW_STATE,
+    promote_reviewed_to_facts,
+)
+
+LOGGER = logging.getLogger(__name__)
+
+POLL_SECONDS = 0.1
+# A sheet is processed once its size and mtime have been unchanged this long.
+DEBOUNCE_SECONDS = 0.25
+# Command name of the run manifest each refresh writes when runs are recorded.
+REFRESH_COMMAND = "run-songshi-juan186-watch"
+
+
+def state_path(sheet: Path) -> Path:
+    """Return the promotion state file of a review sheet (``REVIEW_STATE`` for the default)."""
+    if sheet == INPUT_REVIEW_SHEET:
+        return REVIEW_STATE
+    return REVIEW_STATE.with_name(f"promotion_state_{sheet.stem}.csv")
+
+
+def rejected_path(sheet: Path) -> Path:
+    """Return the rejected-rows report of a review sheet."""
+    if sheet == INPUT_REVIEW_SHEET:
+        return REJECTED_REPORT
+    return REJECTED_REPORT.with_name(f"promotion_rejected_{sheet.stem}.csv")
+
+
+def _signature(path: Path) -> tuple[int, int] | None:
+    """Return (mtime_ns, size) of a file, or None when it does not exist."""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+@dataclass
+class _SheetState:
+    """Last processed and last observed signature of one sheet."""
+
+    processed: tuple[int, int] | None = None
+    observed: tuple[int, int] | None = None
+    observed_at: float = 0.0
+
+
+class ReviewWatcher:
+    """Poll review sheets and push changed rows through promotion and the verified panel.
+
+    Each settled save runs incremental promotion (only rows whose review hash changed are
+    re-promoted and upserted) and then ``update_panel_mode("verified")``, which diffs the facts
+    against the persisted panel aggregate and rewrites only touched panel rows. With
+    ``record_runs`` every refresh is recorded as its own run with a manifest.
+    """
+
+    def __init__(
+        self,
+        sheets: list[Path],
+        panel_state_dir: Path = PANEL_STATE_DIR,
+        debounce: float = DEBOUNCE_SECONDS,
+        on_refresh: Callable[[Path, pd.DataFrame], None] | None = None,
+        record_runs: bool = False,
+    ) -> None:
+        self.sheets = list(sheets)
+        self.panel_state_dir = panel_state_dir
+        self.debounce = debounce
+        self.on_refresh = on_refresh
+        self.record_runs = record_runs
+        self._states = {sheet: _SheetState() for sheet in self.sheets}
+
+    def refresh(self, sheet: Path) -> pd.DataFrame:
+        """Promote a sheet's changed rows and update the verified panel; return the panel."""
+        run = recorded_run(REFRESH_COMMAND, [str(sheet)]) if self.record_runs else nullcontext()
+        with run:
+            promote_reviewed_to_facts(
+                sheet,
+                pipeline.VERIFIED_FACTS_PATH,
+                rejected_csv=rejected_path(sheet),
+                state_csv=state_path(sheet),
+                incremental=True,
+            )
+            return update_panel_mode("verified", state_dir=self.panel_state_dir)
+
+    def poll(self, now: float | None = None) -> list[Path]:
+        """Check every sheet once and refresh those whose save has settled; return them."""
+        now = time.monotonic() if now is None else now
+        refreshed = []
+        for sheet, state in self._states.items():
+            signature = _signature(sheet)
+            if signature != state.observed:
+                state.observed, state.observed_at = signature, now
+                continue
+            settling = now - state.observed_at < self.debounce
+            if signature is None or signature == state.processed or settling:
+                continue
+            state.processed = signature
+            try:
+                panel = self.refresh(sheet)
+            except (pd.errors.ParserError, pd.errors.EmptyDataError, ValueError) as error:
+                LOGGER.warning("Skipping unreadable save of %s: %s", sheet, error)
+                continue
+            refreshed.append(sheet)
+            if self.on_refresh is not None:
+                self.on_refresh(sheet, panel)
+        return refreshed
+
+    def run(self, stop: threading.Event | None = None, interval: float = POLL_SECONDS) -> None:
+        """Poll until ``stop`` is set."""
+        stop = stop or threading.Event()
+        LOGGER.info("Watching %d review sheets", len(self.sheets))
+        while not stop.is_set():
+            self.poll()
+            stop.wait(interval)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """CLI wrapper for review-sheet watch mode; each refresh writes its own run manifest."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("sheets", type=Path, nargs="*", default=[INPUT_REVIEW_SHEET])
+    parser.add_argument(
+        "--interval", type=float, default=POLL_SECONDS, help="Seconds between polls."
+    )
+    parser.add_argument(
+        "--debounce", type=float, default=DEBOUNCE_SECONDS, help="Seconds a save must settle."
+    )
+    args = parser.parse_args(argv)
+
+    def report(sheet: Path, panel: pd.DataFrame) -> None:
+        print(f"refreshed: {sheet} verified_panel_rows: {len(panel)}", flush=True)
+
+    watcher = ReviewWatcher(
+        args.sheets, debounce=args.debounce, on_refresh=report, record_runs=True
+    )
+    for sheet in args.sheets:
+        print(f"watching: {sheet}")
+    try:
+        watcher.run(interval=args.interval)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
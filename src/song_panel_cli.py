@@ -0,0 +1,110 @@
+"""Single ``song-panel`` entry point dispatching to pipeline subcommands.
+
+Only the standard library is imported up front; each subcommand imports its module (and with it
+pandas, requests, bs4 or yaml) when it runs, so ``--help`` and light subcommands start fast.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import sys
+from collections.abc import Callable
+from typing import Any
+
+# name -> (module:function, help). Targets are the console-script entry points.
+SUBCOMMANDS: dict[str, tuple[str, str]] = {
+    "ingest": (
+        "songshi_juan186_workflow:run_songshi_juan186_ingest",
+        "Fetch Juan 186 and extract numeric candidates.",
+    ),
+    "crawl": ("ingest.crawl:main", "Crawl a list of pages under a resumable journal."),
+    "crawl-resume": (
+        "ingest.crawl:resume_main",
+        "Finish the pages an earlier crawl left unfinished.",
+    ),
+    "auto": (
+        "songshi_juan186_workflow:run_songshi_juan186_auto",
+        "Auto-organize candidates and build the auto panel.",
+    ),
+    "all": (
+        "songshi_juan186_workflow:run_songshi_juan186_all",
+        "Run ingest and auto in one command.",
+    ),
+    "rule-variants": (
+        "organize.rule_variants:main",
+        "Compare auto facts and panels across rule files.",
+    ),
+    "review": ("review.make_review_sheet:main", "Generate the human review sheet."),
+    "promote": ("review.promote_reviewed_to_facts:main", "Promote approved review rows to facts."),
+    "watch": ("review.watch:main", "Keep the verified panel live while review sheets are saved."),
+    "verified": (
+        "songshi_juan186_workflow:run_songshi_juan186_verified",
+        "Build the verified panel.",
+    ),
+    "pipeline": ("pipeline_end_to_end:run_pipeline", "Backward-compatible verified panel run."),
+    "cube": ("panel.cube:main", "Build the fiscal cube."),
+    "reconcile": ("panel.reconcile:main", "Reconcile facts across sources."),
+    "explain": ("panel.provenance:main", "Show the source text behind a panel cell."),
+    "serve": ("panel.service:main", "Serve panel and fact slices over local HTTP."),
+    "uncertainty": (
+        "panel.uncertainty:main",
+        "Sample uncertainty bands for panel values and shares.",
+    ),
+    "diff": ("storage.run_diff:main", "Diff candidates, facts and panels between two runs."),
+    "snapshot": (
+        "storage.snapshots:main",
+        "Snapshot current outputs into the content-addressed store.",
+    ),
+    "checkout": ("storage.snapshots:checkout_main", "Restore a snapshot's outputs through links."),
+    "fact-store": (
+        "storage.fact_store:main",
+        "Load, query or build panels from the SQLite fact store.",
+    ),
+    "synthetic": ("synthetic.songshi_corpus:main", "Write a synthetic Songshi-like corpus."),
+}
+
+
+def _load(target: str) -> Callable[..., Any]:
+    """Import ``module:function`` on demand."""
+    module_name, function_name = target.split(":")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def runs(argv: list[str]) -> None:
+    """Print recent run manifests as ``key: value`` lines."""
+    from instrumentation.run_manifest import latest_manifests
+
+    parser = argparse.ArgumentParser(prog="song-panel runs", description=runs.__doc__)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--command", default=None, help="Only runs of this console command.")
+    args = parser.parse_args(argv)
+
+    for manifest in latest_manifests(limit=args.limit, command=args.command):
+        print(
+            f"run: {manifest['run_id']} status: {manifest['status']} "
+            f"wall_seconds: {manifest['wall_seconds']:.3f}"
+        )
+
+
+def main(argv: list[str] | None = None) -> Any:
+    """Dispatch ``song-panel <subcommand> [args...]``."""
+    parser = argparse.ArgumentParser(
+        prog="song-panel",
+        description=__doc__,
+        epilog="Run `song-panel <subcommand> --help` for subcommand options; "
+        "pipeline subcommands also accept --profile and --trace-memory.",
+    )
+    subparsers = parser.add_subparsers(dest="subcommand", metavar="<subcommand>", required=True)
+    for name, (_, help_text) in SUBCOMMANDS.items():
+        subparsers.add_parser(name, help=help_text, add_help=False)
+    subparsers.add_parser("runs", help="List recent run manifests.", add_help=False)
+
+    args, remaining = parser.parse_known_args(sys.argv[1:] if argv is None else argv)
+    if args.subcommand == "runs":
+        return runs(remaining)
+    return _load(SUBCOMMANDS[args.subcommand][0])(remaining)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,78 @@
-"""CLI helpers for Songshi Juan 186 ingest/auto/verified workflows."""
+"""CLI helpers for Songshi Juan 186 ingest/auto/verified workflows.
+
+Pipeline modules are imported inside each command so a command only pays for the
+dependencies it uses.
+"""
 
 from __future__ import annotations
 
-from organize.auto_facts_songshi_juan186 import (
-    AUTO_FACTS_PATH,
-    CANDIDATES_PATH,
-    RULES_PATH,
-    auto_organize_facts,
-)
-from ingest_songshi_juan186 import run_songshi_juan186_pipeline
-from pipeline_end_to_end import run_auto_panel, run_panel_mode
+import argparse
+from pathlib import Path
+
+from instrumentation.run_manifest import instrumented_command
+
+# Mirrors organize.region_resolver.GAZETTEER_PATH without importing pandas at startup.
+DEFAULT_GAZETTEER = Path(__file__).resolve().parents[1] / "metadata" / "gazetteer_sample.csv"
 
 
+@instrumented_command("run-songshi-juan186-ingest")
 def run_songshi_juan186_ingest() -> None:
     """Fetch and extract Songshi Juan 186 candidates."""
+    from ingest_songshi_juan186 import run_songshi_juan186_pipeline
+
     run_songshi_juan186_pipeline()
 
 
-def run_songshi_juan186_auto() -> None:
+@instrumented_command("run-songshi-juan186-auto")
+def run_songshi_juan186_auto(argv: list[str] | None = None) -> None:
     """Auto-organize candidates to provisional facts and build auto panel."""
-    auto_organize_facts(CANDIDATES_PATH, AUTO_FACTS_PATH, RULES_PATH)
+    parser = argparse.ArgumentParser(description=run_songshi_juan186_auto.__doc__)
+    parser.add_argument(
+        "--gazetteer",
+        type=Path,
+        nargs="?",
+        const=DEFAULT_GAZETTEER,
+        default=None,
+        help="Resolve regions against a gazetteer instead of region_keywords.",
+    )
+    args = parser.parse_args(argv)
+
+    from organize.auto_facts_songshi_juan186 import (
+        AUTO_FACTS_PATH,
+        CANDIDATES_PATH,
+        RULES_PATH,
+        auto_organize_facts,
+    )
+    from pipeline_end_to_end import run_auto_panel
+
+    auto_organize_facts(CANDIDATES_PATH, AUTO_FACTS_PATH, RULES_PATH, gazetteer_path=args.gazetteer)
     panel = run_auto_panel()
     print(f"auto_panel_rows: {len(panel)}")
 
 
-def run_songshi_juan186_verified() -> None:
+@instrumented_command("run-songshi-juan186-verified")
+def run_songshi_juan186_verified(argv: list[str] | None = None) -> None:
     """Build verified panel from approved facts (or fallback seed when absent)."""
-    panel = run_panel_mode("verified")
+    parser = argparse.ArgumentParser(description=run_songshi_juan186_verified.__doc__)
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Apply fact changes since the last build to the persisted panel aggregate.",
+    )
+    args = parser.parse_args(argv)
+
+    if args.incremental:
+        from panel.incremental import update_panel_mode
+
+        panel = update_panel_mode("verified")
+    else:
+        from pipeline_end_to_end import run_panel_mode
+
+        panel = run_panel_mode("verified")
     print(f"verified_panel_rows: {len(panel)}")
 
 
+@instrumented_command("run-songshi-juan186-all")
 def run_songshi_juan186_all() -> None:
     """Run ingest + auto organization + auto panel in one command."""
     run_songshi_juan186_ingest()
@@ -0,0 +1,143 @@
+"""Atomic, lock-protected artifact writes shared by every pipeline stage.
+
+An artifact is written to a temp file named by the run's namespace in a staging directory
+next to it (``<dir>/.staging/``, so the rename never crosses filesystems), fsynced, and
+published with ``os.replace`` while holding the artifact's advisory lock
+(``<dir>/.locks/<name>.lock``). Readers therefore see either the previous or the new file,
+never a partial one, and concurrent runs writing the same artifact are serialized per
+artifact instead of per pipeline.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import threading
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from instrumentation.run_manifest import current_run_id, record_output
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None  # type: ignore[assignment]
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Overrides the staging namespace (defaults to the active run id, else the process id).
+NAMESPACE_ENV = "SONG_PANEL_NAMESPACE"
+STAGING_DIRNAME = ".staging"
+LOCKS_DIRNAME = ".locks"
+
+_held = threading.local()
+
+
+def run_namespace() -> str:
+    """Return the namespace prefixing the current run's staging files."""
+    namespace = os.environ.get(NAMESPACE_ENV) or current_run_id() or f"pid-{os.getpid()}"
+    return namespace.replace(os.sep, "_")
+
+
+def lock_path(path: Path) -> Path:
+    """Return the advisory lock file of an artifact."""
+    return path.parent / LOCKS_DIRNAME / f"{path.name}.lock"
+
+
+@contextmanager
+def artifact_lock(path: Path, shared: bool = False) -> Iterator[None]:
+    """Hold an advisory lock on an artifact; re-entrant within a thread.
+
+    Writers take it exclusively around read-modify-write sequences; ``shared=True`` lets
+    readers that need several artifacts to agree exclude writers meanwhile.
+    """
+    held: dict[Path, int] = _held.__dict__.setdefault("locks", {})
+    key = path.resolve()
+    if key in held or fcntl is None:
+        held[key] = held.get(key, 0) + 1
+        try:
+            yield
+        finally:
+            held[key] -= 1
+            if not held[key]:
+                del held[key]
+        return
+
+    target = lock_path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with target.open("a+b") as handle:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        held[key] = 1
+        try:
+            yield
+        finally:
+            del held[key]
+            fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+def _fsync_dir(directory: Path) -> None:
+    """Persist a rename in ``directory`` (best effort where directories cannot be opened)."""
+    try:
+        descriptor = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(descriptor)
+    except OSError:
+        pass
+    finally:
+        os.close(descriptor)
+
+
+@contextmanager
+def atomic_path(path: Path, append: bool = False) -> Iterator[Path]:
+    """Yield a staging path to write; publish it as ``path`` when the block succeeds.
+
+    With ``append=True`` the staging file starts as a copy of the current artifact, so callers
+    can append rows without readers ever seeing a partly appended file. If the block creates no
+    staging file, the artifact is left as it was.
+    """
+    staging = path.parent / STAGING_DIRNAME
+    staging.mkdir(parents=True, exist_ok=True)
+    staged = staging / f"{run_namespace()}.{path.name}.{uuid.uuid4().hex}"
+    with artifact_lock(path):
+        try:
+            if append and path.exists():
+                shutil.copyfile(path, staged)
+            yield staged
+            if not staged.exists():
+                return
+            with staged.open("rb") as handle:
+                os.fsync(handle.fileno())
+            os.replace(staged, path)
+        finally:
+            staged.unlink(missing_ok=True)
+        _fsync_dir(path.parent)
+    record_output(path)
+
+
+def write_text(path: Path, text: str, encoding: str = "utf-8") -> Path:
+    """Atomically write a text artifact."""
+    with atomic_path(path) as staged:
+        staged.write_text(text, encoding=encoding)
+    return path
+
+
+def write_csv(frame: pd.DataFrame, path: Path, **kwargs: Any) -> Path:
+    """Atomically write a frame with ``DataFrame.to_csv`` (``index=False`` unless given)."""
+    kwargs.setdefault("index", False)
+    with atomic_path(path) as staged:
+        frame.to_csv(staged, **kwargs)
+    return path
+
+
+def write_parquet(frame: pd.DataFrame, path: Path, **kwargs: Any) -> Path:
+    """Atomically write a frame with ``DataFrame.to_parquet`` (``index=False`` unless given)."""
+    kwargs.setdefault("index", False)
+    with atomic_path(path) as staged:
+        frame.to_parquet(staged, **kwargs)
+    return path
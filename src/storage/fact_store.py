@@ -0,0 +1,423 @@
+"""Optional SQLite store for candidates, auto and verified facts and review decisions.
+
+The CSVs stay the pipeline's canonical artifacts; the store mirrors them so lookups by
+period/region/topic, source, ``candidate_id`` or ``snippet_hash`` use indexes instead of
+scanning files. Writes are ``executemany`` upserts inside one transaction per call, and the
+database runs in WAL mode so readers (queries, panel builds) never block the writer.
+
+``build_panel`` pushes the panel aggregation down into SQL: unit conversion factors are
+resolved once per distinct (topic, unit, source) and joined in, so SQLite returns one summed
+row per (period, region, topic) instead of every fact.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import sqlite3
+import sys
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+
+import pandas as pd
+
+import pipeline_end_to_end as pipeline
+from instrumentation.run_manifest import current_stage, instrumented_command, stage, timed_stage
+from panel.units import load_unit_conversions, normalize_units
+from storage.atomic import artifact_lock, write_csv
+
+LOGGER = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+FACT_STORE_PATH = BASE_DIR / "data" / "02_intermediate" / "facts_songshi_juan186.sqlite"
+CANDIDATES_PATH = BASE_DIR / "data" / "02_intermediate" / "candidates_songshi_juan186.csv"
+REVIEW_SHEET_PATH = (
+    BASE_DIR / "data" / "02_intermediate" / "candidates_songshi_juan186_review_sheet.csv"
+)
+
+_FACT_COLUMNS = {
+    "extract_id": "TEXT NOT NULL",
+    "period": "TEXT",
+    "region": "TEXT",
+    "topic": "TEXT",
+    "value": "REAL",
+    "unit": "TEXT",
+    "confidence": "TEXT",
+    "review_status": "TEXT",
+    "source_ref": "TEXT",
+    "rule_trace": "TEXT",
+    "cluster_id": "TEXT",
+}
+_FACT_INDEXES = {"cell": ("period", "region", "topic"), "source": ("source",)}
+
+
+@dataclass(frozen=True)
+class TableSpec:
+    """Columns (name -> SQL type), primary key and secondary indexes of a store table."""
+
+    columns: dict[str, str]
+    key: str
+    indexes: dict[str, tuple[str, ...]]
+
+
+# Every table also gets a ``source`` column (``source_ref`` up to the first ``#``).
+TABLES: dict[str, TableSpec] = {
+    "candidates": TableSpec(
+        columns={
+            "candidate_id": "TEXT NOT NULL",
+            "source_work": "TEXT",
+            "source_url": "TEXT",
+            "source_ref": "TEXT",
+            "juan": "TEXT",
+            "char_start": "INTEGER",
+            "char_end": "INTEGER",
+            "snippet": "TEXT",
+            "snippet_hash": "TEXT",
+            "value_raw": "TEXT",
+            "value_num": "REAL",
+            "unit_raw": "TEXT",
+            "unit_std": "TEXT",
+            "keywords": "TEXT",
+            "candidate_topic": "TEXT",
+            "candidate_period": "TEXT",
+            "region": "TEXT",
+            "confidence": "TEXT",
+            "notes": "TEXT",
+            "cluster_id": "TEXT",
+            "cluster_size": "INTEGER",
+            "is_cluster_representative": "TEXT",
+        },
+        key="candidate_id",
+        indexes={
+            "cell": ("candidate_period", "region", "candidate_topic"),
+            "snippet_hash": ("snippet_hash",),
+            "source": ("source",),
+        },
+    ),
+    "auto_facts": TableSpec(columns=_FACT_COLUMNS, key="extract_id", indexes=_FACT_INDEXES),
+    "verified_facts": TableSpec(columns=_FACT_COLUMNS, key="extract_id", indexes=_FACT_INDEXES),
+    "review_decisions": TableSpec(
+        columns={
+            "extract_id": "TEXT NOT NULL",
+            "candidate_id": "TEXT",
+            "approve": "TEXT",
+            "final_period": "TEXT",
+            "final_topic": "TEXT",
+            "final_region": "TEXT",
+            "final_value_std": "TEXT",
+            "final_unit_std": "TEXT",
+            "confidence_override": "TEXT",
+            "source_ref": "TEXT",
+            "review_hash": "TEXT",
+            "status": "TEXT",
+            "reason": "TEXT",
+        },
+        key="extract_id",
+        indexes={"candidate_id": ("candidate_id",), "status": ("status",)},
+    ),
+}
+FACT_TABLES = {"auto": "auto_facts", "verified": "verified_facts"}
+QUERY_FILTERS = ("period", "region", "topic", "source", "candidate_id", "snippet_hash")
+# Candidates name their (unreviewed) period and topic differently from fact rows.
+CANDIDATE_ALIASES = {"period": "candidate_period", "topic": "candidate_topic"}
+# Joins a panel cell's extract ids in SQL; never appears in ids (ASCII unit separator).
+ID_SEPARATOR = "\x1f"
+
+
+def _source(source_ref: pd.Series) -> pd.Series:
+    """Return each ``source_ref`` up to its first ``#`` (the indexed ``source`` column)."""
+    return source_ref.astype("string").str.split("#", n=1).str[0]
+
+
+class FactStore:
+    """A SQLite database holding the store tables; use as a context manager."""
+
+    def __init__(self, path: Path = FACT_STORE_PATH) -> None:
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=30.0)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.connection:
+            for name, spec in TABLES.items():
+                columns = ", ".join(f"{column} {kind}" for column, kind in spec.columns.items())
+                self.connection.execute(
+                    f"CREATE TABLE IF NOT EXISTS {name} "
+                    f"({columns}, source TEXT, PRIMARY KEY ({spec.key}))"
+                )
+                for index, index_columns in spec.indexes.items():
+                    self.connection.execute(
+                        f"CREATE INDEX IF NOT EXISTS {name}_{index} "
+                        f"ON {name} ({', '.join(index_columns)})"
+                    )
+
+    def __enter__(self) -> FactStore:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def _rows(self, table: str, frame: pd.DataFrame) -> tuple[list[str], Iterable[tuple]]:
+        """Return the insert columns and row tuples (NaN as NULL) of ``frame`` for ``table``."""
+        spec = TABLES[table]
+        if spec.key not in frame.columns:
+            raise ValueError(f"{table} rows need a {spec.key} column")
+        columns = [column for column in spec.columns if column in frame.columns]
+        rows = frame[columns].drop_duplicates(spec.key, keep="last").astype(object)
+        has_ref = "source_ref" in columns
+        rows["source"] = _source(frame.loc[rows.index, "source_ref"]) if has_ref else None
+        rows = rows.where(rows.notna(), None)
+        return [*columns, "source"], rows.itertuples(index=False, name=None)
+
+    def _upsert(self, table: str, frame: pd.DataFrame) -> int:
+        """Insert ``frame`` rows, updating rows whose key already exists; return the row count."""
+        columns, rows = self._rows(table, frame)
+        key = TABLES[table].key
+        updates = ", ".join(f"{column} = excluded.{column}" for column in columns if column != key)
+        sql = (
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+            f"ON CONFLICT ({key}) DO UPDATE SET {updates}"
+        )
+        return self.connection.executemany(sql, rows).rowcount
+
+    def _delete(self, table: str, keys: Iterable[str]) -> int:
+        """Delete rows by key; return the number deleted."""
+        sql = f"DELETE FROM {table} WHERE {TABLES[table].key} = ?"
+        return self.connection.executemany(sql, ((str(key),) for key in keys)).rowcount
+
+    def apply(
+        self, table: str, upserts: pd.DataFrame | None = None, deletes: Iterable[str] = ()
+    ) -> None:
+        """Delete ``deletes`` keys and upsert ``upserts`` rows in one transaction."""
+        if table in FACT_TABLES.values() and upserts is not None and not upserts.empty:
+            pipeline.validate_columns(upserts)
+        with self.connection:
+            self._delete(table, deletes)
+            if upserts is not None and not upserts.empty:
+                self._upsert(table, upserts)
+
+    def replace(self, table: str, frame: pd.DataFrame) -> None:
+        """Replace a table's contents in one transaction."""
+        with self.connection:
+            self.connection.execute(f"DELETE FROM {table}")
+            if not frame.empty:
+                self._upsert(table, frame)
+
+    def count(self, table: str) -> int:
+        """Return the number of rows in ``table``."""
+        return self.connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def query(self, table: str, **filters: object) -> pd.DataFrame:
+        """Return rows matching column filters (a value or a list of values per column)."""
+        spec = TABLES[table]
+        clauses, params = [], []
+        for column, value in filters.items():
+            if value is None:
+                continue
+            if column not in spec.columns and column != "source":
+                raise ValueError(f"{table} has no column {column!r}")
+            values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+            clauses.append(f"{column} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        columns = ", ".join(spec.columns)
+        sql = f"SELECT {columns} FROM {table}{where}"
+        return pd.read_sql_query(sql, self.connection, params=params)
+
+    def _panel_filter(self, mode: str) -> tuple[str, list[str]]:
+        """Return the SQL predicate and params matching ``pipeline._filtered_for_panel``."""
+        periods, topics = sorted(pipeline.PERIODS), sorted(pipeline.TOPICS)
+        clauses = [
+            f"f.period IN ({', '.join('?' * len(periods))})",
+            f"f.topic IN ({', '.join('?' * len(topics))})",
+        ]
+        params = [*periods, *topics]
+        if mode == "auto":
+            regions = sorted(pipeline.AUTO_PANEL_REGIONS)
+            clauses.append(f"f.region IN ({', '.join('?' * len(regions))})")
+            params.extend(regions)
+        return " AND ".join(clauses), params
+
+    def _load_factors(self, table: str, where: str, params: list[str]) -> str:
+        """Fill ``temp.panel_factors`` with each convertible (topic, unit, source) scale.
+
+        Returns the fact column the factors are keyed on: ``source`` unless a unit override
+        prefix reaches past the ``#`` of a source_ref, in which case the full ``source_ref``.
+        """
+        conversions = load_unit_conversions()
+        by_ref = any("#" in prefix for prefix, _ in conversions.source_overrides)
+        key = "source_ref" if by_ref else "source"
+        groups = pd.read_sql_query(
+            f"SELECT DISTINCT f.topic, f.unit, f.{key} AS source_ref FROM {table} f WHERE {where}",
+            self.connection,
+            params=params,
+        )
+        # Converting a value of 1 yields the scale normalize_units would apply to each fact; its
+        # unconverted-facts warning would count groups, so it is left to the leftovers pass.
+        units_logger = logging.getLogger(normalize_units.__module__)
+        level = units_logger.level
+        units_logger.setLevel(logging.ERROR)
+        try:
+            scales = groups.assign(value=1.0, unit_key=groups["unit"])
+            converted, _ = normalize_units(scales, conversions)
+        finally:
+            units_logger.setLevel(level)
+        self.connection.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS panel_factors "
+            "(topic TEXT, unit TEXT, src TEXT, factor REAL)"
+        )
+        self.connection.execute("DELETE FROM temp.panel_factors")
+        factors = converted[["topic", "unit_key", "source_ref", "value"]]
+        self.connection.executemany(
+            "INSERT INTO temp.panel_factors VALUES (?, ?, ?, ?)",
+            factors.itertuples(index=False, name=None),
+        )
+        return key
+
+    @timed_stage("fact_store.panel")
+    def build_panel(self, mode: str) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """Aggregate a mode's facts in SQL; return (panel, unconverted facts) like a file build."""
+        if mode not in FACT_TABLES:
+            raise ValueError("mode must be one of {'auto','verified'}")
+        table = FACT_TABLES[mode]
+        where, params = self._panel_filter(mode)
+        with self.connection:
+            key = self._load_factors(table, where, params)
+            join = (
+                f"FROM {table} f JOIN temp.panel_factors c "
+                f"ON f.topic IS c.topic AND f.unit IS c.unit AND f.{key} IS c.src WHERE {where}"
+            )
+            with stage("fact_store.panel.query") as record:
+                grouped = pd.read_sql_query(
+                    f"SELECT f.period, f.region, f.topic, SUM(f.value * c.factor) AS topic_value, "
+                    f"group_concat(f.extract_id, ?) AS extract_ids {join} "
+                    "GROUP BY f.period, f.region, f.topic",
+                    self.connection,
+                    params=[ID_SEPARATOR, *params],
+                )
+                record.rows_out = len(grouped)
+            columns = ", ".join(f"f.{column}" for column in pipeline.REQUIRED_COLUMNS)
+            leftovers = pd.read_sql_query(
+                f"SELECT {columns} FROM {table} f LEFT JOIN temp.panel_factors c "
+                f"ON f.topic IS c.topic AND f.unit IS c.unit AND f.{key} IS c.src "
+                f"WHERE {where} AND c.factor IS NULL",
+                self.connection,
+                params=params,
+            )
+        extract_ids = grouped["extract_ids"].str.split(ID_SEPARATOR)
+        members = grouped[["period", "region"]].assign(extract_id=extract_ids)
+        members = members.explode("extract_id", ignore_index=True)
+        current_stage().rows_in = len(members) + len(leftovers)
+        _, unconverted = normalize_units(leftovers, load_unit_conversions())
+        return pipeline.assemble_panel(grouped.drop(columns="extract_ids"), members), unconverted
+
+
+def store_promotion(
+    store_path: Path,
+    facts: pd.DataFrame,
+    decisions: pd.DataFrame,
+    deletes: Iterable[str] | None = None,
+) -> None:
+    """Mirror a promotion: full replace when ``deletes`` is None, else indexed upserts."""
+    with FactStore(store_path) as store:
+        if deletes is None:
+            store.replace("verified_facts", facts)
+            store.replace("review_decisions", decisions)
+            return
+        deletes = list(deletes)
+        store.apply("verified_facts", facts, deletes)
+        store.apply("review_decisions", decisions, deletes)
+
+
+@timed_stage("fact_store.load")
+def load_store(store_path: Path = FACT_STORE_PATH) -> dict[str, int]:
+    """(Re)load every store table from the pipeline's CSV artifacts; return row counts."""
+    from review.promote_reviewed_to_facts import review_decisions
+
+    sources = {
+        "candidates": CANDIDATES_PATH,
+        "auto_facts": pipeline.AUTO_FACTS_PATH,
+        "verified_facts": pipeline.VERIFIED_FACTS_PATH,
+    }
+    counts = {}
+    with FactStore(store_path) as store:
+        for table, path in sources.items():
+            if _readable(path):
+                frame = pd.read_csv(path, dtype={TABLES[table].key: str})
+            else:
+                frame = pd.DataFrame()
+            store.replace(table, frame)
+            counts[table] = store.count(table)
+        decisions = pd.DataFrame()
+        if _readable(REVIEW_SHEET_PATH):
+            decisions = review_decisions(pd.read_csv(REVIEW_SHEET_PATH, dtype=str))
+        store.replace("review_decisions", decisions)
+        counts["review_decisions"] = store.count("review_decisions")
+    current_stage().rows_out = sum(counts.values())
+    return counts
+
+
+def _readable(path: Path) -> bool:
+    """Return whether ``path`` exists and is non-empty."""
+    return path.exists() and path.stat().st_size > 0
+
+
+@timed_stage("panel")
+def run_panel_mode_from_store(mode: str, store_path: Path = FACT_STORE_PATH) -> pd.DataFrame:
+    """Rebuild a mode's panel CSV/Arrow and unconverted-units table from the store.
+
+    Provenance and facts exports need every fact row and are left to ``run_panel_mode``.
+    """
+    output_path = pipeline.AUTO_PANEL_PATH if mode == "auto" else pipeline.VERIFIED_PANEL_PATH
+    with artifact_lock(output_path), FactStore(store_path) as store:
+        panel, unconverted = store.build_panel(mode)
+        with stage("panel.write"):
+            pipeline.write_panel_csv(panel, output_path)
+            write_csv(unconverted, pipeline.unconverted_units_path(output_path))
+            pipeline.write_arrow(panel, pipeline.arrow_path(output_path))
+            if mode == "verified" and not panel.empty:
+                pipeline.write_panel_csv(panel, pipeline.LEGACY_PANEL_PATH)
+    return panel
+
+
+@instrumented_command("run-songshi-juan186-fact-store")
+def main(argv: list[str] | None = None) -> None:
+    """CLI wrapper: load the store from CSVs, query it, or build a panel from it."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--store", type=Path, default=FACT_STORE_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("load", help="Reload every table from the CSV artifacts.")
+    query = commands.add_parser("query", help="Print matching rows as CSV.")
+    query.add_argument("table", choices=sorted(TABLES))
+    for column in QUERY_FILTERS:
+        query.add_argument(f"--{column.replace('_', '-')}", dest=column, action="append")
+    panel = commands.add_parser("panel", help="Rebuild a panel with SQL aggregation.")
+    panel.add_argument("--mode", choices=sorted(FACT_TABLES), default="verified")
+    args = parser.parse_args(argv)
+
+    if args.command == "query":
+        aliases = CANDIDATE_ALIASES if args.table == "candidates" else {}
+        filters = {aliases.get(column, column): getattr(args, column) for column in QUERY_FILTERS}
+        filters = {column: value for column, value in filters.items() if value is not None}
+        unknown = set(filters) - {*TABLES[args.table].columns, "source"}
+        if unknown:
+            parser.error(f"{args.table} cannot be filtered by {', '.join(sorted(unknown))}")
+        with FactStore(args.store) as store:
+            store.query(args.table, **filters).to_csv(sys.stdout, index=False)
+        return
+
+    print(f"fact_store: {args.store}")
+    if args.command == "load":
+        for table, count in load_store(args.store).items():
+            print(f"{table}: {count}")
+    else:
+        rows = len(run_panel_mode_from_store(args.mode, args.store))
+        print(f"{args.mode}_panel_rows: {rows}")
+
+
+if __name__ == "__main__":
+    main()
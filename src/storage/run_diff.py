@@ -0,0 +1,249 @@
+"""Diff two runs' candidates, facts and panels with hash joins and per-row fingerprints.
+
+Rows are matched on their key (``candidate_id``, ``extract_id`` or ``(period, region)``) through
+a hash index and compared by a 64-bit fingerprint of their shared columns, so a diff is linear
+in the table sizes; column-level deltas are computed only for rows whose fingerprints differ.
+Cells are compared as the text stored in the CSVs, so any change the files show is reported.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import pipeline_end_to_end as pipeline
+from instrumentation.run_manifest import current_stage, instrumented_command, stage, timed_stage
+from organize.auto_facts_songshi_juan186 import AUTO_FACTS_PATH, CANDIDATES_PATH
+from storage.atomic import write_csv
+
+LOGGER = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+DIFF_DIR = BASE_DIR / "data" / "02_intermediate" / "run_diff"
+
+# table -> (key columns, artifact path within a run root)
+TABLES: dict[str, tuple[list[str], Path]] = {
+    "candidates": (["candidate_id"], CANDIDATES_PATH),
+    "auto_facts": (["extract_id"], AUTO_FACTS_PATH),
+    "verified_facts": (["extract_id"], pipeline.VERIFIED_FACTS_PATH),
+    "panel_auto": (["period", "region"], pipeline.AUTO_PANEL_PATH),
+    "panel_verified": (["period", "region"], pipeline.VERIFIED_PANEL_PATH),
+}
+DELTA_COLUMNS = ["change", "column", "old", "new", "delta"]
+SUMMARY_COLUMNS = [
+    "table",
+    "old_rows",
+    "new_rows",
+    "added",
+    "removed",
+    "changed",
+    "unchanged",
+    "columns_added",
+    "columns_removed",
+]
+
+
+@dataclass
+class TableDiff:
+    """Row and cell changes between two versions of one table."""
+
+    table: str
+    keys: list[str]
+    old_rows: int
+    new_rows: int
+    counts: dict[str, int]
+    delta: pd.DataFrame
+    columns_added: list[str] = field(default_factory=list)
+    columns_removed: list[str] = field(default_factory=list)
+
+
+def read_table(path: Path) -> pd.DataFrame:
+    """Read a CSV or parquet table with every cell as its stored text ('' for empty)."""
+    if path.suffix == ".parquet":
+        frame = pd.read_parquet(path)
+        return frame.astype("string").fillna("").astype(object)
+    if not path.exists() or path.stat().st_size == 0:
+        return pd.DataFrame()
+    return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+
+def _fingerprints(frame: pd.DataFrame, columns: list[str]) -> np.ndarray:
+    """Return a uint64 content hash per row over ``columns`` (in that order)."""
+    if not columns:
+        return np.zeros(len(frame), dtype=np.uint64)
+    # Skip the factorize pass: fingerprinted columns are mostly high-cardinality text.
+    return pd.util.hash_pandas_object(frame[columns], index=False, categorize=False).to_numpy()
+
+
+def _key_index(frame: pd.DataFrame, keys: list[str]) -> pd.Index:
+    if len(keys) == 1:
+        return pd.Index(frame[keys[0]], name=keys[0])
+    return pd.MultiIndex.from_frame(frame[keys])
+
+
+def _numeric_delta(old: pd.Series, new: pd.Series) -> pd.Series:
+    """Return new - old where both cells parse as numbers, else NaN."""
+    return pd.to_numeric(new, errors="coerce") - pd.to_numeric(old, errors="coerce")
+
+
+def diff_tables(
+    old: pd.DataFrame, new: pd.DataFrame, keys: list[str], table: str = "table"
+) -> TableDiff:
+    """Hash-join ``old`` and ``new`` on ``keys`` and report added, removed and changed rows.
+
+    The delta frame has the key columns plus ``change``; changed rows get one line per changed
+    column with ``old``/``new`` text and a numeric ``delta`` where both parse as numbers.
+    Duplicate keys keep their last row.
+    """
+    for frame, side in ((old, "old"), (new, "new")):
+        missing = [key for key in keys if key not in frame.columns]
+        if missing and not frame.empty:
+            raise ValueError(f"{side} {table} is missing key columns: {missing}")
+    if old.empty:
+        old = pd.DataFrame(columns=new.columns if not new.empty else keys)
+    if new.empty:
+        new = pd.DataFrame(columns=old.columns)
+    old = old.drop_duplicates(keys, keep="last").reset_index(drop=True)
+    new = new.drop_duplicates(keys, keep="last").reset_index(drop=True)
+
+    shared = [column for column in new.columns if column in old.columns and column not in keys]
+    old_index = _key_index(old, keys)
+    new_index = _key_index(new, keys)
+    # Hash join: position of each new row's key in the old table (-1 when absent).
+    positions = old_index.get_indexer(new_index)
+    matched = positions >= 0
+    new_rows = np.flatnonzero(matched)
+    old_rows = positions[matched]
+    unmatched_old = np.ones(len(old), dtype=bool)
+    unmatched_old[old_rows] = False
+    added = new.loc[~matched, keys]
+    removed = old.loc[unmatched_old, keys]
+
+    differs = _fingerprints(new, shared)[new_rows] != _fingerprints(old, shared)[old_rows]
+    new_changed, old_changed = new_rows[differs], old_rows[differs]
+
+    parts = [added.assign(change="added"), removed.assign(change="removed")]
+    for column in shared:
+        old_values = old[column].to_numpy()[old_changed]
+        new_values = new[column].to_numpy()[new_changed]
+        moved = old_values != new_values
+        if not moved.any():
+            continue
+        cells = new.loc[new_changed[moved], keys].reset_index(drop=True)
+        cells["change"] = "changed"
+        cells["column"] = column
+        cells["old"] = old_values[moved]
+        cells["new"] = new_values[moved]
+        cells["delta"] = _numeric_delta(cells["old"], cells["new"])
+        parts.append(cells)
+
+    parts = [part for part in parts if not part.empty]
+    delta = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+    delta = delta.reindex(columns=[*keys, *DELTA_COLUMNS])
+    counts = {"added": len(added), "removed": len(removed), "changed": int(differs.sum())}
+    return TableDiff(
+        table=table,
+        keys=keys,
+        old_rows=len(old),
+        new_rows=len(new),
+        counts=counts,
+        delta=delta,
+        columns_added=[column for column in new.columns if column not in old.columns],
+        columns_removed=[column for column in old.columns if column not in new.columns],
+    )
+
+
+def run_artifact(root: Path, table: str) -> Path:
+    """Return where ``table`` lives under a run root laid out like the repository."""
+    return root / TABLES[table][1].relative_to(BASE_DIR)
+
+
+def infer_table(path: Path) -> str:
+    """Guess a table kind from a file's columns."""
+    columns = set(read_table(path).columns)
+    if "candidate_id" in columns:
+        return "candidates"
+    if "extract_id" in columns:
+        return "auto_facts"
+    if {"period", "region"} <= columns:
+        return "panel_auto"
+    raise ValueError(f"Cannot tell which table {path} is; pass --table")
+
+
+@timed_stage("run_diff")
+def diff_runs(old: Path, new: Path, table: str | None = None) -> list[TableDiff]:
+    """Diff two table files, or every known table present under two run roots."""
+    if old.is_file() or new.is_file():
+        pairs = [(table or infer_table(new if new.is_file() else old), old, new)]
+    else:
+        pairs = [
+            (name, run_artifact(old, name), run_artifact(new, name))
+            for name in ([table] if table else TABLES)
+            if run_artifact(old, name).exists() or run_artifact(new, name).exists()
+        ]
+
+    diffs = []
+    for name, old_path, new_path in pairs:
+        with stage(f"run_diff.{name}") as record:
+            old_frame, new_frame = read_table(old_path), read_table(new_path)
+            record.rows_in = len(old_frame) + len(new_frame)
+            result = diff_tables(old_frame, new_frame, TABLES[name][0], table=name)
+            record.rows_out = len(result.delta)
+        LOGGER.info("%s: %s", name, result.counts)
+        diffs.append(result)
+    current_stage().rows_out = sum(len(result.delta) for result in diffs)
+    return diffs
+
+
+def summarize_diffs(diffs: list[TableDiff]) -> pd.DataFrame:
+    """Return one summary row per diffed table."""
+    rows = [
+        {
+            "table": result.table,
+            "old_rows": result.old_rows,
+            "new_rows": result.new_rows,
+            **result.counts,
+            "unchanged": result.new_rows - result.counts["added"] - result.counts["changed"],
+            "columns_added": "|".join(result.columns_added),
+            "columns_removed": "|".join(result.columns_removed),
+        }
+        for result in diffs
+    ]
+    return pd.DataFrame(rows, columns=SUMMARY_COLUMNS)
+
+
+def write_diffs(diffs: list[TableDiff], out_dir: Path = DIFF_DIR) -> pd.DataFrame:
+    """Write ``<table>_delta.csv`` per table plus ``summary.csv``; return the summary."""
+    for result in diffs:
+        write_csv(result.delta, out_dir / f"{result.table}_delta.csv")
+    summary = summarize_diffs(diffs)
+    write_csv(summary, out_dir / "summary.csv")
+    return summary
+
+
+@instrumented_command("run-songshi-juan186-diff")
+def main(argv: list[str] | None = None) -> None:
+    """CLI wrapper for run-to-run diffs."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("old", type=Path, help="Old table file or run root.")
+    parser.add_argument("new", type=Path, help="New table file or run root.")
+    parser.add_argument("--table", choices=sorted(TABLES), default=None)
+    parser.add_argument("--out-dir", type=Path, default=DIFF_DIR)
+    args = parser.parse_args(argv)
+
+    summary = write_diffs(diff_runs(args.old, args.new, args.table), args.out_dir)
+    print(f"run_diff_dir: {args.out_dir}")
+    for row in summary.itertuples():
+        print(
+            f"run_diff: {row.table} added={row.added} removed={row.removed} "
+            f"changed={row.changed} unchanged={row.unchanged}"
+        )
+
+
+if __name__ == "__main__":
+    main()
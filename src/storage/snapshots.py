@@ -0,0 +1,313 @@
+"""Content-addressed snapshots of pipeline outputs.
+
+``snapshot`` hashes every artifact under ``data/02_intermediate`` and ``data/03_primary``,
+stores each distinct content once as a gzip blob named by its SHA-256
+(``objects/<2 hex>/<62 hex>.gz``) and writes a per-run manifest mapping paths to hashes, so an
+unchanged artifact costs only a manifest line. A stat cache (size, mtime) skips re-hashing files
+that have not been rewritten since the last snapshot.
+
+``checkout`` restores a snapshot into a directory laid out like the repository. Each blob is
+decompressed once into a read-only cache and then reflinked, hardlinked or (across
+filesystems) copied into place, so repeated checkouts of mostly identical runs are cheap.
+Pipeline writes replace files by rename, which never modifies a linked cache file.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from instrumentation.run_manifest import (
+    current_run_id,
+    current_stage,
+    instrumented_command,
+    latest_manifests,
+    timed_stage,
+)
+from storage.atomic import atomic_path, write_text
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None  # type: ignore[assignment]
+
+LOGGER = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+SNAPSHOT_DIR = BASE_DIR / "data" / "snapshots"
+SNAPSHOT_SOURCES = (
+    BASE_DIR / "data" / "02_intermediate",
+    BASE_DIR / "data" / "03_primary",
+)
+# Their own runs are never what a snapshot's default id should name.
+SNAPSHOT_COMMANDS = ("run-songshi-juan186-snapshot", "run-songshi-juan186-checkout")
+LINK_MODES = ("auto", "reflink", "hardlink", "copy")
+CHUNK_BYTES = 1 << 20
+# Linux FICLONE ioctl: share extents copy-on-write (btrfs, XFS, ...).
+FICLONE = 0x40049409
+
+
+@dataclass
+class SnapshotResult:
+    """What a snapshot recorded and how much new blob storage it needed."""
+
+    snapshot_id: str
+    manifest_path: Path
+    files: int
+    bytes_total: int
+    blobs_new: int
+    bytes_stored: int
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        while chunk := handle.read(CHUNK_BYTES):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _artifacts(sources: tuple[Path, ...]) -> list[Path]:
+    """Return files under ``sources``, skipping hidden staging, lock and temp files."""
+    files = []
+    for source in sources:
+        if not source.exists():
+            continue
+        for path in sorted(source.rglob("*")):
+            relative = path.relative_to(source)
+            if path.is_file() and not any(part.startswith(".") for part in relative.parts):
+                files.append(path)
+    return files
+
+
+def _reflink(source: Path, target: Path) -> None:
+    if fcntl is None:
+        raise OSError("reflinks are not supported on this platform")
+    with source.open("rb") as src, target.open("wb") as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+
+
+def _place(source: Path, target: Path, mode: str) -> str:
+    """Publish ``source`` at ``target`` by reflink, hardlink or copy; return the method used."""
+    methods = ("reflink", "hardlink", "copy") if mode == "auto" else (mode,)
+    with atomic_path(target) as staged:
+        for method in methods:
+            try:
+                if method == "reflink":
+                    _reflink(source, staged)
+                elif method == "hardlink":
+                    os.link(source, staged)
+                else:
+                    shutil.copyfile(source, staged)
+                return method
+            except OSError as exc:
+                staged.unlink(missing_ok=True)
+                if method == methods[-1]:
+                    raise
+                LOGGER.debug("%s of %s failed (%s); falling back", method, source, exc)
+    raise AssertionError("unreachable")  # pragma: no cover
+
+
+class SnapshotStore:
+    """Blob store, snapshot manifests and checkout cache under one root directory."""
+
+    def __init__(self, root: Path = SNAPSHOT_DIR, base_dir: Path = BASE_DIR) -> None:
+        self.root = root
+        self.base_dir = base_dir
+
+    @property
+    def manifests_dir(self) -> Path:
+        return self.root / "manifests"
+
+    def blob_path(self, digest: str) -> Path:
+        """Return the compressed blob of a content hash."""
+        return self.root / "objects" / digest[:2] / f"{digest[2:]}.gz"
+
+    def cache_path(self, digest: str) -> Path:
+        """Return the decompressed, read-only copy of a blob that checkouts link to."""
+        return self.root / "cache" / digest[:2] / digest[2:]
+
+    def manifest_path(self, snapshot_id: str) -> Path:
+        return self.manifests_dir / f"{snapshot_id}.json"
+
+    def _stat_cache(self) -> dict[str, list[Any]]:
+        path = self.root / "stat_cache.json"
+        if not path.exists():
+            return {}
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def put(self, path: Path, digest: str | None = None) -> tuple[str, int]:
+        """Store ``path``'s content if new; return (sha256, compressed bytes written)."""
+        digest = digest or _sha256(path)
+        blob = self.blob_path(digest)
+        if blob.exists():
+            return digest, 0
+        # Blobs are immutable and named by content, so concurrent writers race harmlessly and
+        # need no artifact lock: stage under tmp/ and rename.
+        staged = self.root / "tmp" / f"{digest}.{os.getpid()}"
+        staged.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            with path.open("rb") as src, gzip.GzipFile(staged, "wb", mtime=0) as dst:
+                shutil.copyfileobj(src, dst, CHUNK_BYTES)
+            with staged.open("rb") as handle:
+                os.fsync(handle.fileno())
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(staged, blob)
+        finally:
+            staged.unlink(missing_ok=True)
+        return digest, blob.stat().st_size
+
+    @timed_stage("snapshot")
+    def snapshot(
+        self,
+        snapshot_id: str | None = None,
+        sources: tuple[Path, ...] = SNAPSHOT_SOURCES,
+    ) -> SnapshotResult:
+        """Record the current artifacts under ``sources`` as a snapshot."""
+        runs = [run for run in latest_manifests(limit=5) if run["command"] not in SNAPSHOT_COMMANDS]
+        run_id = runs[0]["run_id"] if runs else None
+        snapshot_id = snapshot_id or run_id or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        manifest_path = self.manifest_path(snapshot_id)
+        if manifest_path.exists():
+            raise ValueError(f"snapshot {snapshot_id!r} already exists")
+
+        stat_cache = self._stat_cache()
+        files = []
+        blobs_new = bytes_stored = 0
+        for path in _artifacts(sources):
+            stat = path.stat()
+            key = str(path.resolve())
+            cached = stat_cache.get(key)
+            fresh = cached is not None and cached[:2] == [stat.st_size, stat.st_mtime_ns]
+            digest, stored = self.put(path, cached[2] if fresh else None)
+            if not fresh or stored:
+                stat_cache[key] = [stat.st_size, stat.st_mtime_ns, digest]
+            blobs_new += bool(stored)
+            bytes_stored += stored
+            relative = path.relative_to(self.base_dir).as_posix()
+            files.append({"path": relative, "sha256": digest, "size": stat.st_size})
+        current_stage().rows_in = len(files)
+
+        manifest = {
+            "snapshot_id": snapshot_id,
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "source_run_id": run_id,
+            "snapshot_run_id": current_run_id(),
+            "files": files,
+        }
+        write_text(manifest_path, json.dumps(manifest, ensure_ascii=False, indent=2))
+        write_text(self.root / "stat_cache.json", json.dumps(stat_cache, indent=0))
+        return SnapshotResult(
+            snapshot_id=snapshot_id,
+            manifest_path=manifest_path,
+            files=len(files),
+            bytes_total=sum(entry["size"] for entry in files),
+            blobs_new=blobs_new,
+            bytes_stored=bytes_stored,
+        )
+
+    def load(self, snapshot_id: str) -> dict[str, Any]:
+        """Return a snapshot manifest."""
+        path = self.manifest_path(snapshot_id)
+        if not path.exists():
+            raise FileNotFoundError(f"no snapshot {snapshot_id!r} in {self.manifests_dir}")
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def snapshots(self) -> list[dict[str, Any]]:
+        """Return all snapshot manifests, oldest first."""
+        if not self.manifests_dir.exists():
+            return []
+        manifests = [
+            json.loads(path.read_text(encoding="utf-8"))
+            for path in self.manifests_dir.glob("*.json")
+        ]
+        return sorted(
+            manifests, key=lambda manifest: (manifest["created_at"], manifest["snapshot_id"])
+        )
+
+    def materialize(self, digest: str) -> Path:
+        """Decompress a blob into the checkout cache once (read-only) and return its path."""
+        cached = self.cache_path(digest)
+        if cached.exists():
+            return cached
+        with atomic_path(cached) as staged, gzip.open(self.blob_path(digest), "rb") as src:
+            with staged.open("wb") as dst:
+                shutil.copyfileobj(src, dst, CHUNK_BYTES)
+            if _sha256(staged) != digest:
+                raise ValueError(f"blob {digest} is corrupt")
+            staged.chmod(0o444)
+        return cached
+
+    @timed_stage("checkout")
+    def checkout(
+        self, snapshot_id: str, dest: Path | None = None, mode: str = "auto"
+    ) -> dict[str, int]:
+        """Restore a snapshot's files under ``dest``; return how many used each link method."""
+        if mode not in LINK_MODES:
+            raise ValueError(f"mode must be one of {LINK_MODES}")
+        manifest = self.load(snapshot_id)
+        dest = dest or self.root / "checkouts" / snapshot_id
+        current_stage().rows_in = len(manifest["files"])
+        methods = {"reflink": 0, "hardlink": 0, "copy": 0}
+        for entry in manifest["files"]:
+            method = _place(self.materialize(entry["sha256"]), dest / entry["path"], mode)
+            methods[method] += 1
+        return methods
+
+
+@instrumented_command("run-songshi-juan186-snapshot")
+def main(argv: list[str] | None = None) -> None:
+    """CLI wrapper: snapshot current outputs, or list snapshots."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--id", dest="snapshot_id", default=None, help="Defaults to the latest run id."
+    )
+    parser.add_argument("--store", type=Path, default=SNAPSHOT_DIR)
+    parser.add_argument("--list", action="store_true", help="List snapshots instead of taking one.")
+    args = parser.parse_args(argv)
+
+    store = SnapshotStore(args.store)
+    if args.list:
+        for manifest in store.snapshots():
+            size = sum(entry["size"] for entry in manifest["files"])
+            files = len(manifest["files"])
+            print(f"snapshot: {manifest['snapshot_id']} files={files} bytes={size}")
+        return
+    result = store.snapshot(args.snapshot_id)
+    print(f"snapshot: {result.snapshot_id}")
+    print(f"snapshot_manifest: {result.manifest_path}")
+    print(f"files: {result.files} bytes: {result.bytes_total}")
+    print(f"new_blobs: {result.blobs_new} stored_bytes: {result.bytes_stored}")
+
+
+@instrumented_command("run-songshi-juan186-checkout")
+def checkout_main(argv: list[str] | None = None) -> None:
+    """CLI wrapper: restore a snapshot's outputs through links."""
+    parser = argparse.ArgumentParser(description=checkout_main.__doc__)
+    parser.add_argument("snapshot_id")
+    parser.add_argument(
+        "--dest", type=Path, default=None, help="Defaults to <store>/checkouts/<id>."
+    )
+    parser.add_argument("--store", type=Path, default=SNAPSHOT_DIR)
+    parser.add_argument("--mode", choices=LINK_MODES, default="auto")
+    args = parser.parse_args(argv)
+
+    store = SnapshotStore(args.store)
+    dest = args.dest or store.root / "checkouts" / args.snapshot_id
+    methods = store.checkout(args.snapshot_id, dest, args.mode)
+    print(f"checkout: {dest}")
+    for method, count in methods.items():
+        print(f"{method}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""Deterministic Songshi-like synthetic corpus for scaling and benchmark runs.
+
+Generated text is fiction shaped like Juan 186 (era + region + fiscal keyword + numeral +
+unit statements interleaved with numeral-free narrative clauses). It must never be mixed
+into ``data/`` source material.
+"""
+
+from __future__ import annotations
+
+import argparse
+import html
+import random
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+
+from storage.atomic import write_text
+
+# (simplified, traditional) spellings; labels match the era/topic/region rule vocabularies.
+ERA_FORMS: dict[str, tuple[str, str]] = {
+    "XINNING": ("熙宁", "熙寧"),
+    "YUANFENG": ("元丰", "元豐"),
+    "SHAOSHENG": ("绍圣", "紹聖"),
+    "HUIZONG": ("崇宁", "崇寧"),
+}
+TOPIC_FORMS: dict[str, tuple[str, str]] = {
+    "shangshui": ("商税", "商稅"),
+    "liangshui": ("两税", "兩稅"),
+    "revenue_total": ("诸色课入", "諸色課入"),
+    "salt": ("盐利", "鹽利"),
+    "tea": ("茶课", "茶課"),
+    "grain": ("籴本", "糴本"),
+}
+REGION_FORMS: dict[str, tuple[str, str]] = {
+    "NATIONAL": ("天下", "天下"),
+    "NORTH": ("河东", "河東"),
+    "SOUTH": ("江南", "江南"),
+    "unknown": ("州县", "州縣"),
+}
+UNIT_TOKENS: dict[str, str] = {
+    "貫": "guan",
+    "緡": "guan",
+    "石": "shi",
+    "斛": "hu",
+    "匹": "pi",
+    "斤": "jin",
+    "文": "wen",
+}
+# Cash units dominate fiscal statements, as in the Juan 186 sample.
+DEFAULT_UNIT_WEIGHTS: dict[str, float] = {
+    "貫": 4.0,
+    "緡": 3.0,
+    "文": 1.0,
+    "石": 1.0,
+    "斛": 0.5,
+    "匹": 0.5,
+    "斤": 0.5,
+}
+ERA_SUFFIXES = ("中", "间", "初", "末")
+VERBS = ("岁入", "增至", "收", "定为", "减为")
+# Narrative clauses free of numeral characters and fiscal keywords.
+FILLER_CLAUSES = (
+    ("诏有司议其事", "詔有司議其事"),
+    ("帝曰可", "帝曰可"),
+    ("民以为便", "民以為便"),
+    ("因请罢之", "因請罷之"),
+    ("自是岁以为常", "自是歲以為常"),
+    ("有司言其弊", "有司言其弊"),
+    ("议者非之", "議者非之"),
+    ("遂著为令", "遂著為令"),
+)
+DIGITS = "〇一二三四五六七八九"
+
+
+def to_chinese_numeral(value: int) -> str:
+    """Render 0 < value < 10**8 in the positional form ``parse_chinese_numeral`` reads."""
+    if value <= 0 or value >= 100_000_000:
+        raise ValueError("value must be in 1..99999999")
+
+    def below_10k(number: int) -> str:
+        parts = []
+        for unit_value, unit in ((1000, "千"), (100, "百"), (10, "十")):
+            digit, number = divmod(number, unit_value)
+            if digit:
+                parts.append(DIGITS[digit] + unit)
+        if number:
+            parts.append(DIGITS[number])
+        return "".join(parts)
+
+    high, low = divmod(value, 10_000)
+    return (below_10k(high) + "万" if high else "") + (below_10k(low) if low else "")
+
+
+def _weighted(rng: random.Random, weights: dict[str, float]) -> str:
+    labels = list(weights)
+    return rng.choices(labels, weights=[weights[label] for label in labels])[0]
+
+
+def _uniform(labels: dict[str, object]) -> dict[str, float]:
+    return {label: 1.0 for label in labels}
+
+
+@dataclass(frozen=True)
+class CorpusSpec:
+    """Size and frequency knobs; the same spec and seed always yield the same corpus."""
+
+    sentences: int = 200
+    numeral_density: float = 0.6
+    traditional_ratio: float = 0.3
+    arabic_ratio: float = 0.1
+    sentences_per_paragraph: int = 4
+    era_weights: dict[str, float] = field(default_factory=lambda: _uniform(ERA_FORMS))
+    topic_weights: dict[str, float] = field(default_factory=lambda: _uniform(TOPIC_FORMS))
+    region_weights: dict[str, float] = field(default_factory=lambda: _uniform(REGION_FORMS))
+    unit_weights: dict[str, float] = field(default_factory=lambda: dict(DEFAULT_UNIT_WEIGHTS))
+    seed: int = 186
+
+    def scaled(self, factor: int) -> CorpusSpec:
+        """Return the same spec with ``factor`` times as many sentences."""
+        return replace(self, sentences=self.sentences * factor)
+
+
+def _sentence(rng: random.Random, spec: CorpusSpec) -> str:
+    """Return one fiscal statement or narrative sentence."""
+    form = 1 if rng.random() < spec.traditional_ratio else 0
+    if rng.random() >= spec.numeral_density:
+        first, second = rng.sample(FILLER_CLAUSES, 2)
+        return f"{first[form]}，{second[form]}。"
+
+    era = ERA_FORMS[_weighted(rng, spec.era_weights)][form]
+    region = REGION_FORMS[_weighted(rng, spec.region_weights)][form]
+    topic = TOPIC_FORMS[_weighted(rng, spec.topic_weights)][form]
+    unit = _weighted(rng, spec.unit_weights)
+    value = rng.randint(1, 9_999_999)
+    numeral = str(value) if rng.random() < spec.arabic_ratio else to_chinese_numeral(value)
+    clause = rng.choice(FILLER_CLAUSES)[form]
+    statement = f"{region}{topic}{rng.choice(VERBS)}{numeral}{unit}"
+    return f"{era}{rng.choice(ERA_SUFFIXES)}，{statement}，{clause}。"
+
+
+def generate_paragraphs(spec: CorpusSpec) -> list[str]:
+    """Return the corpus as paragraphs of ``sentences_per_paragraph`` sentences."""
+    rng = random.Random(spec.seed)
+    sentences = [_sentence(rng, spec) for _ in range(spec.sentences)]
+    step = max(spec.sentences_per_paragraph, 1)
+    return ["".join(sentences[start : start + step]) for start in range(0, len(sentences), step)]
+
+
+def render_text(paragraphs: list[str], title: str = "宋史卷一百八十六") -> str:
+    """Render paragraphs as the plain text ``fetch_wikisource_page`` would save."""
+    return "\n".join([title, *paragraphs]) + "\n"
+
+
+def render_html(paragraphs: list[str], title: str = "宋史/卷186") -> str:
+    """Render paragraphs as a Wikisource-like page including chrome the parser must drop."""
+    body = "\n".join(f"      <p>{html.escape(paragraph)}</p>" for paragraph in paragraphs)
+    return (
+        "<html>\n  <head><script>var wgPageName = 'synthetic';</script></head>\n  <body>\n"
+        "    <header>header item</header>\n"
+        f'    <div class="mw-parser-output">\n      <h1>{html.escape(title)}</h1>\n{body}\n'
+        '      <span class="mw-editsection">edit</span>\n    </div>\n'
+        "    <nav>navigation item</nav>\n  </body>\n</html>\n"
+    )
+
+
+def write_corpus(
+    spec: CorpusSpec, out_dir: Path, name: str = "synthetic_juan"
+) -> tuple[Path, Path]:
+    """Write matching ``<name>.txt`` and ``<name>.html`` files and return their paths."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paragraphs = generate_paragraphs(spec)
+    txt_path = out_dir / f"{name}.txt"
+    html_path = out_dir / f"{name}.html"
+    write_text(txt_path, render_text(paragraphs))
+    write_text(html_path, render_html(paragraphs))
+    return txt_path, html_path
+
+
+def main(argv: list[str] | None = None) -> None:
+    """CLI wrapper for synthetic corpus generation."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("out_dir", type=Path)
+    parser.add_argument("--sentences", type=int, default=CorpusSpec.sentences)
+    parser.add_argument("--numeral-density", type=float, default=CorpusSpec.numeral_density)
+    parser.add_argument("--traditional-ratio", type=float, default=CorpusSpec.traditional_ratio)
+    parser.add_argument("--seed", type=int, default=CorpusSpec.seed)
+    args = parser.parse_args(argv)
+
+    spec = CorpusSpec(
+        sentences=args.sentences,
+        numeral_density=args.numeral_density,
+        traditional_ratio=args.traditional_ratio,
+        seed=args.seed,
+    )
+    txt_path, html_path = write_corpus(spec, args.out_dir)
+    print(f"synthetic_txt: {txt_path}")
+    print(f"synthetic_html: {html_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+"""Shared fixtures: keep panel side outputs of tests out of the repository's data tree."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def isolated_provenance_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Write provenance indexes under the test's tmp_path instead of data/02_intermediate."""
+    provenance_dir = tmp_path / "provenance"
+    monkeypatch.setattr("panel.provenance.PROVENANCE_DIR", provenance_dir)
+    return provenance_dir
+
+
+@pytest.fixture(autouse=True)
+def isolated_intermediate_facts(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Write the verified-panel Parquet copy of facts under the test's tmp_path."""
+    intermediate_path = tmp_path / "fact_numeric_extracts.parquet"
+    monkeypatch.setattr("pipeline_end_to_end.INTERMEDIATE_PATH", intermediate_path)
+    return intermediate_path
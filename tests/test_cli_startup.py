@@ -0,0 +1,65 @@
+"""Startup-cost regression tests for the ``song-panel`` dispatcher."""
+
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from song_panel_cli import SUBCOMMANDS, main
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+HEAVY_MODULES = {"pandas", "numpy", "pyarrow", "pydantic", "requests", "bs4", "yaml"}
+# Generous bound for imports triggered by the dispatcher itself; pandas alone exceeds it.
+STARTUP_BUDGET_US = 200_000
+
+
+def _importtime(*args: str, runs_dir: Path) -> dict[str, int]:
+    """Run ``song-panel`` under ``-X importtime``; return top-level module -> cumulative us."""
+    env = {**os.environ, "PYTHONPATH": str(SRC_DIR)}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "song_panel_cli", *args],
+        capture_output=True,
+        text=True,
+        env=env,
+        cwd=runs_dir,
+        check=True,
+    )
+    imported: dict[str, int] = {}
+    after_runpy = False
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        imported[name.strip()] = int(cumulative)
+        after_runpy = after_runpy or name.strip() == "runpy"
+        if after_runpy and not name.startswith("  "):
+            imported.setdefault("<dispatcher>", 0)
+            imported["<dispatcher>"] += int(cumulative)
+    return imported
+
+
+@pytest.mark.parametrize("args", [("--help",), ("runs", "--limit", "1")])
+def test_light_commands_skip_heavy_imports(args: tuple[str, ...], tmp_path: Path) -> None:
+    """--help and light subcommands should not import pandas/requests/bs4/yaml."""
+    imported = _importtime(*args, runs_dir=tmp_path)
+
+    assert not {name.split(".")[0] for name in imported} & HEAVY_MODULES
+    assert imported["<dispatcher>"] < STARTUP_BUDGET_US
+
+
+@pytest.mark.parametrize("subcommand", [*SUBCOMMANDS, "runs"])
+def test_every_subcommand_prints_help(
+    subcommand: str, capsys: pytest.CaptureFixture[str], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """``song-panel <subcommand> --help`` should print usage and exit cleanly without running."""
+    monkeypatch.setattr("instrumentation.run_manifest.RUNS_DIR", Path("/nonexistent/runs"))
+
+    with pytest.raises(SystemExit) as exit_info:
+        main([subcommand, "--help"])
+
+    assert exit_info.value.code == 0
+    assert capsys.readouterr().out.startswith("usage:")
@@ -0,0 +1,216 @@
+"""Tests for retrying downloads and the resumable crawl journal against a local server."""
+
+from __future__ import annotations
+
+import json
+import random
+import re
+import threading
+from collections import Counter
+from collections.abc import Iterator
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+from ingest.crawl import CrawlJournal, CrawlTarget, UrlState, crawl, read_targets, target_for
+from ingest.wikisource_fetch import RetryPolicy, TransientFetchError, parse_retry_after
+
+PAGE_HTML = Path("tests/fixtures/juan186_sample.html").read_text(encoding="utf-8")
+FAST = RetryPolicy(max_attempts=3, base_delay=0.001, max_delay=0.01)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Serve scripted faults per path, then the sample page."""
+
+    faults: dict[str, list[tuple[int, dict[str, str]]]] = {}
+    hits: Counter = Counter()
+
+    def do_GET(self) -> None:  # noqa: N802 - http.server API
+        type(self).hits[self.path] += 1
+        script = type(self).faults.get(self.path)
+        status, headers = script.pop(0) if script else (200, {})
+        body = (PAGE_HTML if status == 200 else "error").encode("utf-8")
+        self.send_response(status)
+        for name, value in {"Content-Type": "text/html; charset=utf-8", **headers}.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: object) -> None:
+        return None
+
+
+@pytest.fixture(params=["requests", "urllib"])
+def server(request: pytest.FixtureRequest, monkeypatch: pytest.MonkeyPatch) -> Iterator[str]:
+    """Run the stand-in server; also exercise the urllib fallback client."""
+    if request.param == "urllib":
+        monkeypatch.setattr("ingest.wikisource_fetch.requests", None)
+    _Handler.faults = {}
+    _Handler.hits = Counter()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def _targets(base: str, out_dir: Path, names: list[str]) -> list[CrawlTarget]:
+    return [target_for(f"{base}/wiki/{name}", out_dir) for name in names]
+
+
+def test_transient_errors_back_off_and_honour_retry_after(server: str, tmp_path: Path) -> None:
+    """503 and 429 responses should be retried, waiting Retry-After seconds when given."""
+    _Handler.faults["/wiki/p1"] = [(503, {}), (429, {"Retry-After": "7"})]
+    sleeps: list[float] = []
+    journal = tmp_path / "journal.jsonl"
+
+    [target] = _targets(server, tmp_path, ["p1"])
+    counts = crawl([target], journal, FAST, sleep_seconds=0, sleep=sleeps.append)
+
+    assert counts["parsed"] == 1
+    assert _Handler.hits["/wiki/p1"] == 3
+    assert 0 <= sleeps[0] <= FAST.base_delay and sleeps[1] == 7.0
+    [state] = CrawlJournal(journal).states().values()
+    assert (state.state, state.attempts, state.error) == ("parsed", 3, None)
+    assert target.out_txt.read_text(encoding="utf-8").strip()
+    lines = journal.read_text(encoding="utf-8").splitlines()
+    events = [json.loads(line)["state"] for line in lines]
+    assert events == ["pending", "pending", "pending", "fetched", "parsed"]
+
+
+def test_permanent_and_exhausted_failures_do_not_stop_the_crawl(
+    server: str, tmp_path: Path
+) -> None:
+    """A 404 fails at once, persistent 503s fail after max_attempts, other pages still finish."""
+    _Handler.faults["/wiki/gone"] = [(404, {})] * 2
+    _Handler.faults["/wiki/busy"] = [(503, {})] * 5
+    journal = tmp_path / "journal.jsonl"
+
+    targets = _targets(server, tmp_path, ["gone", "busy", "ok"])
+    counts = crawl(targets, journal, FAST, sleep=lambda _: None)
+
+    assert counts == {"pending": 0, "fetched": 0, "parsed": 1, "failed": 2}
+    states = CrawlJournal(journal).states()
+    assert states[f"{server}/wiki/gone"].attempts == 1
+    assert states[f"{server}/wiki/busy"].attempts == FAST.max_attempts
+    assert "503" in states[f"{server}/wiki/busy"].error
+    assert _Handler.hits["/wiki/gone"] == 1
+
+    # Resume retries only the failed URLs and leaves the finished page alone; the 404 persists.
+    counts = crawl(None, journal, FAST, sleep=lambda _: None)
+    assert counts["parsed"] == 1 and counts["failed"] == 1
+    assert _Handler.hits["/wiki/ok"] == 1
+    assert CrawlJournal(journal).states()[f"{server}/wiki/busy"].state == "parsed"
+
+
+def test_unparseable_page_is_journaled_as_failed(
+    server: str, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """A page whose HTML cannot be parsed should fail alone, not end the crawl."""
+    from ingest import crawl as crawl_module
+
+    parse = crawl_module.save_readable_text
+
+    def fail_on_bad(html: str, out_txt: Path) -> str:
+        if out_txt.stem.startswith("bad-"):
+            raise ValueError("no readable text")
+        return parse(html, out_txt)
+
+    monkeypatch.setattr(crawl_module, "save_readable_text", fail_on_bad)
+    journal = tmp_path / "journal.jsonl"
+
+    counts = crawl(_targets(server, tmp_path, ["bad", "ok"]), journal, FAST, sleep=lambda _: None)
+
+    assert counts == {"pending": 0, "fetched": 0, "parsed": 1, "failed": 1}
+    state = CrawlJournal(journal).states()[f"{server}/wiki/bad"]
+    assert (state.state, state.attempts, state.error) == ("failed", 1, "no readable text")
+
+
+def test_resume_after_interruption_redoes_no_finished_work(server: str, tmp_path: Path) -> None:
+    """An interrupted crawl should resume with exactly the pages it had not finished."""
+    journal = tmp_path / "journal.jsonl"
+    targets = _targets(server, tmp_path, ["a", "b", "c"])
+
+    def interrupt(seconds: float) -> None:
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        crawl(targets, journal, FAST, sleep_seconds=1.0, sleep=interrupt)
+    states = CrawlJournal(journal).states().values()
+    assert [state.state for state in states] == ["parsed", "pending", "pending"]
+
+    # Re-listing the same targets must not re-queue the finished page.
+    counts = crawl(targets, journal, FAST, sleep_seconds=0, sleep=lambda _: None)
+    assert counts["parsed"] == 2
+    assert dict(_Handler.hits) == {"/wiki/a": 1, "/wiki/b": 1, "/wiki/c": 1}
+    assert CrawlJournal(journal).unfinished() == []
+
+
+def test_fetched_pages_are_reparsed_without_downloading(server: str, tmp_path: Path) -> None:
+    """A page whose HTML was saved before the crash is parsed from disk on resume."""
+    journal = CrawlJournal(tmp_path / "journal.jsonl")
+    [target] = _targets(server, tmp_path, ["saved"])
+    target.out_html.write_text(PAGE_HTML, encoding="utf-8")
+    journal.append(UrlState(target, state="fetched", attempts=1))
+    with journal.path.open("a", encoding="utf-8") as handle:
+        handle.write('{"url": "torn')
+
+    counts = crawl(None, journal.path, FAST, sleep=lambda _: None)
+
+    assert counts["parsed"] == 1
+    assert _Handler.hits["/wiki/saved"] == 0
+    assert target.out_txt.read_text(encoding="utf-8").strip()
+
+
+def test_retry_policy_and_retry_after_parsing() -> None:
+    """Backoff should stay under its exponential ceiling; Retry-After dates become seconds."""
+    policy = RetryPolicy(base_delay=1.0, max_delay=5.0, max_retry_after=30.0)
+    rng = random.Random(0)
+    error = TransientFetchError("HTTP 503")
+    for attempt, ceiling in [(1, 1.0), (2, 2.0), (3, 4.0), (6, 5.0)]:
+        assert all(0 <= policy.delay(attempt, error, rng) <= ceiling for _ in range(50))
+    assert policy.delay(1, TransientFetchError("HTTP 429", retry_after=3600)) == 30.0
+
+    now = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    retry_at = format_datetime(now + timedelta(seconds=90), usegmt=True)
+    assert parse_retry_after(retry_at, now=now) == 90.0
+    assert parse_retry_after("12") == 12.0
+    assert parse_retry_after("soon") is None
+
+
+def test_read_targets_names_files_from_urls(tmp_path: Path) -> None:
+    """URL lists accept an optional name and default to the last path segment plus a URL hash."""
+    url_list = tmp_path / "urls.txt"
+    url_list.write_text(
+        "# Songshi\n"
+        "https://zh.wikisource.org/zh-hans/宋史/卷186 juan186\n"
+        "https://example.org/wiki/%E5%8D%B7187\n\n",
+        encoding="utf-8",
+    )
+    first, second = read_targets(url_list, tmp_path)
+    assert first.out_txt == tmp_path / "juan186.txt"
+    assert second.out_html.parent == tmp_path
+    assert re.fullmatch(r"卷187-[0-9a-f]{8}\.html", second.out_html.name)
+
+
+def test_urls_sharing_a_last_segment_get_distinct_files(tmp_path: Path) -> None:
+    """Derived names must not collide; explicit names that collide are refused up front."""
+    first = target_for("https://example.org/juan1/index", tmp_path)
+    second = target_for("https://example.org/juan2/index", tmp_path)
+    assert first.out_txt != second.out_txt and first.out_html != second.out_html
+
+    journal = tmp_path / "journal.jsonl"
+    clash = [
+        target_for("https://example.org/wiki/a", tmp_path, "page"),
+        target_for("https://example.org/wiki/b", tmp_path, "page"),
+    ]
+    with pytest.raises(ValueError, match="would both write"):
+        crawl(clash, journal, FAST, sleep=lambda _: None)
+    assert not journal.exists()
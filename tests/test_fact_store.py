@@ -0,0 +1,160 @@
+"""Tests for the SQLite fact store and its SQL panel aggregation."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from pipeline_end_to_end import _panel_facts, compute_panel
+from review.promote_reviewed_to_facts import promote_reviewed_to_facts
+from storage.fact_store import FactStore, main
+
+
+def _facts(n_rows: int, seed: int = 7) -> pd.DataFrame:
+    """Random facts mixing convertible, foreign-dimension, unknown and off-panel rows."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "extract_id": [f"e-{i}" for i in range(n_rows)],
+            "period": rng.choice(["XINNING", "YUANFENG", "HUIZONG", "TANG"], n_rows),
+            "region": rng.choice(["NATIONAL", "NORTH", "SOUTH"], n_rows),
+            "topic": rng.choice(["revenue_total", "liangshui", "shangshui", "salt"], n_rows),
+            "value": rng.integers(1, 10_000, n_rows).astype(float),
+            "unit": rng.choice(["guan", "wen", "shi", "mystery"], n_rows, p=[0.6, 0.3, 0.05, 0.05]),
+            "confidence": "C",
+            "source_ref": [f"https://example.org/juan{i % 3}#cid={i}" for i in range(n_rows)],
+        }
+    )
+
+
+def _assert_panels_match(actual: pd.DataFrame, expected: pd.DataFrame) -> None:
+    assert actual[["period", "region"]].equals(expected[["period", "region"]])
+    for column in ["revenue_total", "liangshui", "shangshui", "share_liangshui_in_total"]:
+        assert np.allclose(actual[column], expected[column], equal_nan=True)
+    assert [sorted(ids) for ids in actual["supporting_extract_ids"]] == [
+        sorted(ids) for ids in expected["supporting_extract_ids"]
+    ]
+
+
+def test_sql_panel_matches_file_build(tmp_path: Path) -> None:
+    """The pushed-down aggregation equals compute_panel over normalized facts in both modes."""
+    facts = _facts(2_000)
+    # NULL units and source refs still reach the panel or the unconverted table, as in a file build.
+    facts.loc[:5, "source_ref"] = None
+    facts.loc[3:8, "unit"] = None
+    with FactStore(tmp_path / "facts.sqlite") as store:
+        store.replace("auto_facts", facts)
+        store.replace("verified_facts", facts)
+        for mode in ("auto", "verified"):
+            panel, unconverted = store.build_panel(mode)
+            converted, expected_unconverted = _panel_facts(facts, mode=mode)
+
+            _assert_panels_match(panel, compute_panel(converted))
+            assert sorted(unconverted["extract_id"]) == sorted(expected_unconverted["extract_id"])
+            assert set(unconverted["reason"]) == set(expected_unconverted["reason"])
+        assert set(store.build_panel("auto")[0]["region"]) == {"NATIONAL"}
+
+
+def test_indexed_queries_and_upserts(tmp_path: Path) -> None:
+    """Queries filter by list or scalar; upserts replace by key and deletes share a transaction."""
+    facts = _facts(50)
+    with FactStore(tmp_path / "facts.sqlite") as store:
+        store.replace("auto_facts", facts)
+        rows = store.query("auto_facts", period=["XINNING", "YUANFENG"], region="NORTH")
+        selected = facts["period"].isin(["XINNING", "YUANFENG"]) & (facts["region"] == "NORTH")
+        expected = facts[selected]
+        assert sorted(rows["extract_id"]) == sorted(expected["extract_id"])
+        juan1 = store.query("auto_facts", source="https://example.org/juan1")
+        assert len(juan1) == len(range(1, 50, 3))
+
+        edited = facts.iloc[[0]].assign(value=1.5)
+        store.apply("auto_facts", edited, deletes=["e-1", "e-2"])
+        assert store.count("auto_facts") == len(facts) - 2
+        assert store.query("auto_facts", extract_id="e-0")["value"].tolist() == [1.5]
+        plan = store.connection.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM auto_facts "
+            "WHERE period = ? AND region = ? AND topic = ?",
+            ("XINNING", "NORTH", "liangshui"),
+        ).fetchall()
+        assert "auto_facts_cell" in str(plan)
+
+
+def _review_row(candidate_id: str, approve: object, value: str = "100") -> dict[str, object]:
+    return {
+        "candidate_id": candidate_id,
+        "source_ref": f"https://zh.wikisource.org/zh-hans/宋史/卷186#cid={candidate_id}",
+        "approve": approve,
+        "final_period": "XINNING",
+        "final_topic": "shangshui",
+        "final_region": "NATIONAL",
+        "final_value_std": value,
+        "final_unit_std": "guan",
+        "confidence_override": "",
+    }
+
+
+def test_promotion_mirrors_facts_and_decisions(tmp_path: Path) -> None:
+    """Full and incremental promotions keep the store equal to the facts CSV."""
+    review_path, facts_path = tmp_path / "review.csv", tmp_path / "facts.csv"
+    state_path, store_path = tmp_path / "state.csv", tmp_path / "facts.sqlite"
+    rows = [_review_row("c-1", 1), _review_row("c-2", 0), _review_row("c-3", 1, value="三百")]
+    pd.DataFrame(rows).to_csv(review_path, index=False)
+    promote_reviewed_to_facts(review_path, facts_path, state_csv=state_path, store=store_path)
+
+    rows[1]["approve"] = 1
+    rows[0]["approve"] = 0
+    pd.DataFrame(rows).to_csv(review_path, index=False)
+    promote_reviewed_to_facts(
+        review_path, facts_path, state_csv=state_path, incremental=True, store=store_path
+    )
+
+    with FactStore(store_path) as store:
+        stored = store.query("verified_facts")
+        decisions = store.query("review_decisions").set_index("candidate_id")
+    assert sorted(stored["extract_id"]) == sorted(pd.read_csv(facts_path)["extract_id"])
+    assert stored["extract_id"].tolist() == ["songshi-juan186-c-2"]
+    assert decisions["status"].to_dict() == {
+        "c-1": "unapproved",
+        "c-2": "promoted",
+        "c-3": "rejected",
+    }
+    assert decisions.loc["c-3", "reason"] == "invalid_final_value_std"
+
+
+def test_promotion_without_store_skips_review_decisions(tmp_path: Path, monkeypatch) -> None:
+    """Per-row decisions are only built for a store, so chunked promotions stay bounded."""
+    review_path, facts_path = tmp_path / "review.csv", tmp_path / "facts.csv"
+    rows = [_review_row("c-1", 1), _review_row("c-2", 0), _review_row("c-3", 1)]
+    pd.DataFrame(rows).to_csv(review_path, index=False)
+
+    def fail(*args: object) -> pd.DataFrame:
+        raise AssertionError("review decisions built without a fact store")
+
+    monkeypatch.setattr("review.promote_reviewed_to_facts._decisions", fail)
+    facts = promote_reviewed_to_facts(review_path, facts_path, chunksize=1)
+
+    assert len(facts) == 2
+
+
+def test_cli_query_prints_csv(tmp_path: Path, capsys, monkeypatch) -> None:
+    """``query`` prints matching rows as CSV and maps period/topic onto candidate columns."""
+    monkeypatch.setattr("instrumentation.run_manifest.RUNS_DIR", tmp_path / "runs")
+    store_path = tmp_path / "facts.sqlite"
+    candidates = pd.DataFrame(
+        {
+            "candidate_id": ["c-1", "c-2"],
+            "candidate_period": ["XINNING", "YUANFENG"],
+            "candidate_topic": ["liangshui", "liangshui"],
+            "snippet_hash": ["h1", "h2"],
+            "source_ref": ["u#1", "u#2"],
+        }
+    )
+    with FactStore(store_path) as store:
+        store.replace("candidates", candidates)
+
+    main(["--store", str(store_path), "query", "candidates", "--period", "YUANFENG"])
+
+    printed = capsys.readouterr().out
+    assert "c-2" in printed and "c-1" not in printed
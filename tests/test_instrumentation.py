@@ -0,0 +1,100 @@
+"""Tests for per-stage instrumentation and run manifests."""
+
+from __future__ import annotations
+
+import json
+import pstats
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from instrumentation.run_manifest import current_stage, instrumented_command, stage, timed_stage
+
+
+@timed_stage("demo.build")
+def _build(rows: int) -> pd.DataFrame:
+    current_stage().rows_in = rows
+    return pd.DataFrame({"value": range(rows)})
+
+
+@instrumented_command("demo-command")
+def _demo(argv: list[str] | None = None) -> int:
+    with stage("demo.outer"):
+        frame = _build(int(argv[0]) if argv else 3)
+    return len(frame)
+
+
+def _manifests(runs_dir: Path) -> list[dict]:
+    paths = sorted((runs_dir / "manifests").glob("*.json"))
+    return [json.loads(path.read_text()) for path in paths]
+
+
+def test_command_writes_manifest_with_nested_stages(tmp_path: Path, monkeypatch) -> None:
+    """A command run should record every stage with parent, rows and resource figures."""
+    monkeypatch.setattr("instrumentation.run_manifest.RUNS_DIR", tmp_path)
+
+    assert _demo(["5"]) == 5
+
+    [manifest] = _manifests(tmp_path)
+    assert manifest["command"] == "demo-command"
+    assert manifest["argv"] == ["5"]
+    assert manifest["status"] == "ok"
+    stages = {record["name"]: record for record in manifest["stages"]}
+    assert list(stages) == ["demo-command", "demo.outer", "demo.build"]
+    assert stages["demo.outer"]["parent"] == "demo-command"
+    assert stages["demo.build"]["parent"] == "demo.outer"
+    assert (stages["demo.build"]["rows_in"], stages["demo.build"]["rows_out"]) == (5, 5)
+    assert manifest["trace_memory"] is False
+    for record in manifest["stages"]:
+        assert record["wall_seconds"] >= 0 and record["cpu_seconds"] >= 0
+        assert record["tracemalloc_peak_bytes"] is None
+        assert record["profile_path"] is None
+
+
+def test_trace_memory_flag_records_stage_peaks(tmp_path: Path, monkeypatch) -> None:
+    """--trace-memory should trace only that run and nest stage peaks inside their parents."""
+    monkeypatch.setattr("instrumentation.run_manifest.RUNS_DIR", tmp_path)
+
+    assert _demo(["--trace-memory", "5"]) == 5
+
+    assert not tracemalloc.is_tracing()
+    [manifest] = _manifests(tmp_path)
+    assert manifest["trace_memory"] is True
+    assert manifest["argv"] == ["--trace-memory", "5"]
+    stages = {record["name"]: record for record in manifest["stages"]}
+    assert all(record["tracemalloc_peak_bytes"] >= 0 for record in stages.values())
+    build_peak = stages["demo.build"]["tracemalloc_peak_bytes"]
+    assert stages["demo-command"]["tracemalloc_peak_bytes"] >= build_peak
+
+
+def test_profile_flag_dumps_stats_per_stage(tmp_path: Path, monkeypatch) -> None:
+    """--profile should be consumed by the wrapper and leave one cProfile dump per stage."""
+    monkeypatch.setattr("instrumentation.run_manifest.RUNS_DIR", tmp_path)
+
+    assert _demo(["--profile", "2"]) == 2
+
+    [manifest] = _manifests(tmp_path)
+    assert manifest["profile"] is True
+    for record in manifest["stages"]:
+        stats = pstats.Stats(record["profile_path"])
+        assert stats.total_calls >= 0
+
+
+def test_failed_command_still_writes_error_manifest(tmp_path: Path, monkeypatch) -> None:
+    """Failures should be recorded in the manifest and re-raised."""
+    monkeypatch.setattr("instrumentation.run_manifest.RUNS_DIR", tmp_path)
+
+    with pytest.raises(ValueError):
+        _demo(["not-a-number"])
+
+    [manifest] = _manifests(tmp_path)
+    assert manifest["status"] == "error"
+    assert manifest["error"].startswith("ValueError")
+    assert {record["status"] for record in manifest["stages"]} == {"error"}
+
+
+def test_stages_are_no_ops_outside_a_command() -> None:
+    """Library calls without an active command run should not need a recorder."""
+    assert len(_build(4)) == 4
@@ -0,0 +1,116 @@
+"""Tests for the inverted keyword index and incremental re-organization after rule edits."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pandas as pd
+import yaml
+
+from organize.auto_facts_songshi_juan186 import (
+    RULES_PATH,
+    auto_organize_facts,
+    reorganize_auto_facts,
+)
+from organize.keyword_index import KeywordIndex, affected_keywords, write_keyword_index
+
+SNIPPETS = [
+    ("熙宁 商税 天下", 1.0),
+    ("熙宁 市舶 舶", 2.0),
+    ("元丰 两税 京師 陕西", 3.0),
+    ("商税 天下", 4.0),
+    ("元丰 漕", 5.0),
+    ("元丰 两税", None),
+    ("熙宁 两税 天下", 6.0),
+    ("绍圣 课入 诸路", 7.0),
+]
+
+
+def _candidates(path: Path, snippets: list[tuple[str, float | None]] = SNIPPETS) -> Path:
+    pd.DataFrame(
+        [
+            {
+                "candidate_id": f"c{index}",
+                "source_ref": f"u#cid=c{index}",
+                "snippet": snippet,
+                "value_num": value,
+                "unit_std": "guan",
+            }
+            for index, (snippet, value) in enumerate(snippets)
+        ]
+    ).to_csv(path, index=False)
+    return path
+
+
+def _edited_rules(path: Path) -> Path:
+    """Add 漕 to liangshui (ahead of grain) and drop the 熙宁 era keyword."""
+    rules = yaml.safe_load(RULES_PATH.read_text(encoding="utf-8"))
+    rules["topic_keywords"]["liangshui"].append("漕")
+    rules["era_keywords"]["XINNING"].remove("熙宁")
+    path.write_text(yaml.safe_dump(rules, allow_unicode=True, sort_keys=False), encoding="utf-8")
+    return path
+
+
+def test_index_lookup_finds_every_snippet_containing_a_keyword(tmp_path: Path) -> None:
+    """Index lookups should cover exact substring matches and nothing absent from the corpus."""
+    candidates_csv = _candidates(tmp_path / "candidates.csv")
+    index = KeywordIndex.load(write_keyword_index(candidates_csv, tmp_path / "index.parquet"))
+
+    snippets = [snippet for snippet, _ in SNIPPETS]
+    for keyword in ("熙宁", "两税", "天下", "舶", "漕"):
+        expected = {position for position, snippet in enumerate(snippets) if keyword in snippet}
+        assert expected <= set(index.candidates_with(keyword).tolist())
+    assert index.candidates_with("熙宁").tolist() == [0, 1, 6]
+    assert index.candidates_with("政和").size == 0
+    assert index.size == len(SNIPPETS)
+
+
+def test_affected_keywords_cover_additions_label_changes_and_moves() -> None:
+    """Unchanged keywords keep their first match; edited or reordered ones are affected."""
+    old = {"topic_keywords": {"a": ["x", "y"], "b": ["z", "w"]}}
+    assert affected_keywords(old, old) == set()
+    added = {"topic_keywords": {"a": ["x", "y", "v"], "b": ["z", "w"]}}
+    assert affected_keywords(old, added) == {"v"}
+    assert affected_keywords(old, {"topic_keywords": {"a": ["x"], "b": ["y", "z", "w"]}}) == {"y"}
+    # Moving label b ahead of a flips x/y against z/w; marking z and w covers every flipped pair.
+    reordered = {"topic_keywords": {"b": ["z", "w"], "a": ["x", "y"]}}
+    assert affected_keywords(old, reordered) == {"z", "w"}
+
+
+def test_incremental_reorganization_matches_a_full_rebuild(tmp_path: Path) -> None:
+    """Patching after a rules edit should equal organizing everything with the new rules."""
+    candidates_csv = _candidates(tmp_path / "candidates.csv")
+    index_path = tmp_path / "index.parquet"
+    write_keyword_index(candidates_csv, index_path)
+    auto_csv = tmp_path / "auto_facts.csv"
+    auto_organize_facts(candidates_csv, auto_csv, RULES_PATH)
+    edited = _edited_rules(tmp_path / "rules.yml")
+
+    patched, reevaluated = reorganize_auto_facts(candidates_csv, auto_csv, edited, index_path)
+    expected = auto_organize_facts(candidates_csv, tmp_path / "full.csv", edited)
+
+    pd.testing.assert_frame_equal(pd.read_csv(auto_csv), pd.read_csv(tmp_path / "full.csv"))
+    pd.testing.assert_frame_equal(patched, expected, check_dtype=False)
+    # 熙宁 rows 0, 1, 6 and the 漕 row 4.
+    assert reevaluated == 4
+    _, again = reorganize_auto_facts(candidates_csv, auto_csv, edited, index_path)
+    assert again == 0
+
+
+def test_changed_candidates_fall_back_to_a_full_run(tmp_path: Path) -> None:
+    """New candidates invalidate the rules snapshot and the index."""
+    candidates_csv = _candidates(tmp_path / "candidates.csv")
+    index_path = tmp_path / "index.parquet"
+    write_keyword_index(candidates_csv, index_path)
+    auto_csv = tmp_path / "auto_facts.csv"
+    auto_organize_facts(candidates_csv, auto_csv, RULES_PATH)
+
+    _candidates(candidates_csv, [*SNIPPETS, ("政和 商税 天下", 9.0)])
+    patched, reevaluated = reorganize_auto_facts(candidates_csv, auto_csv, RULES_PATH, index_path)
+
+    assert reevaluated == len(SNIPPETS) + 1
+    assert "auto-songshi-juan186-c8" in set(patched["extract_id"])
+    edited = _edited_rules(tmp_path / "rules.yml")
+    _, reevaluated = reorganize_auto_facts(candidates_csv, auto_csv, edited, index_path)
+    assert KeywordIndex.load(index_path).size == len(SNIPPETS) + 1
+    assert reevaluated == 4
@@ -0,0 +1,90 @@
+"""Tests for MinHash/LSH near-duplicate clustering of candidates."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pandas as pd
+
+from extract.near_duplicates import add_candidate_clusters, cluster_near_duplicates
+from review.make_review_sheet import make_review_sheet, stream_review_sheet
+from review.promote_reviewed_to_facts import promote_reviewed_to_facts
+
+PASSAGE = "熙宁十年，天下商税岁入八百万貫，诏有司议其事，民以为便，自是岁以为常"
+
+
+def _candidate(
+    candidate_id: str, snippet: str, value_num: float = 8_000_000.0
+) -> dict[str, object]:
+    return {
+        "candidate_id": candidate_id,
+        "source_ref": f"https://zh.wikisource.org/zh-hans/宋史/卷186#cid={candidate_id}",
+        "snippet": snippet,
+        "value_num": value_num,
+        "unit_std": "guan",
+    }
+
+
+def test_lsh_clusters_near_duplicates_only() -> None:
+    """Near-identical snippets should share a cluster; unrelated or empty ones should not."""
+    snippets = pd.Series(
+        [PASSAGE, PASSAGE + "也", "元丰中两浙盐利增至若干緡而罢之", "", PASSAGE[:-2]]
+    )
+    assert cluster_near_duplicates(snippets).tolist() == [0, 0, 2, 3, 0]
+
+    blocking = pd.Series(["a", "b", "a", "a", "a"])
+    assert cluster_near_duplicates(snippets, blocking).tolist() == [0, 1, 2, 3, 0]
+
+
+def test_add_candidate_clusters_blocks_on_value_and_marks_representatives() -> None:
+    """Different figures in the same passage must never be clustered together."""
+    clustered = add_candidate_clusters(
+        pd.DataFrame(
+            [
+                _candidate("c-1", PASSAGE),
+                _candidate("c-2", "其后" + PASSAGE),
+                _candidate("c-3", PASSAGE, value_num=10.0),
+            ]
+        )
+    )
+
+    assert clustered["cluster_id"].tolist() == ["c-1", "c-1", "c-3"]
+    assert clustered["cluster_size"].tolist() == [2, 2, 1]
+    assert clustered["is_cluster_representative"].tolist() == [True, False, True]
+
+
+def test_review_sheet_collapses_clusters_and_promotion_fans_out(tmp_path: Path) -> None:
+    """One reviewed row per cluster should promote a fact per member with its own source_ref."""
+    candidates_csv = tmp_path / "candidates.csv"
+    add_candidate_clusters(
+        pd.DataFrame(
+            [
+                _candidate("c-1", PASSAGE),
+                _candidate("c-2", "别有所记", value_num=5.0),
+                _candidate("c-3", PASSAGE + "矣"),
+            ]
+        )
+    ).to_csv(candidates_csv, index=False)
+
+    sheet_csv = tmp_path / "review_sheet.csv"
+    sheet = make_review_sheet(candidates_csv, sheet_csv)
+    assert sheet["candidate_id"].tolist() == ["c-1", "c-2"]
+    assert sheet.iloc[0]["cluster_member_ids"] == "c-1|c-3"
+
+    streamed_csv = tmp_path / "review_streamed.csv"
+    assert stream_review_sheet(candidates_csv, streamed_csv, chunksize=1) == 2
+    assert streamed_csv.read_text(encoding="utf-8") == sheet_csv.read_text(encoding="utf-8")
+
+    sheet.loc[0, ["approve", "final_period", "final_topic", "final_region"]] = [
+        1,
+        "XINNING",
+        "shangshui",
+        "NATIONAL",
+    ]
+    sheet.loc[0, ["final_value_std", "final_unit_std"]] = ["8000000", "guan"]
+    sheet.to_csv(sheet_csv, index=False)
+
+    facts = promote_reviewed_to_facts(sheet_csv, tmp_path / "facts.csv")
+    assert facts["extract_id"].tolist() == ["songshi-juan186-c-1", "songshi-juan186-c-3"]
+    assert facts["source_ref"].str.endswith(("cid=c-1", "cid=c-3")).all()
+    assert facts["source_ref"].nunique() == 2
@@ -0,0 +1,128 @@
+"""Tests for the dense fiscal cube and its hierarchical roll-ups."""
+
+from __future__ import annotations
+
+import math
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from panel.cube import FiscalCube, load_axes
+from pipeline_end_to_end import compute_panel
+
+TAXONOMY_PATH = Path("metadata/taxonomy.yml")
+
+
+def _fact(
+    extract_id: str, period: str, region: str, topic: str, value: float, **extra: str
+) -> dict:
+    return {
+        "extract_id": extract_id,
+        "period": period,
+        "region": region,
+        "topic": topic,
+        "value": value,
+        "unit": extra.get("unit", "guan"),
+        "confidence": extra.get("confidence", "B"),
+        "source_ref": f"verified#{extract_id}",
+    }
+
+
+FACTS = pd.DataFrame(
+    [
+        _fact("v-1", "XINNING", "NATIONAL", "revenue_total", 100.0),
+        _fact("v-2", "XINNING", "NATIONAL", "liangshui", 30.0, confidence="C"),
+        _fact("v-3", "XINNING", "NORTH", "revenue_total", 60.0),
+        _fact("v-4", "YUANFENG", "SOUTH", "revenue_total", 40.0),
+        _fact("v-5", "YUANFENG", "HEBEI_LU", "liangshui", 7.0),
+        _fact("v-6", "SHAOSHENG", "NATIONAL", "shangshui", 5.0, unit="shi"),
+        _fact("v-7", "SHAOSHENG", "NOWHERE", "shangshui", 5.0),
+    ]
+)
+GUAN_ALL = {"unit": "guan", "confidence": "ALL"}
+
+
+def test_cube_slices_and_rollups() -> None:
+    """Leaf cells should hold direct sums; hierarchy nodes should be built from children."""
+    cube = FiscalCube.build(FACTS, load_axes(TAXONOMY_PATH))
+    xinning_total = {"period": "XINNING", "topic": "revenue_total", **GUAN_ALL}
+    c_liangshui = {"topic": "liangshui", "unit": "guan", "confidence": "C"}
+    yuanfeng_north = {"period": "YUANFENG", "region": "NORTH", "topic": "liangshui", **GUAN_ALL}
+    song_shangshui = {"period": "NORTHERN_SONG", "topic": "shangshui", "unit": "shi"}
+
+    # The reported national total stays in the direct view; the roll-up is NORTH + SOUTH.
+    assert cube.select(rollup=False, region="NATIONAL", **xinning_total) == 100.0
+    assert cube.select(region="NATIONAL", **xinning_total) == 60.0
+    # Without reporting regions below it, a node keeps its own reported figure.
+    assert cube.select(period="XINNING", region="NATIONAL", **c_liangshui) == 30.0
+    shenzong_total = {"period": "SHENZONG", "topic": "revenue_total", **GUAN_ALL}
+    assert cube.select(region="NATIONAL", **shenzong_total) == 100.0
+    assert cube.select(**yuanfeng_north) == 7.0
+    assert cube.select(rollup=False, **yuanfeng_north) == 0.0
+    assert cube.select(region="NATIONAL", confidence="ALL", **song_shangshui) == 5.0
+    # v-1 is covered by v-3/v-4 at NATIONAL and v-7 is off the taxonomy.
+    assert cube.count(period="NORTHERN_SONG", region="NATIONAL", confidence="ALL").sum() == 5
+    assert cube.select(period="XINNING", **GUAN_ALL).shape == (len(cube.axes["region"].labels), 3)
+
+
+def test_prefectures_roll_up_through_circuits() -> None:
+    """Gazetteer prefectures should form the lowest region level below their circuit."""
+    facts = pd.DataFrame(
+        [
+            _fact("p-1", "XINNING", "DAMING_FU", "revenue_total", 11.0),
+            _fact("p-2", "XINNING", "HANGZHOU", "revenue_total", 13.0),
+            _fact("p-3", "XINNING", "HEBEI_LU", "revenue_total", 50.0),
+            _fact("p-4", "XINNING", "NATIONAL", "revenue_total", 1000.0),
+        ]
+    )
+    cube = FiscalCube.build(facts, load_axes(TAXONOMY_PATH))
+    total = {"period": "XINNING", "topic": "revenue_total", **GUAN_ALL}
+
+    assert cube.axes["region"].parents["DAMING_FU"] == "HEBEI_LU"
+    assert cube.select(region="HEBEI_LU", **total) == 11.0
+    assert cube.select(rollup=False, region="HEBEI_LU", **total) == 50.0
+    assert cube.select(region="NATIONAL", **total) == 24.0
+    assert cube.select(rollup=False, region="NATIONAL", **total) == 1000.0
+    assert "DAMING_FU" not in load_axes(TAXONOMY_PATH, gazetteer_path=None)["region"].labels
+
+
+def test_cube_shares_match_panel_and_roundtrip(tmp_path: Path) -> None:
+    """Direct-value shares should equal the panel shares; save/load should keep arrays."""
+    facts = FACTS[FACTS["region"].isin({"NATIONAL", "NORTH", "SOUTH"})]
+    cube = FiscalCube.build(facts, load_axes(TAXONOMY_PATH))
+    shares = cube.share("liangshui", rollup=False)
+    unit, confidence = cube.axes["unit"].code("guan"), cube.axes["confidence"].code("ALL")
+
+    for row in compute_panel(facts).itertuples():
+        period, region = cube.axes["period"].code(row.period), cube.axes["region"].code(row.region)
+        cube_share = shares[period, region, unit, confidence]
+        if math.isnan(row.share_liangshui_in_total):
+            assert math.isnan(cube_share)
+        else:
+            assert cube_share == row.share_liangshui_in_total
+
+    cube_path = tmp_path / "cube.npz"
+    cube.save(cube_path)
+    loaded = FiscalCube.load(cube_path)
+    assert loaded.axes["region"].labels == cube.axes["region"].labels
+    assert loaded.axes["period"].parents == cube.axes["period"].parents
+    np.testing.assert_array_equal(loaded.rolled, cube.rolled)
+
+
+def test_run_cube_keeps_facts_outside_panel_filters(tmp_path: Path, monkeypatch) -> None:
+    """run_cube should keep sub-region and non-panel facts for query-time selection."""
+    import pipeline_end_to_end as pipeline
+    from panel import cube as cube_module
+
+    facts_path = tmp_path / "auto_facts.csv"
+    FACTS.to_csv(facts_path, index=False)
+    monkeypatch.setattr(pipeline, "AUTO_FACTS_PATH", facts_path)
+    monkeypatch.setattr(cube_module, "CUBE_DIR", tmp_path)
+
+    cube = cube_module.run_cube("auto", taxonomy_path=TAXONOMY_PATH)
+
+    assert (tmp_path / "fiscal_cube_auto.npz").exists()
+    hebei = {"period": "YUANFENG", "region": "HEBEI_LU", "unit": "guan", "confidence": "ALL"}
+    assert cube.select(rollup=False, topic="liangshui", **hebei) == 7.0
+    assert cube.count(rollup=False, confidence="ALL").sum() == 6
@@ -0,0 +1,165 @@
+"""Tests for incremental panel aggregation from fact deltas."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pandas as pd
+
+import pipeline_end_to_end as pipeline
+from panel.incremental import PanelAggregate, update_panel_mode
+from panel.provenance import ProvenanceIndex
+from pipeline_end_to_end import (
+    compute_panel,
+    load_panel,
+    read_panel_csv,
+    run_panel_mode,
+    unconverted_units_path,
+)
+
+
+def _fact(extract_id: str, period: str, region: str, topic: str, value: float) -> dict[str, object]:
+    return {
+        "extract_id": extract_id,
+        "period": period,
+        "region": region,
+        "topic": topic,
+        "value": value,
+        "unit": "guan",
+        "confidence": "B",
+        "source_ref": f"verified#{extract_id}",
+    }
+
+
+BASE_FACTS = [
+    _fact("v-1", "XINNING", "NATIONAL", "revenue_total", 100.0),
+    _fact("v-2", "XINNING", "NATIONAL", "liangshui", 30.0),
+    _fact("v-3", "XINNING", "NATIONAL", "shangshui", 20.0),
+    _fact("v-4", "XINNING", "NORTH", "revenue_total", 60.0),
+    _fact("v-5", "YUANFENG", "NATIONAL", "revenue_total", 120.0),
+    _fact("v-6", "YUANFENG", "NATIONAL", "liangshui", 50.0),
+]
+
+
+def _assert_same_panel(actual: pd.DataFrame, expected: pd.DataFrame) -> None:
+    pd.testing.assert_frame_equal(
+        actual.reset_index(drop=True),
+        expected.reset_index(drop=True),
+        check_dtype=False,
+    )
+
+
+def test_apply_deltas_matches_full_rebuild() -> None:
+    """Inserts, updates and deletes applied as deltas should equal a full recompute."""
+    aggregate = PanelAggregate.build(pd.DataFrame(BASE_FACTS), mode="verified")
+    _assert_same_panel(aggregate.panel(), compute_panel(pd.DataFrame(BASE_FACTS)))
+
+    upserts = pd.DataFrame(
+        [
+            _fact("v-2", "XINNING", "NATIONAL", "liangshui", 35.0),
+            _fact("v-7", "YUANFENG", "NATIONAL", "shangshui", 10.0),
+            _fact("v-8", "XINNING", "NORTH", "unknown_topic", 5.0),
+        ]
+    )
+    touched = aggregate.apply(upserts, deletes=["v-4"])
+
+    current = pd.DataFrame(
+        [fact for fact in BASE_FACTS if fact["extract_id"] not in {"v-2", "v-4"}]
+        + [upserts.iloc[0].to_dict(), upserts.iloc[1].to_dict()]
+    )
+    assert set(touched) == {("XINNING", "NATIONAL"), ("YUANFENG", "NATIONAL"), ("XINNING", "NORTH")}
+    assert "v-8" in aggregate.facts.index
+    assert not any("v-8" in ids for ids in aggregate.cells["supporting_ids"])
+    _assert_same_panel(aggregate.panel(), compute_panel(current))
+
+
+def test_update_panel_mode_bootstraps_then_patches_touched_rows(
+    tmp_path: Path, monkeypatch
+) -> None:
+    """update_panel_mode should persist state and agree with run_panel_mode after edits."""
+    verified_facts = tmp_path / "extracts_songshi_juan186.csv"
+    verified_panel = tmp_path / "panel_verified.csv"
+    monkeypatch.setattr("pipeline_end_to_end.VERIFIED_FACTS_PATH", verified_facts)
+    monkeypatch.setattr("pipeline_end_to_end.VERIFIED_PANEL_PATH", verified_panel)
+    monkeypatch.setattr("pipeline_end_to_end.LEGACY_PANEL_PATH", tmp_path / "panel_legacy.csv")
+    monkeypatch.setattr("pipeline_end_to_end.INTERMEDIATE_PATH", tmp_path / "facts.parquet")
+
+    pd.DataFrame(BASE_FACTS).to_csv(verified_facts, index=False)
+    state_dir = tmp_path / "panel_state"
+    update_panel_mode("verified", state_dir=state_dir)
+    assert (state_dir / "verified" / "cells.parquet").exists()
+
+    edited = pd.DataFrame(
+        BASE_FACTS[1:]
+        + [
+            _fact("v-9", "YUANFENG", "NATIONAL", "shangshui", 12.0),
+            {**_fact("v-11", "YUANFENG", "NATIONAL", "shangshui", 3.0), "unit": "mystery"},
+        ]
+    )
+    edited.to_csv(verified_facts, index=False)
+    incremental = update_panel_mode("verified", state_dir=state_dir)
+    unconverted = pd.read_csv(unconverted_units_path(verified_panel))
+    assert list(unconverted["extract_id"]) == ["v-11"]
+    arrow_facts = load_panel("verified", kind="facts")
+    assert sorted(arrow_facts["extract_id"]) == sorted(edited["extract_id"])
+    index = ProvenanceIndex.load("verified")
+    assert list(index.facts("YUANFENG", "NATIONAL", "shangshui")["extract_id"]) == ["v-9"]
+    assert index.extract("v-1").empty
+    full = run_panel_mode("verified")
+
+    _assert_same_panel(incremental, full)
+    _assert_same_panel(read_panel_csv(verified_panel), full)
+
+    explicit = update_panel_mode(
+        "verified",
+        upserts=pd.DataFrame([_fact("v-10", "XINNING", "NORTH", "liangshui", 6.0)]),
+        state_dir=state_dir,
+    )
+    north = explicit.set_index(["period", "region"]).loc[("XINNING", "NORTH")]
+    assert north["liangshui"] == 6.0
+    assert list(north["supporting_extract_ids"]) == ["v-10", "v-4"]
+
+
+def test_explicit_deltas_patch_side_outputs_without_reading_all_facts(
+    tmp_path: Path, monkeypatch
+) -> None:
+    """Explicit deltas should normalize only the changed rows and patch every side output."""
+    verified_facts = tmp_path / "extracts_songshi_juan186.csv"
+    verified_panel = tmp_path / "panel_verified.csv"
+    monkeypatch.setattr("pipeline_end_to_end.VERIFIED_FACTS_PATH", verified_facts)
+    monkeypatch.setattr("pipeline_end_to_end.VERIFIED_PANEL_PATH", verified_panel)
+    monkeypatch.setattr("pipeline_end_to_end.LEGACY_PANEL_PATH", tmp_path / "panel_legacy.csv")
+    stale = {**_fact("v-12", "XINNING", "NATIONAL", "shangshui", 1.0), "unit": "mystery"}
+    pd.DataFrame([*BASE_FACTS, stale]).to_csv(verified_facts, index=False)
+    state_dir = tmp_path / "panel_state"
+    update_panel_mode("verified", state_dir=state_dir)
+
+    normalized_rows = []
+    panel_facts = pipeline._panel_facts
+
+    def counting_panel_facts(facts: pd.DataFrame, mode: str):
+        normalized_rows.append(len(facts))
+        return panel_facts(facts, mode=mode)
+
+    def no_facts_read(input_path: Path) -> pd.DataFrame:
+        raise AssertionError("explicit deltas should not read the facts file")
+
+    monkeypatch.setattr("pipeline_end_to_end._panel_facts", counting_panel_facts)
+    monkeypatch.setattr("panel.incremental._read_facts", no_facts_read)
+    upserts = pd.DataFrame(
+        [
+            _fact("v-10", "XINNING", "NORTH", "liangshui", 6.0),
+            {**_fact("v-11", "YUANFENG", "NATIONAL", "shangshui", 3.0), "unit": "mystery"},
+        ]
+    )
+    update_panel_mode("verified", upserts=upserts, deletes=["v-2", "v-12"], state_dir=state_dir)
+
+    assert normalized_rows and max(normalized_rows) <= len(upserts) + 2
+    unconverted = pd.read_csv(unconverted_units_path(verified_panel))
+    assert list(unconverted["extract_id"]) == ["v-11"]
+    index = ProvenanceIndex.load("verified")
+    assert list(index.facts("XINNING", "NORTH", "liangshui")["extract_id"]) == ["v-10"]
+    assert index.extract("v-2").empty
+    assert list(index.extract("v-10")["fact_row"]) == [5]
+    arrow_facts = load_panel("verified", kind="facts")
+    assert list(arrow_facts["extract_id"]) == ["v-1", "v-3", "v-4", "v-5", "v-6", "v-10", "v-11"]
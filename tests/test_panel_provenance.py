@@ -0,0 +1,118 @@
+"""Tests for the panel provenance index and explain lookups."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pandas as pd
+
+from extract.songshi_candidates import SOURCE_URL, extract_candidates
+from panel.provenance import (
+    ProvenanceIndex,
+    build_provenance_index,
+    explain,
+    parse_source_refs,
+    provenance_path,
+)
+from pipeline_end_to_end import run_panel_mode
+
+FIXTURE_TXT = Path("tests/fixtures/juan186_sample.txt")
+
+
+def _facts_from(candidates: pd.DataFrame) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "extract_id": [f"fact-{index}" for index in range(len(candidates))],
+            "period": "XINNING",
+            "region": "NATIONAL",
+            "topic": "shangshui",
+            "value": candidates["value_num"],
+            "unit": "guan",
+            "confidence": "B",
+            "source_ref": candidates["source_ref"],
+        }
+    )
+
+
+def test_explain_reads_candidate_spans_from_raw_text(tmp_path: Path) -> None:
+    """A cell should resolve through facts and candidates to the exact text of each span."""
+    candidates = extract_candidates(FIXTURE_TXT, tmp_path / "candidates.csv", SOURCE_URL)
+    facts = _facts_from(candidates)
+
+    table = build_provenance_index(facts, candidates, {SOURCE_URL: FIXTURE_TXT})
+    index = ProvenanceIndex(table)
+    spans = explain("XINNING", "NATIONAL", "shangshui", context=3, index=index)
+
+    assert list(spans["text"]) == list(candidates["value_raw"].astype(str))
+    assert list(spans["candidate_id"]) == list(candidates["candidate_id"])
+    assert list(spans["candidate_row"]) == list(range(len(candidates)))
+    span = spans.iloc[1]
+    assert (span["context_before"], span["context_after"]) == ("税岁入", "貫，茶")
+    text = FIXTURE_TXT.read_text(encoding="utf-8")
+    assert span["text"] == text[span["char_start"] : span["char_end"]]
+    assert index.facts("XINNING", "NORTH", "shangshui").empty
+    assert list(index.extract("fact-1")["fact_row"]) == [1]
+
+
+def test_index_falls_back_to_source_ref_offsets_and_tolerates_unresolvable_refs(
+    tmp_path: Path,
+) -> None:
+    """Facts without candidates use source_ref offsets; refs without a document stay unread."""
+    facts = pd.DataFrame(
+        {
+            "extract_id": ["direct", "seed"],
+            "period": "XINNING",
+            "region": "NATIONAL",
+            "topic": "shangshui",
+            "value": [12345.0, 10.0],
+            "unit": "guan",
+            "confidence": "B",
+            "source_ref": [f"{SOURCE_URL}#start=17&end=22", "seed#1"],
+        }
+    )
+
+    index = ProvenanceIndex(build_provenance_index(facts, None, {SOURCE_URL: FIXTURE_TXT}))
+    spans = index.spans(index.facts("XINNING", "NATIONAL", "shangshui")).set_index("extract_id")
+
+    assert spans.loc["direct", "text"] == "12345"
+    assert spans.loc["direct", "candidate_row"] == -1
+    assert (spans.loc["seed", "byte_start"], spans.loc["seed", "text"]) == (-1, "")
+    assert parse_source_refs(pd.Series(["seed#1"])).loc[0, "source"] == "seed"
+
+
+def test_panel_run_persists_index_for_explain(tmp_path: Path, monkeypatch) -> None:
+    """A panel run should write the mode's provenance index next to its other outputs."""
+    candidates = extract_candidates(FIXTURE_TXT, tmp_path / "candidates.csv", SOURCE_URL)
+    facts_path = tmp_path / "extracts_songshi_juan186.csv"
+    _facts_from(candidates).iloc[1:2].to_csv(facts_path, index=False)
+
+    monkeypatch.setattr("pipeline_end_to_end.VERIFIED_FACTS_PATH", facts_path)
+    monkeypatch.setattr("pipeline_end_to_end.VERIFIED_PANEL_PATH", tmp_path / "panel.csv")
+    monkeypatch.setattr("pipeline_end_to_end.LEGACY_PANEL_PATH", tmp_path / "legacy.csv")
+    monkeypatch.setattr("pipeline_end_to_end.INTERMEDIATE_PATH", tmp_path / "facts.parquet")
+    monkeypatch.setattr("panel.provenance.PROVENANCE_DIR", tmp_path / "provenance")
+    monkeypatch.setattr("panel.provenance.CANDIDATES_PATH", tmp_path / "candidates.csv")
+    monkeypatch.setattr("panel.provenance.DOCUMENTS", {SOURCE_URL: FIXTURE_TXT})
+
+    run_panel_mode("verified")
+
+    assert provenance_path("verified").exists()
+    spans = explain("XINNING", "NATIONAL", "shangshui", mode="verified")
+    assert list(spans["text"]) == ["12345"]
+
+
+def test_explain_on_an_empty_panel_finds_no_facts(tmp_path: Path, monkeypatch) -> None:
+    """A mode without panel facts should persist an empty index that explain can still load."""
+    facts_path = tmp_path / "extracts_songshi_juan186.csv"
+    _facts_from(pd.DataFrame({"value_num": [], "source_ref": []})).to_csv(facts_path, index=False)
+
+    monkeypatch.setattr("pipeline_end_to_end.VERIFIED_FACTS_PATH", facts_path)
+    monkeypatch.setattr("pipeline_end_to_end.VERIFIED_PANEL_PATH", tmp_path / "panel.csv")
+    monkeypatch.setattr("pipeline_end_to_end.LEGACY_PANEL_PATH", tmp_path / "legacy.csv")
+    monkeypatch.setattr("panel.provenance.CANDIDATES_PATH", tmp_path / "candidates.csv")
+
+    run_panel_mode("verified")
+
+    spans = explain("XINNING", "NATIONAL", "shangshui", mode="verified")
+    assert spans.empty
+    assert ProvenanceIndex.load("verified").extract("fact-0").empty
@@ -0,0 +1,81 @@
+"""Tests for cross-source fact reconciliation."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from panel.reconcile import reconcile_facts, reconciliation_path, run_reconciliation
+
+
+def _fact(
+    extract_id: str, source: str, value: float, region: str = "NATIONAL", unit: str = "guan"
+) -> dict:
+    return {
+        "extract_id": extract_id,
+        "period": "XINNING",
+        "region": region,
+        "topic": "shangshui",
+        "value": value,
+        "unit": unit,
+        "confidence": "B",
+        "source_ref": f"https://example.org/{source}#cid={extract_id}",
+    }
+
+
+def test_sorted_window_groups_values_within_tolerance() -> None:
+    """Values within tolerance across sources should match; distant values should conflict."""
+    table = reconcile_facts(
+        pd.DataFrame(
+            [
+                _fact("a-1", "songshi", 1000.0),
+                _fact("b-1", "changbian", 1005.0),
+                _fact("b-2", "changbian", 2000.0),
+                _fact("a-2", "songshi", 700.0, region="NORTH"),
+                _fact("c-1", "huiyao", 700.0, region="NORTH", unit="shi"),
+            ]
+        ),
+        rel_tol=0.01,
+    ).set_index("extract_id")
+
+    assert table.loc["a-1", "group_id"] == table.loc["b-1", "group_id"]
+    assert table.loc[["a-1", "b-1"], "status"].eq("match").all()
+    assert (table.loc["a-1", "group_min"], table.loc["a-1", "group_max"]) == (1000.0, 1005.0)
+    assert table.loc["b-2", "status"] == "unmatched"
+    assert table.loc[["a-1", "b-1", "b-2"], "conflict"].all()
+    # Different units are different partitions, so these never match.
+    assert table.loc["a-2", "group_id"] != table.loc["c-1", "group_id"]
+    assert not table.loc[["a-2", "c-1"], "conflict"].any()
+    assert table.loc["b-1", "source_ref"].endswith("cid=b-1")
+
+
+def test_reconciliation_matches_pairwise_reference_on_random_facts() -> None:
+    """The sorted-window pass should equal the single-linkage groups of a pairwise comparison."""
+    rng = np.random.default_rng(7)
+    facts = pd.DataFrame(
+        [
+            _fact(f"f-{i}", f"s{rng.integers(3)}", float(rng.integers(100, 200)), unit="guan")
+            for i in range(60)
+        ]
+    )
+    table = reconcile_facts(facts, rel_tol=0.0, abs_tol=2.0).sort_values("value")
+
+    values = table["value"].to_numpy()
+    expected_breaks = np.r_[True, np.diff(values) > 2.0]
+    assert (np.diff(table["group_id"].to_numpy()) != 0).tolist() == expected_breaks[1:].tolist()
+
+
+def test_run_reconciliation_normalizes_units_and_writes_table(tmp_path: Path, monkeypatch) -> None:
+    """The command should convert units before grouping and write the mode's table."""
+    facts_path = tmp_path / "facts.csv"
+    facts = [_fact("a-1", "songshi", 2.0), _fact("b-1", "changbian", 2000.0, unit="wen")]
+    pd.DataFrame(facts).to_csv(facts_path, index=False)
+    monkeypatch.setattr("panel.reconcile.RECONCILIATION_DIR", tmp_path)
+
+    table = run_reconciliation("verified", inputs=[facts_path])
+
+    assert reconciliation_path("verified").exists()
+    assert table["status"].eq("match").all()
+    assert table["unit"].eq("guan").all()
@@ -0,0 +1,117 @@
+"""Tests for the local panel query service (loopback only, no network access)."""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+from collections.abc import Iterator
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from panel.service import PanelStore, make_server
+from pipeline_end_to_end import compute_panel, write_panel_csv
+
+
+def _facts(value: float) -> pd.DataFrame:
+    return pd.DataFrame(
+        [
+            {
+                "extract_id": f"{period}-{topic}",
+                "period": period,
+                "region": "NATIONAL",
+                "topic": topic,
+                "value": value,
+                "unit": "guan",
+                "confidence": "B",
+                "source_ref": f"verified#{period}-{topic}",
+            }
+            for period in ("XINNING", "YUANFENG")
+            for topic in ("revenue_total", "shangshui")
+        ]
+    )
+
+
+def _write_mode(directory: Path, value: float) -> tuple[Path, Path]:
+    facts_path = directory / "facts.csv"
+    panel_path = directory / "panel.csv"
+    facts = _facts(value)
+    facts.to_csv(facts_path, index=False)
+    write_panel_csv(compute_panel(facts), panel_path)
+    return panel_path, facts_path
+
+
+@pytest.fixture()
+def service(tmp_path: Path) -> Iterator[tuple[str, Path]]:
+    verified_dir, auto_dir = tmp_path / "verified", tmp_path / "auto"
+    verified_dir.mkdir()
+    auto_dir.mkdir()
+    store = PanelStore(
+        {"verified": _write_mode(verified_dir, 100.0), "auto": _write_mode(auto_dir, 1.0)}
+    )
+    server = make_server(port=0, store=store)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}", verified_dir
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _get(url: str, etag: str | None = None) -> tuple[int, dict[str, str], bytes]:
+    request = urllib.request.Request(url, headers={"If-None-Match": etag} if etag else {})
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, dict(response.headers), response.read()
+    except urllib.error.HTTPError as error:
+        return error.code, dict(error.headers), error.read()
+
+
+def test_panel_slices_as_json_and_arrow(service: tuple[str, Path]) -> None:
+    """Filters should select rows and topic columns in both output formats."""
+    base, _ = service
+
+    status, _, body = _get(f"{base}/panel/verified?period=XINNING&topic=shangshui")
+    [row] = json.loads(body)
+    assert status == 200
+    assert (row["period"], row["shangshui"]) == ("XINNING", 100.0)
+    assert "liangshui" not in row
+    assert row["supporting_extract_ids"] == ["XINNING-revenue_total", "XINNING-shangshui"]
+
+    query = "period=XINNING,YUANFENG&topic=shangshui&format=arrow"
+    status, headers, body = _get(f"{base}/facts/auto?{query}")
+    table = pa.ipc.open_stream(body).read_all()
+    assert headers["Content-Type"] == "application/vnd.apache.arrow.stream"
+    extract_ids = sorted(table.column("extract_id").to_pylist())
+    assert extract_ids == ["XINNING-shangshui", "YUANFENG-shangshui"]
+    assert set(table.column("value").to_pylist()) == {1.0}
+
+    assert _get(f"{base}/panel/unknown")[0] == 404
+    assert _get(f"{base}/panel/verified?format=xml")[0] == 400
+
+
+def test_etag_returns_not_modified_until_outputs_change(service: tuple[str, Path]) -> None:
+    """A matching If-None-Match gets 304; rewriting outputs reloads and changes the ETag."""
+    base, verified_dir = service
+    url = f"{base}/panel/verified?region=NATIONAL"
+
+    _, headers, _ = _get(url)
+    etag = headers["ETag"]
+    assert _get(url, etag)[0] == 304
+    assert _get(f"{base}/panel/verified?region=NORTH", etag)[0] == 200
+
+    panel_path, facts_path = _write_mode(verified_dir, 250.0)
+    for path in (panel_path, facts_path):
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    status, headers, body = _get(url, etag)
+    assert status == 200
+    assert headers["ETag"] != etag
+    assert {row["shangshui"] for row in json.loads(body)} == {250.0}
@@ -0,0 +1,81 @@
+"""Tests for Monte Carlo panel uncertainty bands."""
+
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+
+from panel.uncertainty import UncertaintyModel, load_uncertainty_model, uncertainty_bands
+
+NO_NOISE = UncertaintyModel(
+    relative_sd={}, default_relative_sd=0.0, draws=2000, seed=1, percentiles=(5, 50, 95)
+)
+
+
+def _fact(
+    extract_id: str, topic: str, value: float, confidence: str = "B", **extra: object
+) -> dict:
+    return {
+        "extract_id": extract_id,
+        "period": "XINNING",
+        "region": "NATIONAL",
+        "topic": topic,
+        "value": value,
+        "unit": "guan",
+        "confidence": confidence,
+        "source_ref": f"verified#{extract_id}",
+        **extra,
+    }
+
+
+def _bands(facts: list[dict], model: UncertaintyModel = NO_NOISE, **kwargs: object) -> pd.DataFrame:
+    return uncertainty_bands(pd.DataFrame(facts), model=model, **kwargs).set_index("measure")
+
+
+def test_alternative_readings_and_groups_bound_the_bands() -> None:
+    """Alternatives and mutually exclusive facts should span the bands without noise."""
+    bands = _bands(
+        [
+            _fact("t-1", "revenue_total", 100.0, alternative_group="g"),
+            _fact("t-2", "revenue_total", 300.0, alternative_group="g"),
+            _fact("s-1", "shangshui", 50.0, value_alternatives="100"),
+        ]
+    )
+
+    total = bands.loc["revenue_total"]
+    assert total["point"] == 400.0
+    assert (total["p5"], total["p95"]) == (100.0, 300.0)
+    assert total["mean"] == pytest.approx(200.0, rel=0.05)
+    shangshui = bands.loc["shangshui"]
+    assert (shangshui["p5"], shangshui["p95"]) == (50.0, 100.0)
+    share = bands.loc["share_shangshui_in_total"]
+    assert share["p5"] == pytest.approx(50.0 / 300.0)
+    assert share["p95"] == pytest.approx(1.0)
+    assert bands.loc["share_liangshui_in_total", "p50"] == 0.0
+    assert bands.loc["liangshui", "p95"] == 0.0
+    assert set(bands["supporting_extract_ids"]) == {"s-1|t-1|t-2"}
+
+
+def test_confidence_tiers_widen_bands_and_draws_are_reproducible() -> None:
+    """Lower confidence should give wider bands around the point; a seed fixes the draws."""
+    model = load_uncertainty_model()
+    facts = [
+        _fact("a", "revenue_total", 1000.0, confidence="A"),
+        _fact("c", "liangshui", 1000.0, confidence="C"),
+    ]
+
+    bands = _bands(facts, model=model, draws=4000, seed=7)
+    again = _bands(facts, model=model, draws=4000, seed=7)
+
+    pd.testing.assert_frame_equal(bands, again)
+    width = (bands["p95"] - bands["p5"]) / bands["point"]
+    assert width["revenue_total"] < width["liangshui"]
+    for measure in ("revenue_total", "liangshui"):
+        assert bands.loc[measure, "p5"] < bands.loc[measure, "point"] < bands.loc[measure, "p95"]
+        assert bands.loc[measure, "mean"] == pytest.approx(1000.0, rel=0.02)
+
+
+def test_empty_facts_give_empty_bands() -> None:
+    """No facts should mean no rows rather than an error."""
+    empty = pd.DataFrame(columns=list(_fact("x", "shangshui", 1.0)))
+    assert uncertainty_bands(empty, model=NO_NOISE).empty
@@ -0,0 +1,94 @@
+"""Tests for the unit normalization stage between facts and panel."""
+
+from __future__ import annotations
+
+from dataclasses import replace
+from pathlib import Path
+
+import pandas as pd
+
+from panel.units import load_unit_conversions, normalize_units
+from pipeline_end_to_end import run_panel_mode, unconverted_units_path
+
+
+def _fact(extract_id: str, topic: str, value: float, unit: str, source_ref: str = "") -> dict:
+    return {
+        "extract_id": extract_id,
+        "period": "XINNING",
+        "region": "NATIONAL",
+        "topic": topic,
+        "value": value,
+        "unit": unit,
+        "confidence": "B",
+        "source_ref": source_ref or f"verified#{extract_id}",
+    }
+
+
+def test_normalize_units_converts_columns_and_sets_aside_the_rest() -> None:
+    """Convertible units should be rescaled to the topic target; others get a reason."""
+    facts = pd.DataFrame(
+        [
+            _fact("v-1", "revenue_total", 5.0, "guan"),
+            _fact("v-2", "revenue_total", 2500.0, "wen"),
+            _fact("v-3", "liangshui", 3.0, "貫"),
+            _fact("v-4", "liangshui", 40.0, "shi"),
+            _fact("v-5", "shangshui", 1.0, "unknown"),
+            _fact("v-6", "grain", 1.0, "shi"),
+        ]
+    )
+
+    converted, unconverted = normalize_units(facts, load_unit_conversions())
+
+    values = converted.set_index("extract_id")["value"].to_dict()
+    assert values == {"v-1": 5.0, "v-2": 2.5, "v-3": 3.0}
+    assert (converted["unit"] == "guan").all()
+    assert converted.set_index("extract_id").loc["v-2", "unit_original"] == "wen"
+    assert unconverted.set_index("extract_id")["reason"].to_dict() == {
+        "v-4": "dimension_mismatch",
+        "v-5": "unconvertible_unit",
+        "v-6": "no_target_unit",
+    }
+
+
+def test_source_overrides_apply_per_source_ref_prefix() -> None:
+    """A source override should change the factor only for matching source refs."""
+    conversions = replace(
+        load_unit_conversions(),
+        target_units={"revenue_total": "wen"},
+        source_overrides=(("short-string://", {"guan": 770.0}),),
+    )
+    facts = pd.DataFrame(
+        [
+            _fact("v-1", "revenue_total", 2.0, "guan", source_ref="short-string://a"),
+            _fact("v-2", "revenue_total", 2.0, "guan"),
+        ]
+    )
+    converted, _ = normalize_units(facts, conversions)
+
+    assert converted.set_index("extract_id")["value"].to_dict() == {"v-1": 1540.0, "v-2": 2000.0}
+
+
+def test_panel_stops_summing_mixed_units(tmp_path: Path, monkeypatch) -> None:
+    """The panel should sum only values converted to guan and list the rest in a side table."""
+    verified_facts = tmp_path / "extracts_songshi_juan186.csv"
+    verified_panel = tmp_path / "panel_verified.csv"
+    monkeypatch.setattr("pipeline_end_to_end.VERIFIED_FACTS_PATH", verified_facts)
+    monkeypatch.setattr("pipeline_end_to_end.VERIFIED_PANEL_PATH", verified_panel)
+    monkeypatch.setattr("pipeline_end_to_end.LEGACY_PANEL_PATH", tmp_path / "panel_legacy.csv")
+    monkeypatch.setattr("pipeline_end_to_end.INTERMEDIATE_PATH", tmp_path / "facts.parquet")
+
+    pd.DataFrame(
+        [
+            _fact("v-1", "revenue_total", 10.0, "guan"),
+            _fact("v-2", "revenue_total", 5000.0, "wen"),
+            _fact("v-3", "revenue_total", 300.0, "shi"),
+        ]
+    ).to_csv(verified_facts, index=False)
+
+    panel = run_panel_mode("verified")
+    side_table = pd.read_csv(unconverted_units_path(verified_panel))
+
+    assert panel.loc[0, "revenue_total"] == 15.0
+    assert list(panel.loc[0, "supporting_extract_ids"]) == ["v-1", "v-2"]
+    assert side_table["extract_id"].tolist() == ["v-3"]
+    assert side_table["reason"].tolist() == ["dimension_mismatch"]
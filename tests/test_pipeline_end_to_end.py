@@ -1,4 +1,3 @@
-"""Tests for verified and auto panel generation modes."""
 """Tests for auto and verified panel generation."""
 
 from __future__ import annotations
@@ -7,10 +6,20 @@ import math
 from pathlib import Path
 
 import pandas as pd
+import pyarrow as pa
 
 from extract.songshi_candidates import SOURCE_URL, extract_candidates
 from organize.auto_facts_songshi_juan186 import auto_organize_facts
-from pipeline_end_to_end import run_auto_panel, run_panel_mode
+from pipeline_end_to_end import (
+    SUPPORTING_IDS_TYPE,
+    arrow_path,
+    compute_panel,
+    load_panel,
+    read_panel_csv,
+    run_auto_panel,
+    run_panel_mode,
+    write_panel_csv,
+)
 
 
 def test_verified_mode_allows_empty_panel_when_no_input_files(
@@ -173,7 +182,6 @@ def test_auto_mode_from_fixture_candidates_generates_valid_panel(
     if positive.any():
         assert panel.loc[positive, "share_liangshui_in_total"].between(0, 1, inclusive="both").all()
         assert panel.loc[positive, "share_shangshui_in_total"].between(0, 1, inclusive="both").all()
-from pipeline_end_to_end import run_panel_mode
 
 
 def test_auto_panel_uniqueness_and_share_bounds(tmp_path: Path, monkeypatch) -> None:
@@ -240,12 +248,104 @@ def test_auto_panel_uniqueness_and_share_bounds(tmp_path: Path, monkeypatch) ->
 def test_verified_panel_empty_when_no_approved_facts(tmp_path: Path, monkeypatch) -> None:
     """Verified mode should not crash and may emit an empty panel."""
     verified_facts = tmp_path / "missing_verified.csv"
+    seed_facts = tmp_path / "missing_seed.csv"
     verified_panel = tmp_path / "verified_panel.csv"
 
     monkeypatch.setattr("pipeline_end_to_end.VERIFIED_FACTS_PATH", verified_facts)
+    monkeypatch.setattr("pipeline_end_to_end.SEED_FACTS_PATH", seed_facts)
     monkeypatch.setattr("pipeline_end_to_end.VERIFIED_PANEL_PATH", verified_panel)
 
     panel = run_panel_mode("verified")
 
     assert panel.empty
     assert verified_panel.exists()
+
+
+def test_supporting_ids_are_list_typed_until_csv_export(tmp_path: Path) -> None:
+    """Supporting ids should be deduped sorted lists in memory and pipe-joined only in CSV."""
+    rows = []
+    for index, topic in enumerate(["revenue_total", "liangshui", "shangshui", "liangshui"]):
+        rows.append(
+            {
+                "extract_id": f"v-{index % 3}",
+                "period": "XINNING",
+                "region": "NATIONAL",
+                "topic": topic,
+                "value": 10.0,
+                "unit": "guan",
+                "confidence": "B",
+                "source_ref": f"verified#{index}",
+            }
+        )
+    rows.append({**rows[0], "extract_id": "v-9", "region": "NORTH"})
+
+    panel = compute_panel(pd.DataFrame(rows))
+
+    supporting = panel["supporting_extract_ids"]
+    assert supporting.dtype == pd.ArrowDtype(SUPPORTING_IDS_TYPE)
+    assert [list(ids) for ids in supporting] == [["v-0", "v-1", "v-2"], ["v-9"]]
+    assert pa.array(supporting).values.indices.to_pylist() == [0, 1, 2, 3]
+
+    panel_csv = tmp_path / "panel.csv"
+    write_panel_csv(panel, panel_csv)
+    assert pd.read_csv(panel_csv)["supporting_extract_ids"].tolist() == ["v-0|v-1|v-2", "v-9"]
+    round_trip = read_panel_csv(panel_csv)
+    pd.testing.assert_frame_equal(round_trip, panel, check_dtype=False)
+    assert round_trip["supporting_extract_ids"].dtype == supporting.dtype
+
+
+def test_panel_run_writes_memory_mappable_arrow_exports(tmp_path: Path, monkeypatch) -> None:
+    """Panel runs should export panel and facts as Arrow files that load_panel can filter."""
+    facts_path = tmp_path / "auto_facts.csv"
+    panel_path = tmp_path / "auto_panel.csv"
+    pd.DataFrame(
+        [
+            {
+                "extract_id": f"a-{period}",
+                "period": period,
+                "region": "NATIONAL",
+                "topic": "revenue_total",
+                "value": value,
+                "unit": "guan",
+                "confidence": "C",
+                "source_ref": f"u#{period}",
+            }
+            for period, value in (("XINNING", 100.0), ("YUANFENG", 200.0))
+        ]
+    ).to_csv(facts_path, index=False)
+    monkeypatch.setattr("pipeline_end_to_end.AUTO_FACTS_PATH", facts_path)
+    monkeypatch.setattr("pipeline_end_to_end.AUTO_PANEL_PATH", panel_path)
+
+    panel = run_panel_mode("auto")
+
+    assert arrow_path(panel_path).exists() and arrow_path(panel_path, "facts").exists()
+    loaded = load_panel("auto")
+    assert list(loaded.columns) == list(panel.columns)
+    supporting = [list(ids) for ids in loaded["supporting_extract_ids"]]
+    assert supporting == [["a-XINNING"], ["a-YUANFENG"]]
+
+    sliced = load_panel("auto", columns=["period", "revenue_total"], filters={"period": "YUANFENG"})
+    assert sliced.to_dict(orient="records") == [{"period": "YUANFENG", "revenue_total": 200.0}]
+    facts = load_panel("auto", kind="facts", filters={"period": ["XINNING"]})
+    assert facts["extract_id"].tolist() == ["a-XINNING"]
+
+    allocated = pa.total_allocated_bytes()
+    table = load_panel("auto", as_arrow=True)
+    assert table.num_rows == 2
+    assert pa.total_allocated_bytes() == allocated
+
+
+def test_empty_arrow_exports_keep_their_schema_and_filter(tmp_path: Path, monkeypatch) -> None:
+    """Empty panel and facts exports should be typed like non-empty ones so filters still work."""
+    monkeypatch.setattr("pipeline_end_to_end.AUTO_FACTS_PATH", tmp_path / "missing.csv")
+    monkeypatch.setattr("pipeline_end_to_end.AUTO_PANEL_PATH", tmp_path / "auto_panel.csv")
+
+    run_panel_mode("auto")
+
+    panel = load_panel("auto", filters={"period": "XINNING"}, as_arrow=True)
+    facts = load_panel("auto", kind="facts", filters={"period": ["XINNING"]}, as_arrow=True)
+    assert panel.num_rows == 0 and facts.num_rows == 0
+    assert panel.schema.field("supporting_extract_ids").type == SUPPORTING_IDS_TYPE
+    assert panel.schema.field("revenue_total").type == pa.float64()
+    assert facts.schema.field("value").type == pa.float64()
+    assert facts.schema.field("period").type == pa.string()
@@ -0,0 +1,129 @@
+"""Tests for gazetteer region resolution with the longest-match trie."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from organize.auto_facts_songshi_juan186 import (
+    RULES_PATH,
+    auto_organize_facts,
+    reorganize_auto_facts,
+)
+from organize.region_resolver import (
+    GAZETTEER_COLUMNS,
+    GAZETTEER_PATH,
+    RegionResolver,
+    RegionTrie,
+    load_region_hierarchy,
+)
+
+# Made-up names and codes: the tests exercise matching, not historical geography.
+TEST_GAZETTEER = pd.DataFrame(
+    [
+        ("NORTH_CIRCUIT", "北甲路", "lu", "NORTH", "北甲"),
+        ("SOUTH_CIRCUIT", "南乙路", "lu", "SOUTH", "南乙"),
+        ("NORTH_TOWN", "新州", "zhou", "NORTH_CIRCUIT", "丙"),
+        ("SOUTH_TOWN", "新州", "zhou", "SOUTH_CIRCUIT", ""),
+        ("NATIONAL", "天下", "macro", "", ""),
+    ],
+    columns=GAZETTEER_COLUMNS,
+)
+
+
+@pytest.fixture
+def resolver() -> RegionResolver:
+    return RegionResolver(TEST_GAZETTEER, load_region_hierarchy(), context=10)
+
+
+def test_trie_takes_leftmost_longest_matches() -> None:
+    """Overlapping names resolve to the longest one starting at the leftmost position."""
+    trie = RegionTrie(["河北", "河北东路", "北东", "东路"])
+
+    hits = trie.scan("河北东路与河北东")
+
+    assert [(start, end, trie.names[name]) for start, end, name in hits] == [
+        (0, 4, "河北东路"),
+        (5, 7, "河北"),
+    ]
+
+
+def test_ambiguous_names_resolve_only_with_nearby_context(resolver: RegionResolver) -> None:
+    """Homonyms and one-character aliases need an unambiguous hit nearby in the same snippet."""
+    results = resolver.resolve_many(
+        [
+            "北甲路新州商税",  # homonym next to a northern circuit
+            "南乙新州商税",  # homonym next to a southern circuit
+            "新州商税",  # no context: unresolved
+            "北甲" + "之" * 20 + "新州",  # context too far away
+            "丙州",  # one-character alias without context
+            "南乙",  # neighbouring snippet is not context for the previous one
+        ]
+    )
+
+    assert results == [
+        ("NORTH", "北甲路+新州"),
+        ("SOUTH", "南乙+新州"),
+        ("unknown", ""),
+        ("NORTH", "北甲"),
+        ("unknown", ""),
+        ("SOUTH", "南乙"),
+    ]
+
+
+def test_conflicting_macro_regions_stay_unknown(resolver: RegionResolver) -> None:
+    """A snippet naming places in different macro regions is not assigned to either."""
+    assert resolver.resolve_many(["北甲南乙", "天下北甲", "天下"]) == [
+        ("unknown", ""),
+        ("unknown", ""),
+        ("NATIONAL", "天下"),
+    ]
+
+
+def test_sample_gazetteer_rolls_up_and_matches_workflow_default() -> None:
+    """The shipped sample loads cleanly and is the ``run-songshi-juan186-auto`` default."""
+    from songshi_juan186_workflow import DEFAULT_GAZETTEER
+
+    resolver = RegionResolver.from_paths()
+
+    assert DEFAULT_GAZETTEER == GAZETTEER_PATH
+    macros = {resolver.macro(code) for code in resolver.gazetteer["code"]}
+    assert macros == {"NATIONAL", "NORTH", "SOUTH"}
+
+
+def test_unrooted_codes_are_rejected() -> None:
+    """Every gazetteer code must roll up to NORTH, SOUTH or NATIONAL."""
+    orphan = pd.DataFrame([("LOST", "某州", "zhou", "NOWHERE", "")], columns=GAZETTEER_COLUMNS)
+    with pytest.raises(ValueError, match="LOST"):
+        RegionResolver(orphan, load_region_hierarchy())
+
+
+def test_sample_gazetteer_drives_auto_organize(tmp_path: Path) -> None:
+    """--gazetteer regions replace region_keywords in full and incremental organization."""
+    candidates_csv = tmp_path / "candidates.csv"
+    snippets = ["熙寧 商稅 河東路", "熙宁 两税 太原府", "元丰 商税 杭州", "熙宁 两税 陕 天下"]
+    pd.DataFrame(
+        {
+            "candidate_id": [f"c{index}" for index in range(len(snippets))],
+            "source_ref": [f"u#cid=c{index}" for index in range(len(snippets))],
+            "snippet": snippets,
+            "value_num": 1.0,
+            "unit_std": "guan",
+        }
+    ).to_csv(candidates_csv, index=False)
+    out_csv = tmp_path / "auto_facts.csv"
+
+    facts = auto_organize_facts(candidates_csv, out_csv, RULES_PATH, gazetteer_path=GAZETTEER_PATH)
+
+    assert facts["region"].tolist() == ["NORTH", "NORTH", "SOUTH", "NATIONAL"]
+    assert "region:河東路" in facts.loc[0, "rule_trace"]
+    keyword_facts = auto_organize_facts(candidates_csv, tmp_path / "keywords.csv", RULES_PATH)
+    assert keyword_facts.loc[0, "region"] == "unknown"
+
+    patched, reevaluated = reorganize_auto_facts(
+        candidates_csv, out_csv, RULES_PATH, tmp_path / "index.parquet", gazetteer_path=None
+    )
+    assert reevaluated == len(snippets)
+    assert patched["region"].tolist() == keyword_facts["region"].tolist()
@@ -0,0 +1,153 @@
+"""Tests for review-sheet watch mode."""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from pipeline_end_to_end import read_panel_csv
+from review.watch import REFRESH_COMMAND, ReviewWatcher, state_path
+
+
+def _row(
+    candidate_id: str, topic: str, value: float, approve: str = "1", period: str = "XINNING"
+) -> dict:
+    return {
+        "candidate_id": candidate_id,
+        "approve": approve,
+        "final_period": period,
+        "final_topic": topic,
+        "final_region": "NATIONAL",
+        "final_value_std": value,
+        "final_unit_std": "guan",
+        "confidence_override": "B",
+        "source_ref": f"https://example.org/juan186#start=0&end=1&cid={candidate_id}",
+    }
+
+
+ROWS = [
+    _row("c1", "revenue_total", 100.0),
+    _row("c2", "liangshui", 30.0),
+    _row("c3", "shangshui", 20.0, approve=""),
+    _row("c4", "revenue_total", 50.0, period="YUANFENG"),
+]
+
+
+@pytest.fixture
+def workspace(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Point verified facts, panels and promotion state at a temp directory."""
+    monkeypatch.setattr("pipeline_end_to_end.VERIFIED_FACTS_PATH", tmp_path / "extracts.csv")
+    monkeypatch.setattr("pipeline_end_to_end.VERIFIED_PANEL_PATH", tmp_path / "panel_verified.csv")
+    monkeypatch.setattr("pipeline_end_to_end.LEGACY_PANEL_PATH", tmp_path / "panel_legacy.csv")
+    monkeypatch.setattr("review.watch.INPUT_REVIEW_SHEET", tmp_path / "review_sheet.csv")
+    monkeypatch.setattr("review.watch.REVIEW_STATE", tmp_path / "promotion_state.csv")
+    monkeypatch.setattr("review.watch.REJECTED_REPORT", tmp_path / "promotion_rejected.csv")
+    return tmp_path
+
+
+def _save(sheet: Path, rows: list[dict]) -> None:
+    pd.DataFrame(rows).to_csv(sheet, index=False)
+
+
+def _panel_value(workspace: Path, period: str, topic: str) -> float:
+    panel = read_panel_csv(workspace / "panel_verified.csv").set_index("period")
+    return float(panel.loc[period, topic])
+
+
+def test_poll_debounces_saves_and_patches_changed_rows(workspace: Path) -> None:
+    """A save is processed once it settles; later saves only re-promote changed rows."""
+    sheet = workspace / "review_sheet.csv"
+    watcher = ReviewWatcher([sheet], panel_state_dir=workspace / "panel_state", debounce=0.5)
+
+    assert watcher.poll(now=0.0) == []
+    _save(sheet, ROWS)
+    assert watcher.poll(now=1.0) == []
+    assert watcher.poll(now=1.2) == []
+    assert watcher.poll(now=1.6) == [sheet]
+    assert watcher.poll(now=5.0) == []
+    assert _panel_value(workspace, "XINNING", "revenue_total") == 100.0
+    assert set(pd.read_csv(workspace / "extracts.csv")["extract_id"]) == {
+        "songshi-juan186-c1",
+        "songshi-juan186-c2",
+        "songshi-juan186-c4",
+    }
+
+    # c1 changes value, c3 gets approved and c4 is removed from the sheet.
+    edited = [_row("c1", "revenue_total", 150.0), ROWS[1], _row("c3", "shangshui", 20.0)]
+    _save(sheet, edited)
+    watcher.poll(now=6.0)
+    assert watcher.poll(now=7.0) == [sheet]
+
+    assert _panel_value(workspace, "XINNING", "revenue_total") == 150.0
+    assert _panel_value(workspace, "XINNING", "shangshui") == 20.0
+    assert "YUANFENG" not in set(read_panel_csv(workspace / "panel_verified.csv")["period"])
+    assert state_path(sheet).exists()
+
+
+def test_unreadable_save_is_skipped_until_the_next_save(workspace: Path) -> None:
+    """A sheet that fails to parse should not stop the watcher."""
+    sheet = workspace / "other_sheet.csv"
+    sheet.write_text("", encoding="utf-8")
+    watcher = ReviewWatcher([sheet], panel_state_dir=workspace / "panel_state", debounce=0.0)
+
+    watcher.poll(now=0.0)
+    assert watcher.poll(now=1.0) == []
+    _save(sheet, ROWS[:1])
+    watcher.poll(now=2.0)
+    assert watcher.poll(now=3.0) == [sheet]
+    assert state_path(sheet) == workspace / "promotion_state_other_sheet.csv"
+
+
+def test_recorded_refreshes_write_one_manifest_each(
+    workspace: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """With record_runs every refresh, failed or not, should write its own manifest."""
+    monkeypatch.setattr("instrumentation.run_manifest.RUNS_DIR", workspace / "runs")
+    sheet = workspace / "review_sheet.csv"
+    watcher = ReviewWatcher(
+        [sheet], panel_state_dir=workspace / "panel_state", debounce=0.0, record_runs=True
+    )
+
+    sheet.write_text("", encoding="utf-8")
+    watcher.poll(now=0.0)
+    assert watcher.poll(now=1.0) == []
+    _save(sheet, ROWS)
+    watcher.poll(now=2.0)
+    assert watcher.poll(now=3.0) == [sheet]
+
+    paths = sorted((workspace / "runs" / "manifests").glob("*.json"))
+    manifests = [json.loads(path.read_text(encoding="utf-8")) for path in paths]
+    assert sorted(manifest["status"] for manifest in manifests) == ["error", "ok"]
+    assert len({manifest["run_id"] for manifest in manifests}) == 2
+    for manifest in manifests:
+        assert manifest["command"] == REFRESH_COMMAND
+        assert manifest["argv"] == [str(sheet)]
+
+
+def test_running_watcher_refreshes_panel_within_a_second(workspace: Path) -> None:
+    """With the default debounce a save should reach the verified panel in under a second."""
+    sheet = workspace / "review_sheet.csv"
+    _save(sheet, ROWS)
+    refreshed = threading.Event()
+    watcher = ReviewWatcher(
+        [sheet], panel_state_dir=workspace / "panel_state", on_refresh=lambda *_: refreshed.set()
+    )
+    stop = threading.Event()
+    thread = threading.Thread(target=watcher.run, kwargs={"stop": stop, "interval": 0.02})
+    thread.start()
+    try:
+        assert refreshed.wait(5.0)
+        refreshed.clear()
+        saved_at = time.monotonic()
+        _save(sheet, [_row("c1", "revenue_total", 175.0), *ROWS[1:]])
+        assert refreshed.wait(5.0)
+        assert time.monotonic() - saved_at < 1.0
+        assert _panel_value(workspace, "XINNING", "revenue_total") == 175.0
+    finally:
+        stop.set()
+        thread.join()
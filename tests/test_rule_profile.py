@@ -0,0 +1,68 @@
+"""Tests for the organizer rule coverage and cost profile."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pandas as pd
+
+from organize.auto_facts_songshi_juan186 import RULES_PATH, auto_organize_facts
+
+SNIPPETS = [
+    ("熙宁 商税 天下", 1.0),
+    ("熙宁 市舶 舶", 2.0),
+    ("元丰 两税 京師 陕西", 3.0),
+    ("商税 天下", 4.0),
+    ("元丰 漕", 5.0),
+    ("元丰 两税", None),
+]
+
+
+def _candidates(path: Path) -> Path:
+    pd.DataFrame(
+        [
+            {
+                "candidate_id": f"c{index}",
+                "source_ref": f"u#cid=c{index}",
+                "snippet": snippet,
+                "value_num": value,
+                "unit_std": "guan",
+            }
+            for index, (snippet, value) in enumerate(SNIPPETS)
+        ]
+    ).to_csv(path, index=False)
+    return path
+
+
+def test_rule_report_counts_hits_wins_shadowing_and_drops(tmp_path: Path) -> None:
+    """The profiling pass should match plain organization and report per-keyword statistics."""
+    candidates_csv = _candidates(tmp_path / "candidates.csv")
+    report_csv = tmp_path / "rule_profile.csv"
+
+    plain = auto_organize_facts(candidates_csv, tmp_path / "plain.csv", RULES_PATH)
+    profiled = auto_organize_facts(
+        candidates_csv, tmp_path / "profiled.csv", RULES_PATH, report_csv
+    )
+
+    pd.testing.assert_frame_equal(plain, profiled)
+    report = pd.read_csv(report_csv)
+    keywords = report[report["kind"] == "keyword"].set_index(["section", "keyword"])
+    by_label = ["hits", "shadowed_by_label"]
+    assert keywords.loc[("era_keywords", "熙宁"), ["hits", "wins"]].tolist() == [2, 2]
+    shadowed = keywords.loc[("topic_keywords", "舶"), ["hits", "wins", "shadowed_by_keyword"]]
+    assert shadowed.tolist() == [1, 0, 1]
+    assert keywords.loc[("topic_keywords", "京師"), by_label].tolist() == [1, 1]
+    assert keywords.loc[("region_keywords", "陕西"), by_label].tolist() == [1, 1]
+    assert keywords.loc[("region_keywords", "京師"), "wins"] == 1
+    # 熙宁 is the first era keyword, so every row probes it; 熙寧 is skipped when 熙宁 wins.
+    assert keywords.loc[("era_keywords", "熙宁"), "probes"] == len(SNIPPETS)
+    assert keywords.loc[("era_keywords", "熙寧"), "probes"] == len(SNIPPETS) - 2
+    assert (keywords["rows"] == len(SNIPPETS)).all()
+    assert (keywords["seconds"] >= 0).all()
+
+    sections = report[report["kind"] == "section"].set_index("section")
+    assert sections.loc["era_keywords", "hits"] == 5
+    assert (sections["seconds"] > 0).all()
+    drops = report[report["kind"] == "filter"].set_index("label")["drops"].to_dict()
+    assert drops == {"period_unknown": 1, "topic_not_target": 1, "value_missing": 1}
+    assert len(profiled) == len(SNIPPETS) - sum(drops.values())
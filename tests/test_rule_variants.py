@@ -0,0 +1,85 @@
+"""Tests for shared-pass evaluation of organizer rule variants."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pandas as pd
+import yaml
+
+from organize.auto_facts_songshi_juan186 import RULES_PATH, auto_organize_facts
+from organize.rule_variants import evaluate_variants, write_variants
+
+SNIPPETS = [
+    ("熙宁 商税 天下", 1.0),
+    ("熙宁 市舶 舶", 2.0),
+    ("元丰 两税 京師 陕西", 3.0),
+    ("商税 天下", 4.0),
+    ("元丰 漕", 5.0),
+    ("元丰 两税", None),
+    ("熙宁 两税 天下", 6.0),
+]
+
+
+def _candidates(path: Path) -> Path:
+    pd.DataFrame(
+        [
+            {
+                "candidate_id": f"c{index}",
+                "source_ref": f"u#cid=c{index}",
+                "snippet": snippet,
+                "value_num": value,
+                "unit_std": "guan",
+                "cluster_id": index // 2,
+            }
+            for index, (snippet, value) in enumerate(SNIPPETS)
+        ]
+    ).to_csv(path, index=False)
+    return path
+
+
+def _variant(tmp_path: Path) -> Path:
+    """Drop the 熙宁 era keyword and add 漕 as a liangshui keyword."""
+    rules = yaml.safe_load(RULES_PATH.read_text(encoding="utf-8"))
+    for keywords in rules["era_keywords"].values():
+        if "熙宁" in keywords:
+            keywords.remove("熙宁")
+    rules["topic_keywords"]["liangshui"] = [*rules["topic_keywords"]["liangshui"], "漕"]
+    path = tmp_path / "rules_variant.yml"
+    path.write_text(yaml.safe_dump(rules, allow_unicode=True, sort_keys=False), encoding="utf-8")
+    return path
+
+
+def test_variants_match_plain_organization_per_rules_file(tmp_path: Path) -> None:
+    """Each variant's facts should equal a separate ``auto_organize_facts`` run with its rules."""
+    candidates_csv = _candidates(tmp_path / "candidates.csv")
+    rules_paths = [RULES_PATH, _variant(tmp_path)]
+
+    results = evaluate_variants(rules_paths, candidates_csv)
+
+    for result, rules_path in zip(results, rules_paths, strict=True):
+        expected = auto_organize_facts(candidates_csv, tmp_path / f"{result.name}.csv", rules_path)
+        pd.testing.assert_frame_equal(result.facts, expected, check_dtype=False)
+    assert [result.name for result in results] == ["rules_songshi_juan186", "rules_variant"]
+
+
+def test_summary_diffs_variants_against_the_baseline(tmp_path: Path) -> None:
+    """The summary should count added, removed and relabeled facts and changed panel cells."""
+    candidates_csv = _candidates(tmp_path / "candidates.csv")
+    variant = _variant(tmp_path)
+    out_dir = tmp_path / "variants"
+
+    results = evaluate_variants([RULES_PATH, variant, RULES_PATH], candidates_csv)
+    summary = write_variants(results, out_dir)
+
+    rows = summary.set_index("variant")
+    changes = ["added", "removed", "relabeled", "panel_cells_changed"]
+    assert rows.loc["rules_songshi_juan186", changes].tolist() == [0, 0, 0, 0]
+    base_ids = set(pd.read_csv(out_dir / "rules_songshi_juan186" / "auto_facts.csv")["extract_id"])
+    variant_ids = set(pd.read_csv(out_dir / "rules_variant" / "auto_facts.csv")["extract_id"])
+    assert rows.loc["rules_variant", "added"] == len(variant_ids - base_ids)
+    assert rows.loc["rules_variant", "removed"] == len(base_ids - variant_ids) > 0
+    assert rows.loc["rules_variant", "panel_cells_changed"] > 0
+    assert "rules_songshi_juan186_2" in rows.index
+    assert (out_dir / "rules_variant" / "panel_auto.csv").exists()
+    assert (out_dir / "summary.csv").exists()
@@ -0,0 +1,80 @@
+"""Tests for hash-join run-to-run diffs."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pandas as pd
+
+from storage.run_diff import TABLES, diff_runs, diff_tables, run_artifact, write_diffs
+
+
+def _facts(rows: list[tuple[str, str, str]]) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=["extract_id", "topic", "value"])
+
+
+def test_diff_tables_reports_added_removed_and_column_deltas() -> None:
+    """Rows are matched by key; changed rows list each moved column with its numeric delta."""
+    old = _facts([("e1", "liangshui", "100"), ("e2", "shangshui", "20"), ("e3", "tea", "5")])
+    new = _facts([("e3", "tea", "5"), ("e2", "revenue_total", "25"), ("e4", "salt", "7")])
+
+    result = diff_tables(old, new, ["extract_id"], table="auto_facts")
+
+    assert result.counts == {"added": 1, "removed": 1, "changed": 1}
+    by_change = result.delta.groupby("change")["extract_id"].agg(set)
+    assert by_change["added"] == {"e4"} and by_change["removed"] == {"e1"}
+    changed = result.delta[result.delta["change"] == "changed"].set_index("column")
+    assert changed.loc["topic", ["old", "new"]].tolist() == ["shangshui", "revenue_total"]
+    assert pd.isna(changed.loc["topic", "delta"])
+    assert changed.loc["value", "delta"] == 5.0
+
+
+def test_composite_keys_and_schema_changes() -> None:
+    """Panel rows join on (period, region); columns only one side has are reported, not diffed."""
+    old = pd.DataFrame(
+        {"period": ["XINNING", "XINNING"], "region": ["NATIONAL", "NORTH"], "shangshui": ["1", "2"]}
+    )
+    new = old.assign(shangshui=["1", "3"], tea=["0", "0"])
+
+    result = diff_tables(old, new, ["period", "region"], table="panel_auto")
+
+    assert result.counts == {"added": 0, "removed": 0, "changed": 1}
+    assert result.columns_added == ["tea"] and result.columns_removed == []
+    [row] = result.delta.itertuples()
+    assert (row.period, row.region, row.column, row.delta) == ("XINNING", "NORTH", "shangshui", 1.0)
+
+
+def test_diff_runs_over_run_roots_writes_summary_and_deltas(tmp_path: Path) -> None:
+    """Run roots mirror the repository layout; missing tables on one side count as all added."""
+    old_root, new_root = tmp_path / "old", tmp_path / "new"
+    for root, ids in ((old_root, ["c1", "c2"]), (new_root, ["c2", "c3"])):
+        path = run_artifact(root, "candidates")
+        path.parent.mkdir(parents=True)
+        pd.DataFrame({"candidate_id": ids, "value_num": ["1", "2"]}).to_csv(path, index=False)
+    facts = run_artifact(new_root, "auto_facts")
+    _facts([("e1", "tea", "5")]).to_csv(facts, index=False)
+
+    diffs = diff_runs(old_root, new_root)
+    summary = write_diffs(diffs, tmp_path / "diff").set_index("table")
+
+    assert list(summary.index) == ["candidates", "auto_facts"]
+    counts = summary.loc["candidates", ["added", "removed", "changed", "unchanged"]]
+    assert counts.tolist() == [1, 1, 1, 0]
+    assert summary.loc["auto_facts", ["old_rows", "added"]].tolist() == [0, 1]
+    delta = pd.read_csv(tmp_path / "diff" / "candidates_delta.csv")
+    assert set(delta["change"]) == {"added", "removed", "changed"}
+    assert (tmp_path / "diff" / "summary.csv").exists()
+    assert set(TABLES) >= set(summary.index)
+
+
+def test_diff_runs_accepts_two_files(tmp_path: Path) -> None:
+    """Two files are diffed directly, with the table kind inferred from their columns."""
+    old, new = tmp_path / "old.csv", tmp_path / "new.csv"
+    _facts([("e1", "tea", "5")]).to_csv(old, index=False)
+    _facts([("e1", "tea", "5.0")]).to_csv(new, index=False)
+
+    [result] = diff_runs(old, new)
+
+    assert result.table == "auto_facts"
+    assert result.counts["changed"] == 1
+    assert result.delta.loc[0, "delta"] == 0.0
@@ -0,0 +1,90 @@
+"""Tests for content-addressed output snapshots and link-based checkout."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+from storage.snapshots import SnapshotStore
+
+
+@pytest.fixture
+def tree(tmp_path: Path) -> tuple[Path, tuple[Path, Path], SnapshotStore]:
+    """A repository-like tree with intermediate and primary outputs plus a store."""
+    base = tmp_path / "repo"
+    sources = (base / "data" / "02_intermediate", base / "data" / "03_primary")
+    (sources[0] / "provenance").mkdir(parents=True)
+    sources[1].mkdir(parents=True)
+    (sources[0] / "candidates.csv").write_text("candidate_id\nc1\n", encoding="utf-8")
+    (sources[0] / "provenance" / "provenance_auto.parquet").write_bytes(b"PAR1" * 100)
+    panel = sources[1] / "panel_auto.csv"
+    panel.write_text("period,region\nXINNING,NATIONAL\n", encoding="utf-8")
+    (sources[1] / ".staging").mkdir()
+    (sources[1] / ".staging" / "in-flight").write_text("partial", encoding="utf-8")
+    return base, sources, SnapshotStore(tmp_path / "store", base_dir=base)
+
+
+def test_unchanged_artifacts_are_stored_once(tree) -> None:
+    """A second snapshot only stores blobs for files whose content changed."""
+    base, sources, store = tree
+    first = store.snapshot("run-1", sources)
+    assert (first.files, first.blobs_new) == (3, 3)
+
+    panel = sources[1] / "panel_auto.csv"
+    panel.write_text("period,region\nYUANFENG,NATIONAL\n", encoding="utf-8")
+    (sources[0] / "copy.csv").write_text("candidate_id\nc1\n", encoding="utf-8")
+    second = store.snapshot("run-2", sources)
+
+    assert (second.files, second.blobs_new) == (4, 1)
+    assert len(list((store.root / "objects").rglob("*.gz"))) == 4
+    manifest = store.load("run-2")
+    paths = {entry["path"]: entry["sha256"] for entry in manifest["files"]}
+    assert "data/03_primary/.staging/in-flight" not in paths
+    assert paths["data/02_intermediate/copy.csv"] == paths["data/02_intermediate/candidates.csv"]
+    assert [snapshot["snapshot_id"] for snapshot in store.snapshots()] == ["run-1", "run-2"]
+    with pytest.raises(ValueError):
+        store.snapshot("run-1", sources)
+
+
+def test_checkout_restores_past_run_through_shared_links(tree, tmp_path: Path) -> None:
+    """Checkouts reproduce each run's bytes; identical content shares one cached inode."""
+    base, sources, store = tree
+    store.snapshot("run-1", sources)
+    panel = sources[1] / "panel_auto.csv"
+    panel.write_text("period,region\nYUANFENG,NATIONAL\n", encoding="utf-8")
+    store.snapshot("run-2", sources)
+
+    methods = store.checkout("run-1", tmp_path / "old", mode="auto")
+    store.checkout("run-2", tmp_path / "new", mode="hardlink")
+
+    assert sum(methods.values()) == 3
+    old_panel = tmp_path / "old" / "data" / "03_primary" / "panel_auto.csv"
+    assert old_panel.read_text(encoding="utf-8") == "period,region\nXINNING,NATIONAL\n"
+    old_candidates = tmp_path / "old" / "data" / "02_intermediate" / "candidates.csv"
+    new_candidates = tmp_path / "new" / "data" / "02_intermediate" / "candidates.csv"
+    if methods["hardlink"]:
+        assert old_candidates.stat().st_ino == new_candidates.stat().st_ino
+    assert new_candidates.stat().st_ino != (sources[0] / "candidates.csv").stat().st_ino
+    parquet = new_candidates.parent / "provenance" / "provenance_auto.parquet"
+    assert parquet.read_bytes() == b"PAR1" * 100
+
+
+def test_corrupt_blobs_are_refused_and_copy_mode_is_independent(tree, tmp_path: Path) -> None:
+    """A corrupted blob is refused; re-snapshotting heals it and copy mode gives plain files."""
+    base, sources, store = tree
+    store.snapshot("run-1", sources)
+    manifest = json.loads(store.manifest_path("run-1").read_text(encoding="utf-8"))
+    digests = {Path(entry["path"]).name: entry["sha256"] for entry in manifest["files"]}
+    panel_blob = store.blob_path(digests["panel_auto.csv"])
+    panel_blob.write_bytes(store.blob_path(digests["candidates.csv"]).read_bytes())
+    with pytest.raises(ValueError, match="corrupt"):
+        store.checkout("run-1", tmp_path / "broken")
+
+    panel_blob.unlink()
+    assert store.snapshot("run-2", sources).blobs_new == 1
+    store.checkout("run-1", tmp_path / "copy", mode="copy")
+    copied = tmp_path / "copy" / "data" / "03_primary" / "panel_auto.csv"
+    assert copied.read_text(encoding="utf-8") == "period,region\nXINNING,NATIONAL\n"
+    assert copied.stat().st_nlink == 1
@@ -10,6 +10,8 @@ import pytest
 from extract.songshi_candidates import extract_candidates, parse_chinese_numeral
 from ingest.wikisource_fetch import fetch_wikisource_page
 from organize.auto_facts_songshi_juan186 import auto_organize_facts
+from review import make_review_sheet as review_sheet_module
+from review.make_review_sheet import make_review_sheet, stream_review_sheet
 from review.promote_reviewed_to_facts import FACT_COLUMNS, promote_reviewed_to_facts
 
 REQUIRED_CANDIDATE_COLUMNS = {
@@ -182,3 +184,175 @@ def test_promote_only_approved_rows(tmp_path: Path) -> None:
     assert list(facts.columns) == FACT_COLUMNS
     assert len(facts) == 1
     assert facts.iloc[0]["confidence"] == "C"
+
+
+def _review_row(candidate_id: str, approve: object, value: str = "100") -> dict[str, object]:
+    return {
+        "candidate_id": candidate_id,
+        "source_ref": f"https://zh.wikisource.org/zh-hans/宋史/卷186#cid={candidate_id}",
+        "approve": approve,
+        "final_period": "XINNING",
+        "final_topic": "shangshui",
+        "final_region": "NATIONAL",
+        "final_value_std": value,
+        "final_unit_std": "guan",
+        "confidence_override": "",
+    }
+
+
+def test_promote_reports_rejected_rows(tmp_path: Path) -> None:
+    """Approved rows with blank or non-numeric final fields should land in the rejected report."""
+    review_path = tmp_path / "review_sheet.csv"
+    out_facts = tmp_path / "facts.csv"
+    rejected_path = tmp_path / "rejected.csv"
+
+    missing_period = _review_row("c-missing", "yes")
+    missing_period["final_period"] = " "
+    pd.DataFrame(
+        [
+            _review_row("c-ok", "TRUE"),
+            missing_period,
+            _review_row("c-bad-value", 1, value="三百"),
+            _review_row("c-skipped", "no", value="三百"),
+        ]
+    ).to_csv(review_path, index=False)
+
+    facts = promote_reviewed_to_facts(review_path, out_facts, rejected_csv=rejected_path)
+    rejected = pd.read_csv(rejected_path)
+
+    assert facts["extract_id"].tolist() == ["songshi-juan186-c-ok"]
+    assert dict(zip(rejected["extract_id"], rejected["reason"], strict=True)) == {
+        "songshi-juan186-c-missing": "missing_final_fields:final_period",
+        "songshi-juan186-c-bad-value": "invalid_final_value_std",
+    }
+
+
+def test_incremental_promote_upserts_only_changed_rows(tmp_path: Path) -> None:
+    """Incremental promotion should append new approvals and upsert edited rows by extract_id."""
+    review_path = tmp_path / "review_sheet.csv"
+    out_facts = tmp_path / "facts.csv"
+    state_path = tmp_path / "state.csv"
+
+    rows = [_review_row("c-1", 1), _review_row("c-2", 0), _review_row("c-3", 1)]
+    pd.DataFrame(rows).to_csv(review_path, index=False)
+    promote_reviewed_to_facts(review_path, out_facts, state_csv=state_path, incremental=True)
+    first_contents = out_facts.read_text(encoding="utf-8")
+
+    rows[1]["approve"] = 1
+    pd.DataFrame(rows).to_csv(review_path, index=False)
+    facts = promote_reviewed_to_facts(
+        review_path, out_facts, state_csv=state_path, incremental=True
+    )
+
+    assert out_facts.read_text(encoding="utf-8").startswith(first_contents)
+    assert sorted(facts["extract_id"]) == [f"songshi-juan186-c-{i}" for i in (1, 2, 3)]
+
+    rows[0]["final_value_std"] = "250"
+    rows[2]["approve"] = 0
+    pd.DataFrame(rows).to_csv(review_path, index=False)
+    facts = promote_reviewed_to_facts(
+        review_path, out_facts, state_csv=state_path, incremental=True
+    )
+    full = promote_reviewed_to_facts(review_path, tmp_path / "full.csv")
+
+    on_disk = pd.read_csv(out_facts).sort_values("extract_id").reset_index(drop=True)
+    pd.testing.assert_frame_equal(on_disk, full.sort_values("extract_id").reset_index(drop=True))
+    assert facts.set_index("extract_id").loc["songshi-juan186-c-1", "value"] == 250.0
+
+
+def test_incremental_promote_keeps_unchanged_rejections(tmp_path: Path) -> None:
+    """Rows left untouched between incremental runs should stay in the rejected report."""
+    review_path = tmp_path / "review_sheet.csv"
+    out_facts = tmp_path / "facts.csv"
+    state_path = tmp_path / "state.csv"
+    rejected_path = tmp_path / "rejected.csv"
+
+    missing_period = _review_row("c-2", 1)
+    missing_period["final_period"] = ""
+    rows = [_review_row("c-1", 1), missing_period, _review_row("c-3", 1, value="三百")]
+    pd.DataFrame(rows).to_csv(review_path, index=False)
+    promote = dict(state_csv=state_path, rejected_csv=rejected_path, incremental=True)
+    promote_reviewed_to_facts(review_path, out_facts, **promote)
+
+    rows[0]["final_value_std"] = "250"
+    rows[2]["final_value_std"] = "300"
+    pd.DataFrame(rows).to_csv(review_path, index=False)
+    promote_reviewed_to_facts(review_path, out_facts, **promote)
+
+    rejected = pd.read_csv(rejected_path)
+    assert dict(zip(rejected["extract_id"], rejected["reason"], strict=True)) == {
+        "songshi-juan186-c-2": "missing_final_fields:final_period",
+    }
+
+
+def test_streaming_review_and_promotion_match_in_memory_path(tmp_path: Path) -> None:
+    """Chunked review-sheet generation and promotion should match the in-memory outputs."""
+    candidates_csv = tmp_path / "candidates.csv"
+    extract_candidates(
+        txt_path=Path("tests/fixtures/juan186_sample.txt"),
+        out_csv=candidates_csv,
+        source_ref="https://zh.wikisource.org/zh-hans/宋史/卷186",
+    )
+
+    in_memory_sheet = tmp_path / "review_in_memory.csv"
+    streamed_sheet = tmp_path / "review_streamed.csv"
+    expected_sheet = make_review_sheet(candidates_csv, in_memory_sheet)
+    rows = stream_review_sheet(candidates_csv, streamed_sheet, chunksize=2)
+
+    assert rows == len(expected_sheet)
+    assert streamed_sheet.read_text(encoding="utf-8") == in_memory_sheet.read_text(encoding="utf-8")
+
+    review_df = pd.read_csv(streamed_sheet)
+    review_df.loc[::2, "approve"] = 1
+    final_fields = ["final_period", "final_topic", "final_region"]
+    review_df[final_fields] = ["XINNING", "shangshui", "NATIONAL"]
+    review_df["final_value_std"] = review_df["value_num"]
+    review_df["final_unit_std"] = review_df["unit_std"]
+    review_df.to_csv(streamed_sheet, index=False)
+
+    expected = promote_reviewed_to_facts(
+        streamed_sheet, tmp_path / "facts_in_memory.csv", rejected_csv=tmp_path / "rejected_a.csv"
+    )
+    streamed = promote_reviewed_to_facts(
+        streamed_sheet,
+        tmp_path / "facts_streamed.csv",
+        rejected_csv=tmp_path / "rejected_b.csv",
+        chunksize=2,
+    )
+
+    assert not expected.empty
+    pd.testing.assert_frame_equal(streamed, expected)
+    assert (tmp_path / "facts_streamed.csv").read_text(encoding="utf-8") == (
+        tmp_path / "facts_in_memory.csv"
+    ).read_text(encoding="utf-8")
+    assert (tmp_path / "rejected_b.csv").read_text(encoding="utf-8") == (
+        tmp_path / "rejected_a.csv"
+    ).read_text(encoding="utf-8")
+
+
+@pytest.mark.parametrize("chunksize", [None, 2])
+def test_review_cli_restricts_sheet_to_requested_columns(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, chunksize: int | None
+) -> None:
+    """``--columns`` should reach both the in-memory and the streaming sheet writers."""
+    candidates_csv = tmp_path / "candidates.csv"
+    extract_candidates(
+        txt_path=Path("tests/fixtures/juan186_sample.txt"),
+        out_csv=candidates_csv,
+        source_ref="https://zh.wikisource.org/zh-hans/宋史/卷186",
+    )
+    output_csv = tmp_path / "review_sheet.csv"
+    monkeypatch.setattr(review_sheet_module, "INPUT_AUTO_FACTS", tmp_path / "missing.csv")
+    monkeypatch.setattr(review_sheet_module, "INPUT_CANDIDATES", candidates_csv)
+    monkeypatch.setattr(review_sheet_module, "OUTPUT_REVIEW_SHEET", output_csv)
+    monkeypatch.setattr("instrumentation.run_manifest.RUNS_DIR", tmp_path / "runs")
+
+    argv = ["--columns", "candidate_id, snippet,value_num"]
+    if chunksize is not None:
+        argv += ["--chunksize", str(chunksize)]
+    review_sheet_module.main(argv)
+
+    sheet = pd.read_csv(output_csv)
+    requested = ["candidate_id", "snippet", "value_num"]
+    assert sheet.columns.tolist() == [*requested, *review_sheet_module.REVIEW_COLUMNS]
+    assert len(sheet) == len(pd.read_csv(candidates_csv))
@@ -0,0 +1,120 @@
+"""Tests for atomic, lock-protected artifact writes."""
+
+from __future__ import annotations
+
+import json
+import multiprocessing
+import threading
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from instrumentation.run_manifest import instrumented_command
+from storage.atomic import (
+    LOCKS_DIRNAME,
+    STAGING_DIRNAME,
+    artifact_lock,
+    atomic_path,
+    write_csv,
+    write_text,
+)
+
+
+def _append_rows(path: str, worker: int, rows: int) -> None:
+    """Read-modify-write ``rows`` lines under the artifact lock (runs in a child process)."""
+    target = Path(path)
+    for row in range(rows):
+        with artifact_lock(target):
+            existing = target.read_text(encoding="utf-8") if target.exists() else ""
+            write_text(target, f"{existing}{worker}-{row}\n")
+
+
+def test_publish_replaces_file_and_leaves_no_staging_files(tmp_path: Path) -> None:
+    """A successful write should replace the artifact and clean its staging file."""
+    path = tmp_path / "out" / "facts.csv"
+    write_csv(pd.DataFrame({"value": [1, 2]}), path)
+    write_csv(pd.DataFrame({"value": [3]}), path)
+
+    assert pd.read_csv(path)["value"].tolist() == [3]
+    assert list((path.parent / STAGING_DIRNAME).iterdir()) == []
+    assert (path.parent / LOCKS_DIRNAME / "facts.csv.lock").exists()
+
+
+def test_failed_write_keeps_previous_artifact(tmp_path: Path) -> None:
+    """An exception mid-write should leave the previous file untouched."""
+    path = tmp_path / "panel.csv"
+    write_text(path, "period,value\nXINNING,1\n")
+
+    with pytest.raises(RuntimeError), atomic_path(path) as staged:
+        staged.write_text("period,val", encoding="utf-8")
+        raise RuntimeError("interrupted")
+
+    assert path.read_text(encoding="utf-8") == "period,value\nXINNING,1\n"
+    assert list((tmp_path / STAGING_DIRNAME).iterdir()) == []
+
+
+def test_append_starts_from_a_copy_and_untouched_staging_is_not_published(tmp_path: Path) -> None:
+    """Append mode should extend a copy; a block that writes nothing should change nothing."""
+    path = tmp_path / "facts.csv"
+    write_text(path, "a\n")
+    with atomic_path(path, append=True) as staged:
+        with staged.open("a", encoding="utf-8") as handle:
+            handle.write("b\n")
+        assert path.read_text(encoding="utf-8") == "a\n"
+    assert path.read_text(encoding="utf-8") == "a\nb\n"
+
+    missing = tmp_path / "absent.csv"
+    with atomic_path(missing):
+        pass
+    assert not missing.exists()
+
+
+def test_lock_is_reentrant_within_a_thread_and_exclusive_across_threads(tmp_path: Path) -> None:
+    """Nested locks on one artifact should not deadlock; other threads should wait."""
+    path = tmp_path / "state.parquet"
+    entered = threading.Event()
+
+    def contender() -> None:
+        with artifact_lock(path):
+            entered.set()
+
+    with artifact_lock(path), artifact_lock(path):
+        thread = threading.Thread(target=contender)
+        thread.start()
+        assert not entered.wait(0.2)
+    thread.join(5.0)
+    assert entered.is_set()
+
+
+def test_concurrent_processes_do_not_lose_appended_rows(tmp_path: Path) -> None:
+    """Read-modify-write cycles from several processes should all survive."""
+    path = tmp_path / "journal.txt"
+    context = multiprocessing.get_context("spawn")
+    workers = [
+        context.Process(target=_append_rows, args=(str(path), worker, 10)) for worker in range(3)
+    ]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join(30)
+        assert process.exitcode == 0
+
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert sorted(lines) == sorted(f"{worker}-{row}" for worker in range(3) for row in range(10))
+
+
+def test_published_artifacts_are_listed_in_the_run_manifest(tmp_path: Path, monkeypatch) -> None:
+    """Each artifact a command publishes should appear under the manifest's outputs."""
+    monkeypatch.setattr("instrumentation.run_manifest.RUNS_DIR", tmp_path / "runs")
+    path = tmp_path / "out.txt"
+
+    @instrumented_command("demo-atomic")
+    def _demo(argv: list[str] | None = None) -> None:
+        write_text(path, "ok\n")
+
+    _demo([])
+
+    [manifest_path] = (tmp_path / "runs" / "manifests").glob("*.json")
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    assert manifest["outputs"] == [str(path)]